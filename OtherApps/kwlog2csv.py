@@ -13,6 +13,7 @@
 
 import getopt
 import json
+import os
 import sys
 
 sys.path.append("..")  # Adds higher directory to python modules path.
@@ -20,6 +21,7 @@ sys.path.append("..")  # Adds higher directory to python modules path.
 try:
     from genmonlib.myclient import ClientInterface
     from genmonlib.mylog import SetupLogger
+    from genmonlib.mypowerlog import MyPowerLog
     from genmonlib.program_defaults import ProgramDefaults
 except:
     print(
@@ -51,17 +53,24 @@ if __name__ == "__main__":
     address = ProgramDefaults.LocalHost
     port = ProgramDefaults.ServerPort
     fileName = ""
+    powerLog = ""
 
     HelpStr = "\npython3 kwlog2csv.py -a <IP Address or localhost> -f <outputfile>\n"
     HelpStr += "\n   Example: python kwlog2csv.py -a 192.168.1.100 -f Output.csv \n"
+    HelpStr += (
+        "\n   Example: python kwlog2csv.py -l /etc/genmon/kwlog.bin -f Output.csv \n"
+    )
     HelpStr += "\n"
     HelpStr += "\n      -a  Address of system with genmon (omit for localhost)"
+    HelpStr += (
+        "\n      -l  Power log file to read instead of querying genmon (kwlog.bin)"
+    )
     HelpStr += "\n      -f  Filename to output the kW log in CSV format"
     HelpStr += "\n \n"
 
     try:
         opts, args = getopt.getopt(
-            sys.argv[1:], "ha:f:p:", ["address=", "filename=", "port="]
+            sys.argv[1:], "ha:f:p:l:", ["address=", "filename=", "port=", "log="]
         )
     except getopt.GetoptError:
         print(HelpStr)
@@ -81,6 +90,9 @@ if __name__ == "__main__":
             elif opt in ("-f", "--filename"):
                 fileName = arg
                 print("Output file is : %s" % fileName)
+            elif opt in ("-l", "--log"):
+                powerLog = arg
+                print("Power log is : %s" % powerLog)
     except Exception as e1:
         print("Error : " + str(e1))
         sys.exit(2)
@@ -96,6 +108,16 @@ if __name__ == "__main__":
     try:
         log = SetupLogger("client", "kwlog2csv.log")
 
+        if len(powerLog):
+            # only read an existing binary log, do not convert a text log
+            powerLog = os.path.splitext(powerLog)[0] + ".bin"
+            if not os.path.isfile(powerLog):
+                print("Power log not found: " + powerLog)
+                sys.exit(2)
+            Entries = MyPowerLog(powerLog, log=log).ExportText(fileName)
+            print("Exported %d entries" % Entries)
+            sys.exit()
+
         MyClientInterface = ClientInterface(host=address, port=port, log=log)
 
         data = MyClientInterface.ProcessMonitorCommand("generator: power_log_json")
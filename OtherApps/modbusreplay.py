@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+#    FILE: modbusreplay.py
+# PURPOSE: replay a bus capture file through the modbus decoder
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+# Free software. Use at your own risk.
+# MODIFICATIONS:
+# ------------------------------------------------------------
+
+from __future__ import print_function
+
+import getopt
+import os
+import sys
+
+# Adds higher directory to python modules path.
+sys.path.append(os.path.dirname(sys.path[0]))
+
+try:
+    from genmonlib.modbusreplay import ModbusReplay
+except Exception as e1:
+    print("\n\nThis program is used to replay modbus bus capture files.")
+    print(
+        "\n\nThis program requires the modules modbusreplay.py and mymodbus.py to reside in the genmonlib directory.\n"
+    )
+    print("\n\nError: " + str(e1))
+    sys.exit(2)
+
+Registers = {}
+Verbose = False
+
+
+# ------------ RegisterResults --------------------------------------------------
+def RegisterResults(Register, Value, IsString=False, IsFile=False):
+
+    if Verbose:
+        print(Register + ":" + Value)
+    Registers[Register] = Value
+    return True
+
+
+# ------------------- Command-line interface for replay ------------------------#
+if __name__ == "__main__":  #
+
+    CaptureFile = None
+    Speed = 0.0
+    modbusaddress = 0x9D
+
+    HelpStr = "\npython3 modbusreplay.py -f <capture file> [-s <speed>] [-a <modbus address>] [-v]\n"
+    HelpStr += "\n   Example: python3 modbusreplay.py -f /var/log/buscapture.bin -s 1"
+    HelpStr += "\n      -f  Capture file recorded with the bus_capture_file option"
+    HelpStr += "\n      -s  Replay speed, 1 is the recorded rate, 0 (default) is as fast as possible"
+    HelpStr += "\n      -a  Modbus address in hexidecimal (default 9d)"
+    HelpStr += "\n      -v  Print each register read"
+    HelpStr += "\n \n"
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hvf:s:a:")
+    except getopt.GetoptError:
+        print(HelpStr)
+        sys.exit(2)
+
+    try:
+        for opt, arg in opts:
+            if opt == "-h":
+                print(HelpStr)
+                sys.exit()
+            elif opt == "-f":
+                CaptureFile = arg
+            elif opt == "-s":
+                Speed = float(arg)
+            elif opt == "-a":
+                modbusaddress = int(arg, 16)
+            elif opt == "-v":
+                Verbose = True
+    except Exception as e1:
+        print("Error parsing command line: " + str(e1))
+        print(HelpStr)
+        sys.exit(2)
+
+    if CaptureFile == None:
+        print(HelpStr)
+        sys.exit(2)
+
+    try:
+        modbus = ModbusReplay(
+            RegisterResults, CaptureFile, address=modbusaddress, speed=Speed
+        )
+    except Exception as e1:
+        print("Error opening capture file: " + str(e1))
+        sys.exit(2)
+
+    try:
+        modbus.Replay()
+        print("\nRegisters: %d" % len(Registers))
+        for Item in modbus.GetReplayStats():
+            for Key, Value in Item.items():
+                print("%s: %s" % (Key, str(Value)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        modbus.Close()
@@ -0,0 +1,644 @@
+#!/usr/bin/env python
+# ------------------------------------------------------------
+#    FILE: modbussim.py
+# PURPOSE: simulated generator controller (modbus slave) for testing and
+#          benchmarking genmon without a generator
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+# Free software. Use at your own risk.
+# MODIFICATIONS:
+# ------------------------------------------------------------
+
+from __future__ import print_function
+
+import collections
+import getopt
+import json
+import os
+import random
+import select
+import socket
+import sys
+import threading
+import time
+
+try:
+    import crcmod
+except Exception as e1:
+    print("\n\nThis program requires the crcmod module to be installed.")
+    print("\n\nError: " + str(e1))
+    sys.exit(2)
+
+MBUS_CMD_READ_REGS = 0x03
+MBUS_CMD_READ_INPUT_REGS = 0x04
+MBUS_CMD_WRITE_REGS = 0x10
+MBUS_CMD_READ_FILE = 0x14
+MBUS_CMD_WRITE_FILE = 0x15
+MBUS_ERROR_BIT = 0x80
+MBUS_EXCEP_FUNCTION = 0x01
+MBUS_EXCEP_ADDRESS = 0x02
+MBUS_EXCEP_DATA = 0x03
+MBUS_FILE_TYPE_VALUE = 0x06
+MODBUS_TCP_HEADER_SIZE = 6
+MAX_READ_WORDS = 125
+
+
+# ------------ RegisterMap class ------------------------------------------------
+class RegisterMap(object):
+    # register values loaded from a register dump. Registers are stored as
+    # 16 bit words, file records as lists of bytes
+
+    def __init__(self, zerofill=False):
+        self.Words = {}
+        self.Files = {}
+        self.ZeroFill = zerofill
+        self.Lock = threading.Lock()
+
+    # ---------- RegisterMap::SetHexValue---------------------------------------
+    # Value is a hex string, it may be more than one register long
+    def SetHexValue(self, Register, Value):
+        RegInt = int(Register, 16)
+        Value = Value.strip()
+        if len(Value) % 4:
+            Value = "0" * (4 - (len(Value) % 4)) + Value
+        for Index in range(0, len(Value), 4):
+            self.Words[RegInt + int(Index / 4)] = int(Value[Index : Index + 4], 16)
+
+    # ---------- RegisterMap::SetString-----------------------------------------
+    # same conversion as ModbusFile.AdjustInputData
+    def SetString(self, Register, Value):
+        if not len(Value):
+            self.Words[int(Register, 16)] = 0
+            return
+        try:
+            int(Value, 16)
+            self.SetHexValue(Register, Value)
+            return
+        except ValueError:
+            pass
+        RegInt = int(Register, 16)
+        for Index in range(0, len(Value), 2):
+            HiByte = ord(Value[Index])
+            LowByte = ord(Value[Index + 1]) if Index + 1 < len(Value) else 0
+            self.Words[RegInt + int(Index / 2)] = (HiByte << 8) | LowByte
+
+    # ---------- RegisterMap::SetFileRecord-------------------------------------
+    def SetFileRecord(self, Register, Value):
+        Value = Value.strip()
+        try:
+            Data = [int(Value[i : i + 2], 16) for i in range(0, len(Value), 2)]
+        except ValueError:
+            Data = [ord(c) for c in Value]
+        self.Files[int(Register, 16)] = Data
+
+    # ---------- RegisterMap::ReadWords-----------------------------------------
+    # returns a list of words or None if a register is not in the map
+    def ReadWords(self, Register, Count):
+        with self.Lock:
+            Words = []
+            for RegInt in range(Register, Register + Count):
+                Value = self.Words.get(RegInt, None)
+                if Value == None:
+                    if not self.ZeroFill:
+                        return None
+                    Value = 0
+                Words.append(Value)
+            return Words
+
+    # ---------- RegisterMap::WriteWords----------------------------------------
+    def WriteWords(self, Register, Words):
+        with self.Lock:
+            for Index, Value in enumerate(Words):
+                self.Words[Register + Index] = Value
+
+    # ---------- RegisterMap::ReadFile------------------------------------------
+    def ReadFile(self, Record, Count):
+        with self.Lock:
+            Data = self.Files.get(Record, None)
+            if Data == None:
+                if not self.ZeroFill:
+                    return None
+                Data = []
+            Data = list(Data[: Count * 2])
+            return Data + [0] * (Count * 2 - len(Data))
+
+    # ---------- RegisterMap::WriteFile-----------------------------------------
+    def WriteFile(self, Record, Data):
+        with self.Lock:
+            self.Files[Record] = list(Data)
+
+    # ---------- RegisterMap::Load----------------------------------------------
+    # load modbusregs.txt style text files, ModbusFile JSON files or the
+    # output of the allregs_json command
+    def Load(self, FileName):
+        with open(FileName, "r") as f:
+            Text = f.read()
+        try:
+            Data = json.loads(Text, object_pairs_hook=collections.OrderedDict)
+        except ValueError:
+            return self.LoadText(Text)
+        return self.LoadJSON(Data)
+
+    # ---------- RegisterMap::LoadJSON------------------------------------------
+    def LoadJSON(self, Data):
+        Registers = Data.get("Registers", {})
+        if "Base Registers" in Registers:
+            # allregs_json output
+            for Item in Registers.get("Base Registers", []):
+                for Register, Value in Item.items():
+                    self.SetHexValue(Register, Value)
+            self.LoadLogEntries(Registers.get("Log Registers", {}))
+            for Item in Registers.get("Strings", []):
+                for Register, Value in Item.items():
+                    self.SetString(Register, Value)
+            for Item in Registers.get("FileData", []):
+                for Register, Value in Item.items():
+                    self.SetFileRecord(Register, Value)
+        else:
+            # ModbusFile JSON format
+            for Register, Value in Registers.items():
+                self.SetHexValue(Register, Value)
+            for Register, Value in Data.get("Strings", {}).items():
+                self.SetString(Register, Value)
+            for Register, Value in Data.get("FileData", {}).items():
+                self.SetFileRecord(Register, Value)
+        return True
+
+    # ---------- RegisterMap::LoadLogEntries------------------------------------
+    # raw log output is a list of "register:value" strings at any depth
+    def LoadLogEntries(self, Item):
+        if isinstance(Item, dict):
+            for Value in Item.values():
+                self.LoadLogEntries(Value)
+        elif isinstance(Item, list):
+            for Value in Item:
+                self.LoadLogEntries(Value)
+        elif isinstance(Item, str) and ":" in Item:
+            Register, Value = Item.split(":", 1)
+            try:
+                self.SetHexValue(Register.strip(), Value.strip())
+            except ValueError:
+                pass
+
+    # ---------- RegisterMap::LoadText------------------------------------------
+    # same format as ModbusFile.ReadInputFile
+    def LoadText(self, Text):
+        REGISTERS = 0
+        STRINGS = 1
+        FILE_DATA = 2
+
+        Section = REGISTERS
+        for line in Text.splitlines():
+            line = line.strip()
+            if not len(line) or line[0] == "#":
+                continue
+            if "Strings :" in line:
+                Section = STRINGS
+            elif "FileData :" in line:
+                Section = FILE_DATA
+            if Section == REGISTERS:
+                line = line.replace("\t", " ").replace(" : ", ":")
+                for entry in line.split(" "):
+                    RegEntry = entry.split(":")
+                    if len(RegEntry) == 2 and len(RegEntry[0]) and len(RegEntry[1]):
+                        try:
+                            self.SetHexValue(RegEntry[0], RegEntry[1])
+                        except ValueError:
+                            continue
+            else:
+                Items = line.split(" : ")
+                if len(Items) != 2:
+                    continue
+                try:
+                    if Section == STRINGS:
+                        self.SetString(Items[0], Items[1])
+                    else:
+                        self.SetFileRecord(Items[0], Items[1])
+                except ValueError:
+                    continue
+        return True
+
+
+# ------------ ModbusSimulator class --------------------------------------------
+class ModbusSimulator(object):
+    def __init__(
+        self,
+        registers,
+        address=0x9D,
+        modbustcp=False,
+        latency=0.0,
+        jitter=0.0,
+        crcerror=0.0,
+        dropbyte=0.0,
+        seed=None,
+        verbose=False,
+    ):
+        self.Registers = registers
+        self.Address = address
+        self.ModbusTCP = modbustcp
+        self.Latency = latency  # seconds
+        self.Jitter = jitter  # seconds
+        self.CrcErrorRate = crcerror  # probability 0.0 - 1.0
+        self.DropByteRate = dropbyte  # probability 0.0 - 1.0
+        self.Random = random.Random(seed)
+        self.Verbose = verbose
+        self.ModbusCrc = crcmod.predefined.mkCrcFun("modbus")
+        self.Stats = collections.OrderedDict()
+        for Name in [
+            "Requests",
+            "Responses",
+            "Exceptions",
+            "Bad Requests",
+            "Injected CRC Errors",
+            "Injected Dropped Bytes",
+        ]:
+            self.Stats[Name] = 0
+        self.StatsLock = threading.Lock()
+
+    # ---------- ModbusSimulator::Count-----------------------------------------
+    def Count(self, Name):
+        with self.StatsLock:
+            self.Stats[Name] += 1
+
+    # ---------- ModbusSimulator::GetCRC----------------------------------------
+    def GetCRC(self, Packet):
+        if sys.version_info[0] < 3:
+            return self.ModbusCrc(str(bytearray(Packet)))
+        return self.ModbusCrc(bytes(bytearray(Packet)))
+
+    # ---------- ModbusSimulator::GetRequestLength------------------------------
+    # returns the length of the RTU request at the start of Buffer (including
+    # CRC), 0 if more data is needed to tell, None if the request is invalid
+    def GetRequestLength(self, Buffer):
+        if len(Buffer) < 2:
+            return 0
+        Command = Buffer[1]
+        if Command in [MBUS_CMD_READ_REGS, MBUS_CMD_READ_INPUT_REGS]:
+            return 8
+        if Command == MBUS_CMD_WRITE_REGS:
+            if len(Buffer) < 7:
+                return 0
+            return 7 + Buffer[6] + 2
+        if Command in [MBUS_CMD_READ_FILE, MBUS_CMD_WRITE_FILE]:
+            if len(Buffer) < 3:
+                return 0
+            return 3 + Buffer[2] + 2
+        return None
+
+    # ---------- ModbusSimulator::ProcessRequest--------------------------------
+    # Request is the PDU with the address (no CRC, no TCP header). Returns the
+    # response in the same form or None for no response
+    def ProcessRequest(self, Request):
+
+        self.Count("Requests")
+        if Request[0] != self.Address:
+            return None
+        Command = Request[1]
+        try:
+            if Command in [MBUS_CMD_READ_REGS, MBUS_CMD_READ_INPUT_REGS]:
+                Register = (Request[2] << 8) | Request[3]
+                Count = (Request[4] << 8) | Request[5]
+                if Count < 1 or Count > MAX_READ_WORDS:
+                    return self.Exception(Command, MBUS_EXCEP_DATA)
+                Words = self.Registers.ReadWords(Register, Count)
+                if Words == None:
+                    return self.Exception(Command, MBUS_EXCEP_ADDRESS)
+                Response = [self.Address, Command, Count * 2]
+                for Word in Words:
+                    Response += [Word >> 8, Word & 0xFF]
+                return Response
+            if Command == MBUS_CMD_WRITE_REGS:
+                Register = (Request[2] << 8) | Request[3]
+                Count = (Request[4] << 8) | Request[5]
+                Data = Request[7 : 7 + Request[6]]
+                if len(Data) != Count * 2:
+                    return self.Exception(Command, MBUS_EXCEP_DATA)
+                self.Registers.WriteWords(
+                    Register,
+                    [(Data[i] << 8) | Data[i + 1] for i in range(0, len(Data), 2)],
+                )
+                return list(Request[0:6])
+            if Command == MBUS_CMD_READ_FILE:
+                # only one sub request is supported, same as genmon
+                Record = (Request[6] << 8) | Request[7]
+                Count = (Request[8] << 8) | Request[9]
+                Data = self.Registers.ReadFile(Record, Count)
+                if Data == None:
+                    return self.Exception(Command, MBUS_EXCEP_ADDRESS)
+                return [
+                    self.Address,
+                    Command,
+                    len(Data) + 2,
+                    len(Data) + 1,
+                    MBUS_FILE_TYPE_VALUE,
+                ] + Data
+            if Command == MBUS_CMD_WRITE_FILE:
+                Record = (Request[6] << 8) | Request[7]
+                Count = (Request[8] << 8) | Request[9]
+                self.Registers.WriteFile(Record, Request[10 : 10 + Count * 2])
+                return list(Request)
+        except IndexError:
+            self.Count("Bad Requests")
+            return None
+        return self.Exception(Command, MBUS_EXCEP_FUNCTION)
+
+    # ---------- ModbusSimulator::Exception-------------------------------------
+    def Exception(self, Command, Code):
+        self.Count("Exceptions")
+        return [self.Address, Command | MBUS_ERROR_BIT, Code]
+
+    # ---------- ModbusSimulator::Frame-----------------------------------------
+    # add the CRC (RTU) or MBAP header (TCP) and inject errors
+    def Frame(self, Response, TransactionID=None):
+
+        if TransactionID == None:
+            CRCValue = self.GetCRC(Response)
+            if self.CrcErrorRate and self.Random.random() < self.CrcErrorRate:
+                self.Count("Injected CRC Errors")
+                CRCValue ^= 0xFFFF
+            Packet = Response + [CRCValue & 0xFF, CRCValue >> 8]
+        else:
+            Packet = [
+                TransactionID >> 8,
+                TransactionID & 0xFF,
+                0,
+                0,
+                len(Response) >> 8,
+                len(Response) & 0xFF,
+            ] + Response
+        if self.DropByteRate and self.Random.random() < self.DropByteRate:
+            self.Count("Injected Dropped Bytes")
+            del Packet[self.Random.randrange(len(Packet))]
+        return bytearray(Packet)
+
+    # ---------- ModbusSimulator::Delay-----------------------------------------
+    def Delay(self):
+        DelayTime = self.Latency
+        if self.Jitter:
+            DelayTime += self.Random.uniform(-self.Jitter, self.Jitter)
+        if DelayTime > 0:
+            time.sleep(DelayTime)
+
+    # ---------- ModbusSimulator::ProcessRTUStream------------------------------
+    # Buffer is a bytearray of received data, returns a list of responses and
+    # removes processed requests from Buffer
+    def ProcessRTUStream(self, Buffer):
+
+        Responses = []
+        while len(Buffer):
+            Length = self.GetRequestLength(Buffer)
+            if Length == None:
+                # not a request we understand, resync one byte at a time
+                self.Count("Bad Requests")
+                del Buffer[0]
+                continue
+            if Length == 0 or len(Buffer) < Length:
+                break
+            Request = list(Buffer[:Length])
+            CRCValue = self.GetCRC(Request[:-2])
+            if Request[-2] != (CRCValue & 0xFF) or Request[-1] != (CRCValue >> 8):
+                # a real slave ignores requests with a bad CRC
+                self.Count("Bad Requests")
+                del Buffer[0]
+                continue
+            del Buffer[:Length]
+            Response = self.ProcessRequest(Request[:-2])
+            if Response != None:
+                Responses.append(self.Frame(Response))
+        return Responses
+
+    # ---------- ModbusSimulator::ProcessTCPStream------------------------------
+    def ProcessTCPStream(self, Buffer):
+
+        Responses = []
+        while len(Buffer) >= MODBUS_TCP_HEADER_SIZE:
+            Length = (Buffer[4] << 8) | Buffer[5]
+            if len(Buffer) < MODBUS_TCP_HEADER_SIZE + Length:
+                break
+            TransactionID = (Buffer[0] << 8) | Buffer[1]
+            Request = list(
+                Buffer[MODBUS_TCP_HEADER_SIZE : MODBUS_TCP_HEADER_SIZE + Length]
+            )
+            del Buffer[: MODBUS_TCP_HEADER_SIZE + Length]
+            if len(Request) < 2:
+                self.Count("Bad Requests")
+                continue
+            Response = self.ProcessRequest(Request)
+            if Response != None:
+                Responses.append(self.Frame(Response, TransactionID=TransactionID))
+        return Responses
+
+    # ---------- ModbusSimulator::Serve-----------------------------------------
+    # serve requests from a file descriptor or socket until it is closed
+    def Serve(self, Read, Write, ModbusTCP=False):
+
+        Buffer = bytearray()
+        while True:
+            Data = Read()
+            if not Data:
+                return
+            Buffer.extend(bytearray(Data))
+            if ModbusTCP:
+                Responses = self.ProcessTCPStream(Buffer)
+            else:
+                Responses = self.ProcessRTUStream(Buffer)
+            for Response in Responses:
+                self.Delay()
+                Write(bytes(Response))
+                self.Count("Responses")
+                if self.Verbose:
+                    print("TX: " + " ".join("%02x" % b for b in bytearray(Response)))
+
+    # ---------- ModbusSimulator::ServePTY--------------------------------------
+    def ServePTY(self, LinkName=None):
+
+        import pty
+        import tty
+
+        Master, Slave = pty.openpty()
+        tty.setraw(Slave)
+        SlaveName = os.ttyname(Slave)
+        if LinkName != None:
+            if os.path.islink(LinkName):
+                os.unlink(LinkName)
+            os.symlink(SlaveName, LinkName)
+            SlaveName = LinkName
+        print("Serving Modbus RTU on %s" % SlaveName)
+
+        def ReadPTY():
+            while True:
+                select.select([Master], [], [])
+                try:
+                    return os.read(Master, 1024)
+                except OSError:
+                    # no client has the port open
+                    time.sleep(0.1)
+
+        def WritePTY(Data):
+            os.write(Master, Data)
+
+        self.Serve(ReadPTY, WritePTY)
+
+    # ---------- ModbusSimulator::ServeTCP--------------------------------------
+    def ServeTCP(self, Port, Host="127.0.0.1", ModbusTCP=False):
+
+        Server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        Server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        Server.bind((Host, Port))
+        Server.listen(5)
+        print(
+            "Serving %s on %s:%d"
+            % ("Modbus TCP" if ModbusTCP else "Modbus RTU over TCP", Host, Port)
+        )
+        while True:
+            Connection, ClientAddress = Server.accept()
+            Connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            print("Connection from %s:%d" % ClientAddress)
+            Thread = threading.Thread(
+                target=self.ServeConnection, args=(Connection, ModbusTCP)
+            )
+            Thread.daemon = True
+            Thread.start()
+
+    # ---------- ModbusSimulator::ServeConnection-------------------------------
+    def ServeConnection(self, Connection, ModbusTCP):
+        def ReadSocket():
+            try:
+                return Connection.recv(1024)
+            except socket.error:
+                return None
+
+        try:
+            self.Serve(ReadSocket, Connection.sendall, ModbusTCP=ModbusTCP)
+        except socket.error:
+            pass
+        finally:
+            Connection.close()
+
+    # ---------- ModbusSimulator::GetStatsString--------------------------------
+    def GetStatsString(self):
+        with self.StatsLock:
+            return ", ".join("%s: %d" % (k, v) for k, v in self.Stats.items())
+
+
+# ------------------- Command-line interface for simulator ---------------------#
+if __name__ == "__main__":  #
+
+    InputFile = None
+    LinkName = None
+    TCPport = None
+    ModbusTCP = False
+    Address = 0x9D
+    Latency = 0.0
+    Jitter = 0.0
+    CrcError = 0.0
+    DropByte = 0.0
+    Seed = None
+    ZeroFill = False
+    Verbose = False
+
+    HelpStr = "\npython3 modbussim.py -f <register dump> [-l <link name>] [-t <tcp port> [-m]] [options]\n"
+    HelpStr += (
+        "\n   Example: python3 modbussim.py -f modbusregs.txt -l /tmp/ttyGEN -d 20 -j 5"
+    )
+    HelpStr += "\n   Example: python3 modbussim.py -f allregs.json -t 8899 -m -c 0.01\n"
+    HelpStr += "\n      -f  Register dump: modbusregs.txt format, simulation JSON file or allregs_json output"
+    HelpStr += "\n      -l  Create a symbolic link to the pseudo terminal with this name (RTU over pty)"
+    HelpStr += (
+        "\n      -t  Listen on this localhost TCP port instead of a pseudo terminal"
+    )
+    HelpStr += (
+        "\n      -m  Use Modbus TCP on the TCP port, if omitted use Modbus RTU over TCP"
+    )
+    HelpStr += "\n      -a  Modbus address in hexidecimal (default 9d)"
+    HelpStr += "\n      -d  Response latency in milliseconds"
+    HelpStr += "\n      -j  Response jitter in milliseconds (+/-)"
+    HelpStr += "\n      -c  Probability (0.0 - 1.0) of sending a response with a bad CRC (RTU only)"
+    HelpStr += "\n      -x  Probability (0.0 - 1.0) of dropping one byte of a response"
+    HelpStr += "\n      -s  Random seed, use for repeatable error injection"
+    HelpStr += "\n      -z  Return zero for registers not in the dump instead of a modbus exception"
+    HelpStr += "\n      -v  Print each response"
+    HelpStr += "\n \n"
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hmzvf:l:t:a:d:j:c:x:s:")
+    except getopt.GetoptError:
+        print(HelpStr)
+        sys.exit(2)
+
+    try:
+        for opt, arg in opts:
+            if opt == "-h":
+                print(HelpStr)
+                sys.exit()
+            elif opt == "-f":
+                InputFile = arg
+            elif opt == "-l":
+                LinkName = arg
+            elif opt == "-t":
+                TCPport = int(arg)
+            elif opt == "-m":
+                ModbusTCP = True
+            elif opt == "-a":
+                Address = int(arg, 16)
+            elif opt == "-d":
+                Latency = float(arg) / 1000.0
+            elif opt == "-j":
+                Jitter = float(arg) / 1000.0
+            elif opt == "-c":
+                CrcError = float(arg)
+            elif opt == "-x":
+                DropByte = float(arg)
+            elif opt == "-s":
+                Seed = int(arg)
+            elif opt == "-z":
+                ZeroFill = True
+            elif opt == "-v":
+                Verbose = True
+    except Exception as e1:
+        print("Error parsing command line: " + str(e1))
+        print(HelpStr)
+        sys.exit(2)
+
+    if InputFile == None:
+        print(HelpStr)
+        sys.exit(2)
+
+    Registers = RegisterMap(zerofill=ZeroFill)
+    try:
+        Registers.Load(InputFile)
+    except Exception as e1:
+        print("Error loading register dump: " + str(e1))
+        sys.exit(2)
+    print(
+        "Loaded %d registers and %d file records from %s"
+        % (len(Registers.Words), len(Registers.Files), InputFile)
+    )
+
+    Simulator = ModbusSimulator(
+        Registers,
+        address=Address,
+        latency=Latency,
+        jitter=Jitter,
+        crcerror=CrcError,
+        dropbyte=DropByte,
+        seed=Seed,
+        verbose=Verbose,
+    )
+    ExitCode = 0
+    try:
+        if TCPport != None:
+            Simulator.ServeTCP(TCPport, ModbusTCP=ModbusTCP)
+        else:
+            Simulator.ServePTY(LinkName=LinkName)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e1:
+        print("Error in simulator: " + str(e1))
+        ExitCode = 1
+    finally:
+        print("\n" + Simulator.GetStatsString())
+        if LinkName != None and os.path.islink(LinkName):
+            os.unlink(LinkName)
+    sys.exit(ExitCode)
@@ -36,7 +36,7 @@ try:
     if os.path.isdir(os.path.join(parent_root, "genmonlib")):
         sys.path.insert(1, parent_root)
 
-    from genmonlib.myclient import ClientInterface
+    from genmonlib.myclient import ClientInterface, ClientSubscription
     from genmonlib.mycommon import MyCommon
     from genmonlib.myconfig import MyConfig
     from genmonlib.mylog import SetupLogger
@@ -103,6 +103,19 @@ class MyGenPush(MySupport):
 
         try:
             self.Generator = ClientInterface(host=host, port=port, log=log)
+            if not self.UseNumeric:
+                self.Commands = ["status_json", "maint_json", "outage_json", "monitor_json"]
+            else:
+                self.Commands = [
+                    "status_num_json",
+                    "maint_num_json",
+                    "outage_num_json",
+                    "monitor_num_json",
+                ]
+            # genmon pushes changes on this connection, see MainPollingThread
+            self.Subscription = ClientSubscription(
+                self.Commands[:3], host=host, port=port, log=log
+            )
 
             self.GetGeneratorStartInfo()
             # start thread to accept incoming sockets for nagios heartbeat
@@ -205,40 +218,66 @@ class MyGenPush(MySupport):
 
         return data
 
+    # ---------- MyGenPush::SendBatchCommand------------------------------------
+    # returns a dict of command name : response, see
+    # ClientInterface::ProcessBatchCommand
+    def SendBatchCommand(self, CommandList):
+
+        try:
+            with self.AccessLock:
+                return self.Generator.ProcessBatchCommand(CommandList)
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error calling ProcessBatchCommand: "
+                + str(CommandList)
+                + ": "
+                + str(e1)
+            )
+            return {}
+
     # ---------- MyGenPush::MainPollingThread-----------------------------------
+    # genmon pushes changes to the subscription, if genmon does not support
+    # subscriptions (or the connection fails) the data is polled. The latest
+    # data is kept in Responses and checked for changes at most once every
+    # PollTime seconds so the flush interval still applies. The monitor
+    # output is mostly run time and counters, which genmon does not push
+    # on their own, so it is read at each check.
     def MainPollingThread(self):
 
+        Responses = {}
+        NextCheck = time.time()
         while True:
             try:
-
-                if not self.UseNumeric:
-                    statusdata = self.SendCommand("generator: status_json")
-                    maintdata = self.SendCommand("generator: maint_json")
-                    outagedata = self.SendCommand("generator: outage_json")
-                    monitordata = self.SendCommand("generator: monitor_json")
+                Messages = self.Subscription.Receive(max(0, NextCheck - time.time()))
+                if Messages == None:
+                    Responses = self.SendBatchCommand(self.Commands)
                 else:
-                    statusdata = self.SendCommand("generator: status_num_json")
-                    maintdata = self.SendCommand("generator: maint_num_json")
-                    outagedata = self.SendCommand("generator: outage_num_json")
-                    monitordata = self.SendCommand("generator: monitor_num_json")
-
-                try:
-                    GenmonDict = {}
-                    TempDict = {}
-                    TempDict = json.loads(statusdata)
-                    GenmonDict["Status"] = TempDict["Status"]
-                    TempDict = json.loads(maintdata)
-                    GenmonDict["Maintenance"] = TempDict["Maintenance"]
-                    TempDict = json.loads(outagedata)
-                    GenmonDict["Outage"] = TempDict["Outage"]
-                    TempDict = json.loads(monitordata)
-                    GenmonDict["Monitor"] = TempDict["Monitor"]
-                    self.CheckDictForChanges(GenmonDict, "generator")
-
-                except Exception as e1:
-                    self.LogErrorLine("Unable to get status: " + str(e1))
-
-                if self.WaitForExit("MainPollingThread", float(self.PollTime)):
+                    for Topic, Data in Messages:
+                        Responses[Topic] = Data
+
+                if time.time() >= NextCheck:
+                    NextCheck = time.time() + float(self.PollTime)
+                    if Messages != None:
+                        Responses.update(self.SendBatchCommand(self.Commands[3:]))
+                    if all(Command in Responses for Command in self.Commands):
+                        try:
+                            GenmonDict = {}
+                            GenmonDict["Status"] = Responses[self.Commands[0]]["Status"]
+                            GenmonDict["Maintenance"] = Responses[self.Commands[1]][
+                                "Maintenance"
+                            ]
+                            GenmonDict["Outage"] = Responses[self.Commands[2]]["Outage"]
+                            GenmonDict["Monitor"] = Responses[self.Commands[3]]["Monitor"]
+                            self.CheckDictForChanges(GenmonDict, "generator")
+
+                        except Exception as e1:
+                            self.LogErrorLine("Unable to get status: " + str(e1))
+
+                if Messages == None:
+                    Timeout = max(0, NextCheck - time.time())
+                else:
+                    Timeout = 0
+                if self.WaitForExit("MainPollingThread", Timeout):
                     return
             except Exception as e1:
                 self.LogErrorLine("Error in mynotify:MainPollingThread: " + str(e1))
@@ -331,6 +370,7 @@ class MyGenPush(MySupport):
     def Close(self):
         self.Exiting = True
         self.KillThread("MainPollingThread")
+        self.Subscription.Close()
         self.Generator.Close()
 
 
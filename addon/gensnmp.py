@@ -665,6 +665,23 @@ class GenSNMP(MySupport):
 
         return data
 
+    # ---------- GenSNMP::SendBatchCommand--------------------------------------
+    # returns a dict of command name : response, see
+    # ClientInterface::ProcessBatchCommand
+    def SendBatchCommand(self, CommandList):
+
+        try:
+            with self.AccessLock:
+                return self.Generator.ProcessBatchCommand(CommandList)
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error calling ProcessBatchCommand: "
+                + str(CommandList)
+                + ": "
+                + str(e1)
+            )
+            return {}
+
     # ---------- GenSNMP::SNMPThread--------------------------------------------
     def SNMPThread(self):
 
@@ -673,26 +690,22 @@ class GenSNMP(MySupport):
         while True:
             try:
                 if not self.UseNumeric:
-                    statusdata = self.SendCommand("generator: status_json")
-                    maintdata = self.SendCommand("generator: maint_json")
-                    outagedata = self.SendCommand("generator: outage_json")
-                    monitordata = self.SendCommand("generator: monitor_json")
+                    Commands = ["status_json", "maint_json", "outage_json", "monitor_json"]
                 else:
-                    statusdata = self.SendCommand("generator: status_num_json")
-                    outagedata = self.SendCommand("generator: outage_num_json")
-                    monitordata = self.SendCommand("generator: monitor_num_json")
-                    maintdata = self.SendCommand("generator: maint_num_json")
+                    Commands = [
+                        "status_num_json",
+                        "maint_num_json",
+                        "outage_num_json",
+                        "monitor_num_json",
+                    ]
+                Responses = self.SendBatchCommand(Commands)
+
                 try:
                     GenmonDict = {}
-                    TempDict = {}
-                    TempDict = json.loads(statusdata)
-                    GenmonDict["Status"] = TempDict["Status"]
-                    TempDict = json.loads(maintdata)
-                    GenmonDict["Maintenance"] = TempDict["Maintenance"]
-                    TempDict = json.loads(outagedata)
-                    GenmonDict["Outage"] = TempDict["Outage"]
-                    TempDict = json.loads(monitordata)
-                    GenmonDict["Monitor"] = TempDict["Monitor"]
+                    GenmonDict["Status"] = Responses[Commands[0]]["Status"]
+                    GenmonDict["Maintenance"] = Responses[Commands[1]]["Maintenance"]
+                    GenmonDict["Outage"] = Responses[Commands[2]]["Outage"]
+                    GenmonDict["Monitor"] = Responses[Commands[3]]["Monitor"]
                     self.CheckDictForChanges(GenmonDict, "home")
 
                     if self.WaitForExit("SNMPThread", float(self.PollTime)):
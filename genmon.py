@@ -30,11 +30,21 @@ try:
     from genmonlib.generac_evolution import Evolution
     from genmonlib.generac_HPanel import HPanel
     from genmonlib.generac_powerzone import PowerZone
+    from genmonlib.mycommandserver import MyCommandServer
     from genmonlib.myconfig import MyConfig
     from genmonlib.mylog import SetupLogger
     from genmonlib.mymail import MyMail
     from genmonlib.mypipe import MyPipe
     from genmonlib.myplatform import MyPlatform
+    from genmonlib.mysocketprotocol import (
+        END_OF_MESSAGE,
+        PROTOCOL_FRAMED,
+        PROTOCOL_TEXT,
+        FrameReader,
+        GetJSONPath,
+        PackFrame,
+        ParseProtocolCommand,
+    )
     from genmonlib.mysupport import MySupport
     from genmonlib.mythread import MyThread
     from genmonlib.myweather import MyWeather
@@ -51,6 +61,63 @@ except Exception as e1:
 
 GENMON_VERSION = "V1.18.18"
 
+# socket commands with cached responses, see Monitor::GetCachedResponse
+CACHED_COMMANDS = [
+    "status_json",
+    "status_num_json",
+    "maint_json",
+    "maint_num_json",
+    "outage_json",
+    "outage_num_json",
+    "monitor_json",
+    "monitor_num_json",
+    "gui_status_json",
+]
+RESPONSE_CACHE_MAX_AGE = 1.0  # seconds, limits the age of times and counters in a cached response
+# socket commands that can be sent in a batch_json command, see Monitor::ProcessBatchCommand
+BATCH_COMMANDS = CACHED_COMMANDS + [
+    "alarms_json",
+    "weather_json",
+    "start_info_json",
+    "get_maint_log_json",
+    "registers_json",
+    "allregs_json",
+    "logs_json",
+    "getreglabels_json",
+    "getbase",
+    "gethealth",
+    "getsitename",
+    "getdebug",
+]
+BATCH_MAX_ATTEMPTS = 3  # times a batch is built again if the data changes while it is built
+# subscription topics (see Monitor::PublishThread) are a name below or a
+# command in BATCH_COMMANDS, optionally followed by a JSON path, e.g.
+# "maint/Maintenance/Fuel Level State"
+SUBSCRIPTION_TOPICS = {
+    "base": "getbase",
+    "status": "status_json",
+    "outage": "outage_json",
+    "alarms": "alarms_json",
+    "maint": "maint_json",
+    "monitor": "monitor_json",
+}
+PUBLISH_MIN_INTERVAL = 1.0  # seconds between checks of subscribed topics for changes
+PUBLISH_MAX_INTERVAL = 10.0  # seconds, topics are checked at least this often
+# values that change with time alone, a topic is not published again if only
+# these changed
+PUBLISH_VOLATILE_KEYS = [
+    "Run time",
+    "System Time",
+    "System Uptime",
+    "CPU Utilization",
+    "CPU Temperature",
+    "WLAN Signal Level",
+    "Packet Count",
+    "Packets Per Second",
+    "Average Transaction Time",
+    "Serial Data Rate",
+]
+
 # ------------ Monitor class ----------------------------------------------------
 class Monitor(MySupport):
     def __init__(self, ConfigFilePath=ProgramDefaults.ConfPath):
@@ -70,6 +137,9 @@ class Monitor(MySupport):
         # defautl values
         self.SiteName = "Home"
         self.ServerSocket = None
+        self.CommandServer = None  # MyCommandServer, None if using a thread per connection
+        self.ServerMaxConnections = 32
+        self.ServerWorkers = 4
         self.ServerIPAddress = ""
         self.ServerSocketPort = (
             ProgramDefaults.ServerPort
@@ -97,6 +167,12 @@ class Monitor(MySupport):
         self.bDisablePlatformStats = False
         self.ReadOnlyEmailCommands = False
         self.SlowCPUOptimization = False
+        self.ResponseCache = {}  # command : (data generation, time, response)
+        self.ResponseCacheLocks = {}  # command : lock held while the response is built
+        self.ResponseCacheLock = threading.Lock()
+        self.CommandGeneration = 0  # incremented after each command with parameters
+        self.PublishEvent = threading.Event()  # set when subscribed data may have changed
+        self.LastPublished = {}  # topic : last data published (JSON, see RemoveVolatileKeys)
         # weather parameters
         self.WeatherAPIKey = None
         self.WeatherLocation = None
@@ -273,6 +349,7 @@ class Monitor(MySupport):
                     config=self.config,
                 )
             self.Threads = self.MergeDicts(self.Threads, self.Controller.Threads)
+            self.Controller.ChangeCallback = self.DataChanged
 
         except Exception as e1:
             self.LogErrorLine("Error opening controller device: " + str(e1))
@@ -309,6 +386,11 @@ class Monitor(MySupport):
             # start thread to accept incoming sockets for nagios heartbeat
             self.Threads["ComWatchDog"] = MyThread(self.ComWatchDog, Name="ComWatchDog")
 
+            if MyCommandServer.Supported:
+                self.Threads["PublishThread"] = MyThread(
+                    self.PublishThread, Name="PublishThread"
+                )
+
             if self.bSyncDST or self.bSyncTime:  # Sync time thread
                 self.Threads["TimeSyncThread"] = MyThread(
                     self.TimeSyncThread, Name="TimeSyncThread"
@@ -359,6 +441,12 @@ class Monitor(MySupport):
                 )
 
             self.ServerIPAddress = self.config.ReadValue("genmon_server_address", default = "")
+            self.ServerMaxConnections = self.config.ReadValue(
+                "server_max_connections", return_type=int, default=32
+            )
+            self.ServerWorkers = self.config.ReadValue(
+                "server_workers", return_type=int, default=4
+            )
 
             self.LogLocation = self.config.ReadValue(
                 "loglocation", default=ProgramDefaults.LogPath
@@ -827,6 +915,11 @@ class Monitor(MySupport):
                     True,
                 ],
                 "power_log_clear": [self.Controller.ClearPowerLog, (), True],
+                "fuel_log_json": [
+                    self.Controller.GetFuelHistory,
+                    (command.lower(),),
+                    True,
+                ],
                 "fuel_log_clear": [self.Controller.ClearFuelLog, (), True],
                 "start_info_json": [self.GetStartInfo, (), True],
                 "registers_json": [
@@ -850,6 +943,7 @@ class Monitor(MySupport):
                 "outage_json": [self.Controller.DisplayOutage, (True,), True],
                 "outage_num_json": [self.Controller.DisplayOutage, (True, True), True],
                 "gui_status_json": [self.GetStatusForGUI, (), True],
+                "alarms_json": [self.GetAlarmStatus, (), True],
                 "get_maint_log_json": [self.Controller.GetMaintLogJSON, (), True],
                 "add_maint_log": [
                     self.Controller.AddEntryToMaintLog,
@@ -899,6 +993,7 @@ class Monitor(MySupport):
                 "getreglabels_json": [self.Controller.GetRegisterLabels, (), True],
                 "set_button_command": [self.Controller.SetCommandButton, (command,), True]
             }
+            CommandDict["batch_json"] = [self.ProcessBatchCommand, (command.lower(), CommandDict), True]
 
             CommandList = command.split(" ")
         except Exception as e1:
@@ -932,7 +1027,13 @@ class Monitor(MySupport):
                 if not fromsocket and ExecList[2]:
                     continue
                 # Execute Command
-                ReturnMessage = ExecList[0](*ExecList[1])
+                if fromsocket and LookUp.lower() in CACHED_COMMANDS:
+                    ReturnMessage = self.GetCachedResponse(LookUp.lower(), ExecList)
+                else:
+                    ReturnMessage = ExecList[0](*ExecList[1])
+                    if "=" in item and LookUp.lower() != "batch_json":
+                        # the command may have changed a setting
+                        self.CommandGeneration += 1
 
                 ValidCommand = True
 
@@ -957,6 +1058,95 @@ class Monitor(MySupport):
             msgbody += "EndOfMessage"
             return msgbody
 
+    # ------------ Monitor::GetResponseGeneration -------------------------------
+    # changes when anything used to build a response may have changed
+    def GetResponseGeneration(self):
+        return (self.Controller.GetDataGeneration(), self.CommandGeneration)
+
+    # ------------ Monitor::GetCachedResponse -----------------------------------
+    # returns the JSON response for Command. The response is built again only
+    # if register values or external data have changed, a command with
+    # parameters was run or the cached response is RESPONSE_CACHE_MAX_AGE
+    # seconds old. Requests for a command that arrive while its response is
+    # being built wait for it and share it.
+    def GetCachedResponse(self, Command, ExecList):
+        return self.GetCachedEntry(Command, ExecList)[0]
+
+    # ------------ Monitor::GetCachedEntry --------------------------------------
+    # returns (response, True if the response is JSON encoded) for Command,
+    # see GetCachedResponse
+    def GetCachedEntry(self, Command, ExecList):
+
+        Generation = self.GetResponseGeneration()
+        with self.ResponseCacheLock:
+            CommandLock = self.ResponseCacheLocks.get(Command, None)
+            if CommandLock == None:
+                CommandLock = self.ResponseCacheLocks[Command] = threading.Lock()
+
+        with CommandLock:
+            Entry = self.ResponseCache.get(Command, None)
+            if (
+                Entry != None
+                and Entry[0] == Generation
+                and (time.time() - Entry[1]) < RESPONSE_CACHE_MAX_AGE
+            ):
+                return Entry[2], Entry[3]
+            ReturnMessage = ExecList[0](*ExecList[1])
+            IsJSON = not isinstance(ReturnMessage, str)
+            if IsJSON:
+                ReturnMessage = json.dumps(ReturnMessage, sort_keys=False)
+            self.ResponseCache[Command] = (Generation, time.time(), ReturnMessage, IsJSON)
+            return ReturnMessage, IsJSON
+
+    # ------------ Monitor::ProcessBatchCommand ---------------------------------
+    # batch_json=command1,command2,... returns one JSON object with the
+    # response to each command (see BATCH_COMMANDS), keyed by command name.
+    # JSON responses are included as JSON, other responses as strings.
+    # The batch is built again if register values or external data change
+    # while it is built so all responses are from the same data.
+    def ProcessBatchCommand(self, command, CommandDict):
+
+        try:
+            if not "=" in command:
+                return "Error in batch_json: no commands"
+            Commands = []
+            for Name in command.split("=", 1)[1].split(","):
+                Name = Name.strip()
+                if not len(Name) or Name in Commands:
+                    continue
+                if Name not in BATCH_COMMANDS or Name not in CommandDict:
+                    return "Error in batch_json: invalid command: " + Name
+                Commands.append(Name)
+
+            for Attempt in range(BATCH_MAX_ATTEMPTS):
+                Generation = self.GetResponseGeneration()
+                Items = []
+                for Name in Commands:
+                    ExecList = CommandDict[Name]
+                    if Name in CACHED_COMMANDS:
+                        Response, IsJSON = self.GetCachedEntry(Name, ExecList)
+                    else:
+                        Response = ExecList[0](*ExecList[1])
+                        IsJSON = not isinstance(Response, str)
+                        if IsJSON:
+                            Response = json.dumps(Response, sort_keys=False)
+                    if not IsJSON and Name.endswith("_json"):
+                        # some _json commands return JSON text
+                        try:
+                            json.loads(Response)
+                            IsJSON = True
+                        except ValueError:
+                            pass
+                    if not IsJSON:
+                        Response = json.dumps(Response)
+                    Items.append(json.dumps(Name) + ": " + Response)
+                if self.GetResponseGeneration() == Generation:
+                    break
+            return "{" + ", ".join(Items) + "}"
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessBatchCommand: " + str(e1))
+            return "Error in batch_json: " + str(e1)
+
     # ------------ Monitor::DisplayHelp -----------------------------------------
     def DisplayHelp(self):
 
@@ -1480,30 +1670,36 @@ class Monitor(MySupport):
 
         try:
 
-            statusstr = ""
-            if self.Controller == None:
-                outstr = "WARNING: System Initializing"
-                conn.sendall(outstr.encode())
-            else:
-                if self.Controller.SystemInAlarm():
-                    statusstr += "CRITICAL: System in alarm! "
-                HealthStr = self.GetSystemHealth()
-                if HealthStr != "OK":
-                    statusstr += "WARNING: " + HealthStr
-                if statusstr == "":
-                    statusstr = "OK "
-
-                outstr = statusstr + ": " + self.Controller.GetOneLineStatus()
-                conn.sendall(outstr.encode())
+            conn.sendall(self.GetConnectStatus().encode())
 
+            Protocol = PROTOCOL_TEXT
+            Compress = False
+            Reader = FrameReader()
             while True:
                 try:
                     data = conn.recv(2098152)  # max json string size plus 1000
                     if len(data):
-                        if self.Controller == None:
-                            outstr = "Retry, System Initializing"
-                        else:
-                            outstr = self.ProcessCommand(data, True)
+                        if Protocol == PROTOCOL_FRAMED:
+                            for RequestID, command in Reader.Add(data):
+                                outstr = self.ProcessSocketCommand(command)
+                                if outstr.endswith(END_OF_MESSAGE):
+                                    outstr = outstr[: -len(END_OF_MESSAGE)]
+                                conn.sendall(
+                                    PackFrame(outstr.encode("utf-8"), RequestID, Compress)
+                                )
+                            continue
+                        Request = ParseProtocolCommand(data.decode("utf-8", "ignore"))
+                        if Request != None:
+                            # the response is sent with the current protocol
+                            if Request[0] == PROTOCOL_FRAMED:
+                                Protocol = PROTOCOL_FRAMED
+                                Compress = Request[1]
+                                outstr = "protocol=2" + (",compress" if Compress else "")
+                            else:
+                                outstr = "protocol=1"
+                            conn.sendall((outstr + END_OF_MESSAGE).encode("utf-8"))
+                            continue
+                        outstr = self.ProcessSocketCommand(data)
                         conn.sendall(outstr.encode("utf-8"))
                     else:
                         # socket closed remotely
@@ -1512,6 +1708,10 @@ class Monitor(MySupport):
                     if self.IsStopping:
                         break
                     continue
+                except ValueError as e1:
+                    # invalid frame, the connection can not be resynchronized
+                    self.LogError("Error in SocketWorkThread: " + str(e1))
+                    break
                 except socket.error as msg:
                     try:
                         self.ConnectionList.remove(conn)
@@ -1531,9 +1731,166 @@ class Monitor(MySupport):
             pass
         # end SocketWorkThread
 
+    # ----------  Monitor::GetAlarmStatus---------------------------------------
+    def GetAlarmStatus(self):
+
+        Alarms = collections.OrderedDict()
+        Alarms["Alarms"] = []
+        try:
+            InAlarm = self.Controller.SystemInAlarm()
+            Alarms["Alarms"].append({"System In Alarm": "Yes" if InAlarm else "No"})
+            Alarms["Alarms"].append(
+                {"Alarm State": self.Controller.GetAlarmState() if InAlarm else ""}
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in GetAlarmStatus: " + str(e1))
+        return Alarms
+
+    # ----------  Monitor::DataChanged------------------------------------------
+    # called by the controller when data changes and when a client subscribes
+    def DataChanged(self):
+        self.PublishEvent.set()
+
+    # ----------  Monitor::GetTopicCommand--------------------------------------
+    # returns (command, JSON path list) for a subscription topic
+    def GetTopicCommand(self, Topic):
+
+        Items = Topic.split("/")
+        return SUBSCRIPTION_TOPICS.get(Items[0], Items[0]), Items[1:]
+
+    # ----------  Monitor::IsValidTopic-----------------------------------------
+    def IsValidTopic(self, Topic):
+
+        Command, Path = self.GetTopicCommand(Topic)
+        if Command not in BATCH_COMMANDS:
+            return False
+        for Key in Path:
+            if not len(Key):
+                return False
+        return True
+
+    # ----------  Monitor::PublishThread----------------------------------------
+    # Sends changes to subscribed clients. The subscribed topics are checked
+    # when the controller reports a change (UpdateRegisterList, the outage
+    # and alarm checks, external data), limited to once every
+    # PUBLISH_MIN_INTERVAL seconds, and at least every PUBLISH_MAX_INTERVAL
+    # seconds for values that change with time (e.g. outage duration).
+    def PublishThread(self):
+
+        LastPublish = 0
+        while True:
+            try:
+                self.PublishEvent.wait(PUBLISH_MAX_INTERVAL)
+                self.PublishEvent.clear()
+                Delay = max(0, PUBLISH_MIN_INTERVAL - (time.time() - LastPublish))
+                if self.WaitForExit("PublishThread", Delay):
+                    return
+                LastPublish = time.time()
+                if self.CommandServer == None or self.Controller == None:
+                    continue
+                Topics = self.CommandServer.GetTopics()
+                if not len(Topics):
+                    self.LastPublished = {}
+                    continue
+                self.PublishTopics(Topics)
+            except Exception as e1:
+                self.LogErrorLine("Error in PublishThread: " + str(e1))
+                if self.WaitForExit("PublishThread", PUBLISH_MAX_INTERVAL):
+                    return
+
+    # ----------  Monitor::PublishTopics----------------------------------------
+    # builds the data for Topics from one batch so all topics are from the
+    # same data, and passes it to the command server which sends the topics
+    # that changed
+    def PublishTopics(self, Topics):
+
+        Commands = []
+        for Topic in Topics:
+            Command, Path = self.GetTopicCommand(Topic)
+            if Command not in Commands:
+                Commands.append(Command)
+        data = self.ProcessCommand("generator: batch_json=" + ",".join(Commands), True)
+        if data.endswith("EndOfMessage"):
+            data = data[: -len("EndOfMessage")]
+        Responses = json.loads(data, object_pairs_hook=collections.OrderedDict)
+
+        Messages = {}
+        LastPublished = {}
+        for Topic in Topics:
+            Command, Path = self.GetTopicCommand(Topic)
+            Value = GetJSONPath(Responses.get(Command, None), Path)
+            Compare = json.dumps(self.RemoveVolatileKeys(Value), sort_keys=True)
+            LastPublished[Topic] = Compare
+            Message = (
+                '{"topic": ' + json.dumps(Topic) + ', "data": ' + json.dumps(Value) + "}"
+            )
+            Messages[Topic] = (Message, self.LastPublished.get(Topic, None) != Compare)
+        self.LastPublished = LastPublished
+        self.CommandServer.Publish(Messages)
+
+    # ----------  Monitor::RemoveVolatileKeys-----------------------------------
+    # returns a copy of decoded JSON output without PUBLISH_VOLATILE_KEYS, used
+    # to tell if a topic changed
+    def RemoveVolatileKeys(self, Node):
+
+        if isinstance(Node, dict):
+            return dict(
+                (Key, self.RemoveVolatileKeys(Value))
+                for Key, Value in Node.items()
+                if Key not in PUBLISH_VOLATILE_KEYS
+            )
+        if isinstance(Node, list):
+            return [self.RemoveVolatileKeys(Item) for Item in Node]
+        return Node
+
+    # ----------  Monitor::GetConnectStatus-------------------------------------
+    # returns the status line sent to a client when it connects
+    def GetConnectStatus(self):
+
+        statusstr = ""
+        if self.Controller == None:
+            return "WARNING: System Initializing"
+        if self.Controller.SystemInAlarm():
+            statusstr += "CRITICAL: System in alarm! "
+        HealthStr = self.GetSystemHealth()
+        if HealthStr != "OK":
+            statusstr += "WARNING: " + HealthStr
+        if statusstr == "":
+            statusstr = "OK "
+
+        return statusstr + ": " + self.Controller.GetOneLineStatus()
+
+    # ----------  Monitor::ProcessSocketCommand---------------------------------
+    def ProcessSocketCommand(self, command):
+
+        if self.Controller == None:
+            return "Retry, System Initializing"
+        return self.ProcessCommand(command, True)
+
     # ----------  interface for heartbeat server thread -------------------------
     def InterfaceServerThread(self):
 
+        if MyCommandServer.Supported:
+            # one event loop for all connections, commands are run by a pool
+            # of worker threads
+            try:
+                self.CommandServer = MyCommandServer(
+                    self.ServerIPAddress,
+                    self.ServerSocketPort,
+                    self.ProcessSocketCommand,
+                    self.GetConnectStatus,
+                    log=self.log,
+                    validtopic=self.IsValidTopic,
+                    onsubscribe=self.DataChanged,
+                    maxconnections=self.ServerMaxConnections,
+                    workers=self.ServerWorkers,
+                )
+            except Exception as e1:
+                self.LogErrorLine("Error starting command server: " + str(e1))
+                return
+            self.CommandServer.Serve()
+            return
+
         # create an INET, STREAMing socket
         self.ServerSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # set some socket options so we can resuse the port
@@ -1630,6 +1987,11 @@ class Monitor(MySupport):
                 pass
 
             try:
+                self.PublishEvent.set()
+                if MyCommandServer.Supported:
+                    self.KillThread("PublishThread")
+                if self.CommandServer != None:
+                    self.CommandServer.Close()
                 if self.ServerSocket != None:
                     self.ServerSocket.shutdown(socket.SHUT_RDWR)
                     self.ServerSocket.close()
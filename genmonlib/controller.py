@@ -24,8 +24,13 @@ import itertools
 import copy
 import re
 
+from genmonlib.modbusplanner import ModbusReadPlanner
+from genmonlib.myfuellog import MyFuelLog
 from genmonlib.mylog import SetupLogger
+from genmonlib.mylogwriter import MyLogWriter
 from genmonlib.myplatform import MyPlatform
+from genmonlib.mypowerlog import MyPowerLog
+from genmonlib.myregisterstore import MyRegisterStore
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
 from genmonlib.mytile import MyTile
@@ -69,7 +74,9 @@ class GeneratorController(MySupport):
         self.CheckForAlarmEvent = (
             threading.Event()
         )  # Event to signal checking for alarm
-        self.Registers = collections.OrderedDict()  # dict for registers and values
+        self.Registers = MyRegisterStore()  # register values, see myregisterstore.py
+        self.DataGeneration = 0  # incremented when external (tank, temp, CT) data is received
+        self.ChangeCallback = None  # called by NotifyChange, set by genmon
         self.Strings = (
             collections.OrderedDict()
         )  # dict for registers read a string data
@@ -81,12 +88,26 @@ class GeneratorController(MySupport):
         self.MaintLogList = []
         self.MaintLock = threading.RLock()
         self.OutageLog = os.path.join(ConfigFilePath, "outage.txt")
+        self.OutageLock = threading.RLock()
+        # newest first, [date, duration] or [date, duration, fuel]
+        self.OutageHistory = collections.deque(maxlen=100)
+        self.OutageHistoryDisplay = {}  # (JSONNum, alternate date format) : history
+        self.OutageLogOffset = 0  # bytes of the outage log read into OutageHistory
+        self.OutageLogMTime = None
+        self.OutageLogAppended = False  # LogOutage entries may not be in the file yet
         self.MinimumOutageDuration = 0
         self.PowerLogMaxSize = 15.0  # 15 MB max size
         self.PowerLog = os.path.join(ConfigFilePath, "kwlog.txt")
         self.FuelLog = os.path.join(ConfigFilePath, "fuellog.txt")
         self.FuelLock = threading.RLock()
+        self.FuelLogStore = None  # binary fuel level log, see myfuellog.py
         self.PowerLogList = []
+        self.PowerLogListTimes = []  # time (seconds since epoch) of each PowerLogList entry
+        self.PowerLogStore = None  # binary power log, see mypowerlog.py
+        self.LogFlushInterval = 30  # seconds, 0 writes log entries directly
+        self.LogFlushBatch = 100
+        self.LogFlushMaxPending = 256  # KB
+        self.LogFSync = False
         self.PowerLock = threading.RLock()
         self.bAlternateDateFormat = False
         self.KWHoursMonth = None
@@ -125,6 +146,16 @@ class GeneratorController(MySupport):
         self.ExternalTempDataTime = None
         self.ExternalTempBounds = None
         self.ExternalDataLock = threading.RLock()
+        self.ReadPlanner = None
+        self.ModbusBlockRead = False
+        self.ModbusBlockMaxSpan = 16
+        self.ModbusBlockMaxGap = 0
+        self.ModbusAdaptivePoll = False
+        self.LastAlarmState = None
+        self.IncrementalLogRead = False
+        # log name : [head value, time of last full read]
+        self.LogReadState = {}
+        self.LogFullReadMinutes = 60  # re-read entire logs at least this often
 
         self.ProgramStartTime = datetime.datetime.now() # used for com metrics
         self.OutageStartTime = (self.ProgramStartTime)  # if these two are the same, no outage has occured
@@ -213,6 +244,18 @@ class GeneratorController(MySupport):
                 self.PowerLogMaxSize = self.config.ReadValue(
                     "kwlogmax", return_type=float, default=15.0
                 )
+                self.LogFlushInterval = self.config.ReadValue(
+                    "log_flush_interval", return_type=int, default=30
+                )
+                self.LogFlushBatch = self.config.ReadValue(
+                    "log_flush_batch", return_type=int, default=100
+                )
+                self.LogFlushMaxPending = self.config.ReadValue(
+                    "log_flush_max_pending", return_type=int, default=256
+                )
+                self.LogFSync = self.config.ReadValue(
+                    "log_fsync", return_type=bool, default=False
+                )
 
                 if self.config.HasOption("nominalfrequency"):
                     self.NominalFreq = self.config.ReadValue("nominalfrequency")
@@ -255,6 +298,21 @@ class GeneratorController(MySupport):
                 self.bAlternateDateFormat = self.config.ReadValue(
                     "alternate_date_format", return_type=bool, default=False
                 )
+                self.ModbusBlockRead = self.config.ReadValue(
+                    "modbus_block_read", return_type=bool, default=False
+                )
+                self.ModbusBlockMaxSpan = self.config.ReadValue(
+                    "modbus_block_max_span", return_type=int, default=16
+                )
+                self.ModbusBlockMaxGap = self.config.ReadValue(
+                    "modbus_block_max_gap", return_type=int, default=0
+                )
+                self.ModbusAdaptivePoll = self.config.ReadValue(
+                    "modbus_adaptive_poll", return_type=bool, default=False
+                )
+                self.IncrementalLogRead = self.config.ReadValue(
+                    "incremental_log_read", return_type=bool, default=False
+                )
 
                 if self.bDisablePlatformStats:
                     self.bUseRaspberryPiCpuTempGauge = False
@@ -278,6 +336,35 @@ class GeneratorController(MySupport):
         except Exception as e1:
             self.FatalError("Failure loading platform module: " + str(e1))
 
+        try:
+            # buffered writes for the power, fuel and outage logs
+            self.LogWriter = MyLogWriter(
+                log=self.log,
+                flushinterval=self.LogFlushInterval,
+                batchsize=max(self.LogFlushBatch, 1),
+                maxpending=self.LogFlushMaxPending * 1024,
+                fsync=self.LogFSync,
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error starting log writer: " + str(e1))
+            self.LogWriter = None
+
+        try:
+            if len(self.PowerLog):
+                self.PowerLogStore = MyPowerLog(
+                    self.PowerLog, log=self.log, writer=self.LogWriter
+                )
+        except Exception as e1:
+            self.LogErrorLine("Error opening power log: " + str(e1))
+
+        try:
+            if self.UseFuelLog and len(self.FuelLog):
+                self.FuelLogStore = MyFuelLog(
+                    self.FuelLog, log=self.log, writer=self.LogWriter
+                )
+        except Exception as e1:
+            self.LogErrorLine("Error opening fuel log: " + str(e1))
+
     # ----------  GeneratorController:StartCommonThreads-------------------------
     # called after get config file, starts threads common to all controllers
     def StartCommonThreads(self):
@@ -295,6 +382,9 @@ class GeneratorController(MySupport):
 
         # start thread for kw log
         self.Threads["PowerMeter"] = MyThread(self.PowerMeter, Name="PowerMeter")
+        self.Threads["PowerLogPrune"] = MyThread(
+            self.PowerLogPrune, Name="PowerLogPrune"
+        )
 
         if self.UseFuelLog:
             self.Threads["FuelLogger"] = MyThread(self.FuelLogger, Name="FuelLogger")
@@ -338,6 +428,7 @@ class GeneratorController(MySupport):
             if self.SystemInOutage:
                 if UtilityVolts > PickupVoltage:
                     self.SystemInOutage = False
+                    self.NotifyChange()
                     self.LastOutageDuration = (datetime.datetime.now() - self.OutageStartTime)
                     OutageStr = str(self.LastOutageDuration).split(".")[0]      # remove microseconds from string
                     msgbody = ("\nUtility Power Restored at " + datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") + ". Duration of outage " + OutageStr)
@@ -346,7 +437,8 @@ class GeneratorController(MySupport):
                     try:
                         if self.PowerMeterIsSupported() and self.FuelConsumptionSupported():
                             if self.LastOutageDuration.total_seconds():
-                                FuelUsed = self.GetPowerHistory("power_log_json=%d,fuel" % self.LastOutageDuration.total_seconds())
+                                # power_log_json takes minutes
+                                FuelUsed = self.GetPowerHistory("power_log_json=%d,fuel" % ((int(self.LastOutageDuration.total_seconds()) + 59) // 60))
                             else:
                                 # Outage of zero seconds...
                                 if self.UseMetric:
@@ -359,12 +451,13 @@ class GeneratorController(MySupport):
                         self.LogErrorLine("Error recording fuel usage for outage: " + str(e1))
                     # log outage to file
                     if (self.LastOutageDuration.total_seconds()> self.MinimumOutageDuration):
-                        self.LogToFile(self.OutageLog, self.OutageStartTime.strftime("%Y-%m-%d %H:%M:%S"),OutageStr,)
+                        self.LogOutage(self.OutageStartTime, OutageStr)
             else:
                 if UtilityVolts < ThresholdVoltage:
                     if self.CheckOutageNoticeDelay():
                         self.SystemInOutage = True
                         self.OutageStartTime = datetime.datetime.now()
+                        self.NotifyChange()
                         msgbody = ("\nUtility Power Out at "+ self.OutageStartTime.strftime("%Y-%m-%d %H:%M:%S"))
                         self.MessagePipe.SendMessage("Outage Notice at " + self.SiteName,msgbody,msgtype="outage",)
                 else:
@@ -419,6 +512,131 @@ class GeneratorController(MySupport):
         except Exception as e1:
             self.LogErrorLine("Exiting Controller ProcessThread (2): " + str(e1))
 
+    # ---------- GeneratorController:GetReadPlan--------------------------------
+    # RegisterList is a list of (register (hex string), length in bytes) pairs,
+    # returns a list of blocks to pass to ProcessReadBlock this poll cycle.
+    # Adjacent registers are merged into one transaction if modbus_block_read
+    # is enabled. If modbus_adaptive_poll is enabled registers that rarely
+    # change are not read every cycle. AlwaysRead is a list of registers that
+    # are read every cycle regardless.
+    def GetReadPlan(self, RegisterList, NoMerge=None, AlwaysRead=None):
+
+        if self.ReadPlanner == None:
+            self.ReadPlanner = ModbusReadPlanner(
+                self.ModBus,
+                self.UpdateRegisterList,
+                log=self.log,
+                enabled=self.ModbusBlockRead,
+                maxspan=self.ModbusBlockMaxSpan,
+                maxgap=self.ModbusBlockMaxGap,
+                nomerge=NoMerge,
+                adaptive=self.ModbusAdaptivePoll,
+                updatelock=self.Registers.Lock,
+            )
+            if AlwaysRead != None:
+                self.ReadPlanner.AddAlwaysRead(AlwaysRead)
+
+        # refresh everything when the alarm state changes
+        AlarmState = self.SystemInAlarm()
+        if AlarmState != self.LastAlarmState:
+            self.LastAlarmState = AlarmState
+            self.ReadPlanner.RequestFullRefresh()
+        return self.ReadPlanner.GetCyclePlan(RegisterList)
+
+    # ---------- GeneratorController:ProcessReadBlock---------------------------
+    def ProcessReadBlock(self, Block):
+        return self.ReadPlanner.ProcessBlock(Block)
+
+    # ---------- GeneratorController:GetReadBatches-----------------------------
+    # split a read plan into lists of blocks that are passed to ProcessReadBlocks.
+    # Each list holds as many blocks as the modbus connection can have
+    # outstanding at once (one unless Modbus TCP pipelining is enabled)
+    def GetReadBatches(self, ReadPlan):
+
+        Depth = max(1, self.ModBus.GetPipelineDepth())
+        return [ReadPlan[i : i + Depth] for i in range(0, len(ReadPlan), Depth)]
+
+    # ---------- GeneratorController:ProcessReadBlocks--------------------------
+    def ProcessReadBlocks(self, Blocks):
+        return self.ReadPlanner.ProcessBlocks(Blocks)
+
+    # ---------- GeneratorController:LogNeedsFullRead---------------------------
+    # returns True if the log has not been completely read recently
+    def LogNeedsFullRead(self, Name):
+
+        State = self.LogReadState.get(Name, None)
+        if State == None:
+            return True
+        Elapsed = datetime.datetime.now() - State[1]
+        return Elapsed.total_seconds() > self.LogFullReadMinutes * 60
+
+    # ---------- GeneratorController:SetLogFullRead-----------------------------
+    # record that every entry of a log was read, Head is the value (any type)
+    # used to detect changes to the log
+    def SetLogFullRead(self, Name, Head=None):
+        self.LogReadState[Name] = [Head, datetime.datetime.now()]
+
+    # ---------- GeneratorController:LogHeadChanged-----------------------------
+    # returns True if the log needs to be read, i.e. the head value differs
+    # from the value saved with SetLogFullRead
+    def LogHeadChanged(self, Name, Head):
+
+        if self.LogNeedsFullRead(Name):
+            return True
+        return self.LogReadState[Name][0] != Head
+
+    # ---------- GeneratorController:ReadLogRegisters---------------------------
+    # Read a log made of Depth entries, Step registers apart beginning at
+    # StartReg (int). Length is the entry length in words. The newest entry must
+    # be at StartReg, older entries move to higher registers as entries are
+    # added. If incremental_log_read is enabled only the newest entry is read
+    # unless it has changed, then new entries are read and the cached older
+    # entries are shifted. Returns False if we are exiting.
+    def ReadLogRegisters(self, StartReg, Depth, Step, Length):
+
+        Registers = ["%04x" % (StartReg + Index * Step) for Index in range(Depth)]
+        Name = Registers[0]
+        try:
+            if self.IncrementalLogRead and not self.LogNeedsFullRead(Name):
+                OldEntries = [
+                    self.GetRegisterValueFromList(Register) for Register in Registers
+                ]
+                Head = self.ModBus.ProcessTransaction(Registers[0], Length)
+                if not len(Head) or Head == OldEntries[0]:
+                    return not self.IsStopping
+                # read until we find the entry that was the newest entry
+                for Index in range(1, Depth):
+                    Value = self.ModBus.ProcessTransaction(Registers[Index], Length)
+                    if self.IsStopping:
+                        return False
+                    if not len(Value):
+                        # read error, read the entire log next time
+                        self.LogReadState.pop(Name, None)
+                        return True
+                    if Value == OldEntries[0]:
+                        # the rest of the entries moved down by Index entries
+                        for Register, OldValue in zip(
+                            Registers[Index + 1 :], OldEntries[1:]
+                        ):
+                            if len(OldValue):
+                                self.UpdateRegisterList(Register, OldValue)
+                        return True
+                # every entry is new, so every entry has been read
+                self.SetLogFullRead(Name)
+                return True
+
+            Complete = True
+            for Register in Registers:
+                if not len(self.ModBus.ProcessTransaction(Register, Length)):
+                    Complete = False
+                if self.IsStopping:
+                    return False
+            if Complete:
+                self.SetLogFullRead(Name)
+        except Exception as e1:
+            self.LogErrorLine("Error in ReadLogRegisters: " + str(e1))
+        return True
+
     # ---------- GeneratorController:CheckAlarmThread---------------------------
     #  When signaled, this thread will check for alarms
     def CheckAlarmThread(self):
@@ -482,9 +700,10 @@ class GeneratorController(MySupport):
                     continue
 
                 LastFuelValue = FuelValue
-                TimeStamp = datetime.datetime.now().strftime("%x %X")
+                if self.FuelLogStore == None:
+                    continue
                 with self.FuelLock:
-                    self.LogToFile(self.FuelLog, TimeStamp, str(FuelValue))
+                    self.FuelLogStore.Append(time.time(), FuelValue)
 
             except Exception as e1:
                 self.LogErrorLine("Error in  FuelLogger: " + str(e1))
@@ -496,10 +715,16 @@ class GeneratorController(MySupport):
             if not len(self.FuelLog):
                 return "Fuel Not Present"
 
-            if not os.path.isfile(self.FuelLog):
-                return "Power Log is empty"
-
             with self.FuelLock:
+                if self.FuelLogStore != None:
+                    if not self.FuelLogStore.Count:
+                        return "Fuel Log is empty"
+                    self.FuelLogStore.Clear()
+                    return "Fuel Log cleared"
+                if self.LogWriter != None:
+                    self.LogWriter.Discard(self.FuelLog)
+                if not os.path.isfile(self.FuelLog):
+                    return "Power Log is empty"
                 os.remove(self.FuelLog)
                 time.sleep(1)
 
@@ -654,12 +879,10 @@ class GeneratorController(MySupport):
     def GetParameterBit(self, Register, Mask, OnLabel=None, OffLabel=None):
 
         try:
-            Value = self.GetRegisterValueFromList(Register)
-            if not len(Value):
+            IntValue = self.Registers.GetInt(Register)
+            if IntValue == None:
                 return ""
 
-            IntValue = int(Value, 16)
-
             if OnLabel == None or OffLabel == None:
                 return self.BitIsEqual(IntValue, Mask, Mask)
             elif self.BitIsEqual(IntValue, Mask, Mask):
@@ -694,15 +917,12 @@ class GeneratorController(MySupport):
             else:
                 LabelStr = ""
 
-            ValueLo = self.GetParameter(RegisterLo)
-            ValueHi = self.GetParameter(RegisterHi)
+            # read both halves together so the value is not half updated
+            IntValueLo, IntValueHi = self.Registers.GetInts([RegisterLo, RegisterHi])
 
-            if not len(ValueLo) or not len(ValueHi):
+            if IntValueLo == None or IntValueHi == None:
                 return DefaultReturn
 
-            IntValueLo = int(ValueLo)
-            IntValueHi = int(ValueHi)
-
             IntValue = IntValueHi << 16 | IntValueLo
 
             if ReturnInt:
@@ -740,24 +960,28 @@ class GeneratorController(MySupport):
             else:
                 DefaultReturn = ""
 
-            Value = self.GetRegisterValueFromList(Register)
-            if not len(Value):
+            Entry = self.Registers.GetEntry(Register)
+            if Entry == None or not len(Entry[0]):
                 return DefaultReturn
+            Value, IntValue, Sequence = Entry
 
             if ReturnString == True:
                 return self.HexStringToString(Value)
 
+            if Hex and Divider == None and Label == None:
+                return Value
+            if IntValue == None:
+                self.LogError("Error in GetParameter: Reg: " + Register + ": invalid value " + Value)
+                return ""
+
             if Divider == None and Label == None:
-                if Hex:
-                    return Value
-                elif ReturnFloat:
-                    return float(int(Value, 16))
+                if ReturnFloat:
+                    return float(IntValue)
                 elif ReturnInt:
-                    return int(Value, 16)
+                    return IntValue
                 else:
-                    return str(int(Value, 16))
+                    return str(IntValue)
 
-            IntValue = int(Value, 16)
             if not Divider == None:
                 FloatValue = IntValue / Divider
                 if ReturnInt:
@@ -773,7 +997,7 @@ class GeneratorController(MySupport):
             elif not Label == None:
                 return "%d %s" % (IntValue, Label)
             else:
-                return str(int(Value, 16))
+                return str(IntValue)
 
         except Exception as e1:
             self.LogErrorLine(
@@ -792,6 +1016,11 @@ class GeneratorController(MySupport):
     def SystemInAlarm(self):
         return False
 
+    # ---------------------GeneratorController::GetAlarmState--------------------
+    # return a description of the current alarm, "" if none or not supported
+    def GetAlarmState(self):
+        return ""
+
     # -------------CustomController:SetCommandButton-----------------------------
     def SetCommandButton(self, CommandString):
         try:
@@ -840,7 +1069,7 @@ class GeneratorController(MySupport):
             if not isinstance(CommandSetList, list):
                 return "Error: invalid input in ExecuteRemoteCommand"
             
-            with self.ModBus.CommAccessLock:
+            with self.ModBus.CommAccessLock.Priority(self.ModBus.BUS_PRIORITY_CONTROL):
                 # put the lock here so if there are multiple commands they will be executed back to back
                 for button_command in CommandSetList:
                     if not isinstance(button_command, dict) and not len(button_command) == 1:
@@ -899,7 +1128,7 @@ class GeneratorController(MySupport):
     # -------------CustomController:ExecuteCommandSequence-----------------------
     def ExecuteCommandSequence(self, command_sequence):
         try:
-            with self.ModBus.CommAccessLock:
+            with self.ModBus.CommAccessLock.Priority(self.ModBus.BUS_PRIORITY_CONTROL):
                 for command in command_sequence:
                     if not len(command["value"]):
                         self.LogDebug("Error in SetGeneratorRemoteCommand: invalid value array")
@@ -1146,7 +1375,15 @@ class GeneratorController(MySupport):
     # ----------  GeneratorController:GetCommStatus  ----------------------------
     # return Dict with communication stats
     def GetCommStatus(self):
-        return self.ModBus.GetCommStats()
+        CommStats = self.ModBus.GetCommStats()
+        if self.ReadPlanner != None and self.ReadPlanner.Adaptive:
+            CommStats.append(
+                {
+                    "Adaptive Poll Registers": "Fast: %d, Medium: %d, Slow: %d"
+                    % tuple(self.ReadPlanner.GetPollStats())
+                }
+            )
+        return CommStats
 
     # ------------ GeneratorController:GetRunHours ------------------------------
     def GetRunHours(self):
@@ -1301,6 +1538,116 @@ class GeneratorController(MySupport):
 
         return msgbody
 
+    # ------------ GeneratorController:LogOutage--------------------------------
+    # writes an outage to the outage log and adds it to the outage history
+    def LogOutage(self, StartTime, OutageStr):
+
+        try:
+            if not len(self.OutageLog):
+                return
+            Fields = [
+                self.removeNonPrintable(StartTime.strftime("%Y-%m-%d %H:%M:%S")),
+                self.removeNonPrintable(OutageStr),
+            ]
+            Fields = [Field for Field in Fields if len(Field)]
+            with self.OutageLock:
+                # read any changes made to the log by something else first
+                self.UpdateOutageHistory()
+                self.LogToFile(self.OutageLog, *Fields)
+                # the line written by LogToFile
+                Line = ",".join(Fields) + "\n"
+                self.AddOutageLine(Line)
+                self.OutageLogOffset += len(Line.encode("utf-8"))
+                self.OutageLogAppended = True
+        except Exception as e1:
+            self.LogErrorLine("Error in LogOutage: " + str(e1))
+
+    # ------------ GeneratorController:AddOutageLine----------------------------
+    # adds a line from the outage log to the front (newest) of OutageHistory
+    def AddOutageLine(self, line):
+
+        line = line.strip()  # remove whitespace at beginning and end
+
+        if not len(line):
+            return
+        if line[0] == "#":  # comment?
+            return
+        line = self.removeNonPrintable(line)
+        Items = line.split(",")
+        # Three items is for duration greater than 24 hours, i.e 1 day, 08:12
+        if len(Items) < 2:
+            return
+        strDuration = ""
+        strFuel = ""
+        if len(Items) == 2:
+            # Only date and duration less than a day
+            strDuration = Items[1]
+        elif (len(Items) == 3) and ("day" in Items[1]):
+            #  date and outage greater than 24 hours
+            strDuration = Items[1] + "," + Items[2]
+        elif len(Items) == 3:
+            # date, outage less than 1 day, and fuel
+            strDuration = Items[1]
+            strFuel = Items[2]
+        elif len(Items) == 4 and ("day" in Items[1]):
+            # date, outage less greater than 1 day, and fuel
+            strDuration = Items[1] + "," + Items[2]
+            strFuel = Items[3]
+        else:
+            return
+
+        if len(strDuration) and len(strFuel):
+            self.OutageHistory.appendleft([Items[0], strDuration, strFuel])
+        elif len(strDuration):
+            self.OutageHistory.appendleft([Items[0], strDuration])
+        self.OutageHistoryDisplay = {}
+
+    # ------------ GeneratorController:UpdateOutageHistory----------------------
+    # reads the outage log into OutageHistory if it has changed. Only data
+    # added to the end of the log is read unless the log was replaced.
+    def UpdateOutageHistory(self):
+
+        with self.OutageLock:
+            if self.LogWriter != None:
+                Size = self.LogWriter.GetSize(self.OutageLog)
+            elif os.path.isfile(self.OutageLog):
+                Size = os.path.getsize(self.OutageLog)
+            else:
+                Size = 0
+            MTime = os.path.getmtime(self.OutageLog) if os.path.isfile(self.OutageLog) else None
+
+            if Size == self.OutageLogOffset and (
+                self.OutageLogAppended or MTime == self.OutageLogMTime
+            ):
+                # no change, or only entries added by LogOutage
+                if MTime != None and Size == os.path.getsize(self.OutageLog):
+                    # LogOutage entries are now in the file
+                    self.OutageLogAppended = False
+                    self.OutageLogMTime = MTime
+                return
+
+            if self.LogWriter != None:
+                self.LogWriter.Flush(self.OutageLog)
+            if Size <= self.OutageLogOffset:
+                # the log was replaced or cleared, read all of it
+                self.OutageHistory.clear()
+                self.OutageHistoryDisplay = {}
+                self.OutageLogOffset = 0
+            self.OutageLogAppended = False
+            self.OutageLogMTime = None
+            if not os.path.isfile(self.OutageLog):
+                return
+
+            with open(self.OutageLog, "rb") as OutageFile:  # opens file
+                OutageFile.seek(self.OutageLogOffset)
+                Data = OutageFile.read()
+            # a line that is still being written is read next time
+            Data = Data[: Data.rfind(b"\n") + 1]
+            for line in Data.decode("utf-8", "ignore").splitlines():
+                self.AddOutageLine(line)
+            self.OutageLogOffset += len(Data)
+            self.OutageLogMTime = os.path.getmtime(self.OutageLog)
+
     # ------------ GeneratorController:DisplayOutageHistory----------------------
     def DisplayOutageHistory(self, JSONNum=False):
 
@@ -1309,91 +1656,60 @@ class GeneratorController(MySupport):
         if not len(self.OutageLog):
             return ""
         try:
-            # check to see if a log file exist yet
-            if not os.path.isfile(self.OutageLog):
-                return ""
-
-            OutageLog = []
-
-            with open(self.OutageLog, "r") as OutageFile:  # opens file
-
-                for line in OutageFile:
-                    line = line.strip()  # remove whitespace at beginning and end
-
-                    if not len(line):
-                        continue
-                    if line[0] == "#":  # comment?
-                        continue
-                    line = self.removeNonPrintable(line)
-                    Items = line.split(",")
-                    # Three items is for duration greater than 24 hours, i.e 1 day, 08:12
-                    if len(Items) < 2:
-                        continue
-                    strDuration = ""
-                    strFuel = ""
+            with self.OutageLock:
+                self.UpdateOutageHistory()
+                if not len(self.OutageHistory) and not os.path.isfile(self.OutageLog):
+                    return ""
+
+                # the formatted history is kept until the log changes
+                Key = (JSONNum, self.bAlternateDateFormat)
+                if Key in self.OutageHistoryDisplay:
+                    return self.OutageHistoryDisplay[Key]
+
+                index = 0
+                for Items in self.OutageHistory:
+                    if len(Items) > 1:
+                        try:
+                            # should be format yyyy-mm-dd hh:mm:ss
+                            EntryDate = datetime.datetime.strptime(Items[0], "%Y-%m-%d %H:%M:%S")
+                            if self.bAlternateDateFormat:
+                                FormattedDate = EntryDate.strftime("%d-%m-%Y %H:%M:%S")
+                            else:
+                                FormattedDate = EntryDate.strftime("%m-%d-%Y %H:%M:%S")
+                        except Exception as e1:
+                            self.LogErrorLine("Error parsing date/time in outage log: " + str(e1))
+                            continue
                     if len(Items) == 2:
-                        # Only date and duration less than a day
-                        strDuration = Items[1]
-                    elif (len(Items) == 3) and ("day" in Items[1]):
-                        #  date and outage greater than 24 hours
-                        strDuration = Items[1] + "," + Items[2]
+                        if JSONNum:
+                            LogHistory.append({index: [{"Date": FormattedDate}, {"Duration": Items[1]}]})
+                        else:   
+                            LogHistory.append("%s, Duration: %s" % (FormattedDate, Items[1]))
                     elif len(Items) == 3:
-                        # date, outage less than 1 day, and fuel
-                        strDuration = Items[1]
-                        strFuel = Items[2]
-                    elif len(Items) == 4 and ("day" in Items[1]):
-                        # date, outage less greater than 1 day, and fuel
-                        strDuration = Items[1] + "," + Items[2]
-                        strFuel = Items[3]
-                    else:
-                        continue
-
-                    if len(strDuration) and len(strFuel):
-                         OutageLog.insert(0, [Items[0], strDuration, strFuel])
-                    elif len(strDuration):
-                        OutageLog.insert(0, [Items[0], strDuration])
-
-                    if len(OutageLog) > 100:  # limit log to 100 entries
-                        OutageLog.pop()
-
-            index = 0
-            for Items in OutageLog:
-                if len(Items) > 1:
-                    try:
-                        # should be format yyyy-mm-dd hh:mm:ss
-                        EntryDate = datetime.datetime.strptime(Items[0], "%Y-%m-%d %H:%M:%S")
-                        if self.bAlternateDateFormat:
-                            FormattedDate = EntryDate.strftime("%d-%m-%Y %H:%M:%S")
+                        if JSONNum:
+                            LogHistory.append({index:[{"Date": FormattedDate}, {"Duration": Items[1]},{"Estimated Fuel": Items[2]}]})
                         else:
-                            FormattedDate = EntryDate.strftime("%m-%d-%Y %H:%M:%S")
-                    except Exception as e1:
-                        self.LogErrorLine("Error parsing date/time in outage log: " + str(e1))
-                        continue
-                if len(Items) == 2:
-                    if JSONNum:
-                        LogHistory.append({index: [{"Date": FormattedDate}, {"Duration": Items[1]}]})
-                    else:   
-                        LogHistory.append("%s, Duration: %s" % (FormattedDate, Items[1]))
-                elif len(Items) == 3:
-                    if JSONNum:
-                        LogHistory.append({index:[{"Date": FormattedDate}, {"Duration": Items[1]},{"Estimated Fuel": Items[2]}]})
-                    else:
-                        LogHistory.append("%s, Duration: %s, Estimated Fuel: %s"% (FormattedDate, Items[1], Items[2]))
-                index += 1
+                            LogHistory.append("%s, Duration: %s, Estimated Fuel: %s"% (FormattedDate, Items[1], Items[2]))
+                    index += 1
 
-            return LogHistory
+                self.OutageHistoryDisplay[Key] = LogHistory
+                return LogHistory
 
         except Exception as e1:
             self.LogErrorLine("Error in  DisplayOutageHistory: " + str(e1))
             return []
 
     # ------------ GeneratorController::LogToPowerLog----------------------------
+    # TimeStamp is a datetime or seconds since the epoch, Value is kW
     def LogToPowerLog(self, TimeStamp, Value):
 
         try:
-            TimeStamp = self.removeNonPrintable(TimeStamp)
-            Value = self.removeNonPrintable(Value)
-            if not len(TimeStamp) or not len(Value):
+            if self.PowerLogStore == None:
+                return
+            if isinstance(TimeStamp, datetime.datetime):
+                TimeStamp = time.mktime(TimeStamp.timetuple())
+            try:
+                Value = float(Value)
+            except ValueError:
                 self.LogError(
                     "Invalid entry in LogToPowerLog: "
                     + str(TimeStamp)
@@ -1401,19 +1717,31 @@ class GeneratorController(MySupport):
                     + str(Value)
                 )
                 return
-            if len(self.PowerLogList):
-                self.PowerLogList.insert(0, [TimeStamp, Value])
-            self.LogToFile(self.PowerLog, TimeStamp, Value)
+            with self.PowerLock:
+                self.PowerLogStore.Append(TimeStamp, Value)
+                if len(self.PowerLogList):
+                    self.PowerLogList.insert(
+                        0, self.FormatPowerLogEntry(self.PowerLogStore.LastTime, Value)
+                    )
+                    self.PowerLogListTimes.insert(0, self.PowerLogStore.LastTime)
         except Exception as e1:
             self.LogErrorLine("Error in LogToPowerLog: " + str(e1))
 
+    # ------------ GeneratorController::FormatPowerLogEntry----------------------
+    # returns a power log entry as displayed, [time ("%x %X"), kW (string)]
+    def FormatPowerLogEntry(self, TimeStamp, Value):
+        return [
+            datetime.datetime.fromtimestamp(TimeStamp).strftime("%x %X"),
+            str(round(Value, 3)),
+        ]
+
     # ------------ GeneratorController::GetPowerLogFileDetails-------------------
     def GetPowerLogFileDetails(self):
 
         if not self.PowerMeterIsSupported():
             return "Not Supported"
         try:
-            LogSize = os.path.getsize(self.PowerLog)
+            LogSize = self.PowerLogStore.GetSize()
             outstr = "%.2f MB of %.2f MB" % (
                 (float(LogSize) / (1024.0 * 1024.0)),
                 self.PowerLogMaxSize,
@@ -1431,8 +1759,10 @@ class GeneratorController(MySupport):
             return self.ClearPowerLog()
 
         try:
+            if self.PowerLogStore == None:
+                return "OK"
 
-            LogSize = os.path.getsize(self.PowerLog)
+            LogSize = self.PowerLogStore.GetSize()
             if float(LogSize) / (1024 * 1024) < self.PowerLogMaxSize * 0.85:
                 return "OK"
 
@@ -1457,24 +1787,22 @@ class GeneratorController(MySupport):
 
             # if we get here the power log is 85% full or greater so let's try to reduce the size by
             # deleting entires that are older than the input Minutes
-            CmdString = "power_log_json=%d" % Minutes
-            PowerLog = self.GetPowerHistory(CmdString, NoReduce=True)
-
-            self.ClearPowerLog(NoCreate=True)
-            # Write oldest log entries first
-            for Items in reversed(PowerLog):
-                self.LogToPowerLog(Items[0], Items[1])
-
-            # Add null entry at the end
-            if not os.path.isfile(self.PowerLog):
-                TimeStamp = datetime.datetime.now().strftime("%x %X")
-                self.LogToPowerLog(TimeStamp, "0.0")
-
-            # if the power log is now empty add one entry
-            LogSize = os.path.getsize(self.PowerLog)
-            if LogSize == 0:
-                TimeStamp = datetime.datetime.now().strftime("%x %X")
-                self.LogToPowerLog(TimeStamp, "0.0")
+            StartTime = time.time() - (Minutes * 60)
+            with self.PowerLock:
+                Removed = self.PowerLogStore.Prune(StartTime)
+                if Removed:
+                    self.LogError("Removed %d entries from the power log" % Removed)
+
+                # remove the pruned entries from the end (oldest) of the cached list
+                Keep = len(self.PowerLogListTimes)
+                while Keep and self.PowerLogListTimes[Keep - 1] < StartTime:
+                    Keep -= 1
+                del self.PowerLogList[Keep:]
+                del self.PowerLogListTimes[Keep:]
+
+                # if the power log is now empty add one entry
+                if self.PowerLogStore.Count == 0:
+                    self.LogToPowerLog(datetime.datetime.now(), 0.0)
 
             return "OK"
 
@@ -1486,162 +1814,69 @@ class GeneratorController(MySupport):
     def ClearPowerLog(self, NoCreate=False):
 
         try:
-            if not len(self.PowerLog):
+            if self.PowerLogStore == None:
                 return "Power Log Disabled"
 
-            if not os.path.isfile(self.PowerLog):
+            if self.PowerLogStore.Count == 0:
                 return "Power Log is empty"
-            try:
-                with self.PowerLock:
-                    os.remove(self.PowerLog)
-                    time.sleep(1)
-            except:
-                pass
 
-            self.PowerLogList = []
+            with self.PowerLock:
+                self.PowerLogStore.Clear()
+                self.PowerLogList = []
+                self.PowerLogListTimes = []
 
-            if not NoCreate:
-                # add zero entry to note the start of the log
-                TimeStamp = datetime.datetime.now().strftime("%x %X")
-                self.LogToPowerLog(TimeStamp, "0.0")
+                if not NoCreate:
+                    # add zero entry to note the start of the log
+                    self.LogToPowerLog(datetime.datetime.now(), 0.0)
 
             return "Power Log cleared"
         except Exception as e1:
             self.LogErrorLine("Error in  ClearPowerLog: " + str(e1))
             return "Error in  ClearPowerLog: " + str(e1)
 
-    # ------------ GeneratorController::ReducePowerSamples-----------------------
-    def ReducePowerSamples(self, PowerList, MaxSize):
-
-        if MaxSize == 0:
-            self.LogError("RecducePowerSamples: Error: Max size is zero")
-            return []
-
-        if len(PowerList) < MaxSize:
-            self.LogError("RecducePowerSamples: Error: Can't reduce ")
-            return PowerList
+    # ------------ GeneratorController::GetPowerLogEntries-----------------------
+    # returns (times, kW values) arrays, oldest first, for the last Minutes (0
+    # is the whole log). Times are seconds since the epoch.
+    def GetPowerLogEntries(self, Minutes=0):
 
+        if self.PowerLogStore == None:
+            return [], []
         try:
-            Sample = int(len(PowerList) / MaxSize)
-            Remain = int(len(PowerList) % MaxSize)
-
-            NewList = []
-            Count = 0
-            for Count in range(len(PowerList)):
-                TimeStamp, KWValue = PowerList[Count]
-                if float(KWValue) == 0:
-                    NewList.append([TimeStamp, KWValue])
-                elif Count % Sample == 0:
-                    NewList.append([TimeStamp, KWValue])
-
-            # if we have too many entries due to a remainder or not removing zero samples, then delete some
-            if len(NewList) > MaxSize:
-                return self.RemovePowerSamples(NewList, MaxSize)
-        except Exception as e1:
-            self.LogErrorLine("Error in RecducePowerSamples: %s" % str(e1))
-            return PowerList
-
-        return NewList
-
-    # ------------ GeneratorController::RemovePowerSamples-----------------------
-    def RemovePowerSamples(self, List, MaxSize):
-
-        import random
-
-        try:
-            NewList = List[:]
-            if len(NewList) <= MaxSize:
-                self.LogError("RemovePowerSamples: Error: Can't remove ")
-                return NewList
-
-            Extra = len(NewList) - MaxSize
-            for Count in range(Extra):
-                # assume first and last sampels are zero samples so don't select thoes
-                repeat = True
-                removeAttempt = 0  # only try this so many times
-                while repeat and removeAttempt < MaxSize:
-                    removeAttempt += 1
-                    position = random.randint(1, len(NewList) - 2)
-                    if float(NewList[position][1]) != 0:
-                        Entry = NewList.pop(position)
-                        repeat = False
-
-            # This will just remove all samples but the first MaxSize. This will only do anything if the above
-            # code failes to find valid samples to remove (i.e. all samples are zero)
-            if len(NewList) > MaxSize:
-                NewList = NewList[:MaxSize]
-            return NewList
-        except Exception as e1:
-            self.LogErrorLine("Error in RemovePowerSamples: %s" % str(e1))
-            return NewList
-
-    # ------------ GeneratorController::GetPowerLogForMinutes--------------------
-    def GetPowerLogForMinutes(self, Minutes=0):
-        try:
-            ReturnList = []
-            PowerList = self.ReadPowerLogFromFile()
             if not Minutes:
-                return PowerList
-            CurrentTime = datetime.datetime.now()
-
-            for Time, Power in reversed(PowerList):
-                try:
-                    struct_time = time.strptime(Time, "%x %X")
-                    LogEntryTime = datetime.datetime.fromtimestamp(
-                        time.mktime(struct_time)
-                    )
-                except Exception as e1:
-                    self.LogErrorLine("Error in GetPowerLogForMinutes: " + str(e1))
-                    continue
-                Delta = CurrentTime - LogEntryTime
-                if self.GetDeltaTimeMinutes(Delta) < Minutes:
-                    ReturnList.insert(0, [Time, Power])
-            return ReturnList
+                return self.PowerLogStore.GetEntries()
+            return self.PowerLogStore.GetEntries(StartTime=time.time() - (Minutes * 60))
         except Exception as e1:
-            self.LogErrorLine("Error in GetPowerLogForMinutes: " + str(e1))
-            return ReturnList
+            self.LogErrorLine("Error in GetPowerLogEntries: " + str(e1))
+            return [], []
 
     # ------------ GeneratorController::ReadPowerLogFromFile---------------------
+    # returns a list of [time, kW] entries, newest first, formatted as
+    # FormatPowerLogEntry. The list is reduced to 500 entries unless NoReduce
     def ReadPowerLogFromFile(self, Minutes=0, NoReduce=False):
 
-        # check to see if a log file exist yet
-        if not os.path.isfile(self.PowerLog):
+        if self.PowerLogStore == None:
             return []
-        PowerList = []
 
         # return cached list if we have read the file before
-        if len(self.PowerLogList) and not Minutes:
+        if len(self.PowerLogList) and not Minutes and not NoReduce:
             return self.PowerLogList
         with self.PowerLock:
-            if Minutes:
-                return self.GetPowerLogForMinutes(Minutes)
-
-            try:
-                with open(self.PowerLog, "r") as LogFile:  # opens file
-                    for line in LogFile:
-                        line = line.strip()  # remove whitespace at beginning and end
-
-                        if not len(line):
-                            continue
-                        if line[0] == "#":  # comment
-                            continue
-                        line = self.removeNonPrintable(line)
-                        Items = line.split(",")
-                        if len(Items) != 2:
-                            continue
-                        # remove any kW labels that may be there
-                        Items[1] = self.removeAlpha(Items[1])
-                        PowerList.insert(0, [Items[0], Items[1]])
-
-            except Exception as e1:
-                self.LogErrorLine(
-                    "Error in  ReadPowerLogFromFile (parse file): " + str(e1)
-                )
-
-            if len(PowerList) > 500 and not NoReduce:
-                PowerList = self.ReducePowerSamples(PowerList, 500)
-            if not len(self.PowerLogList):
+            if NoReduce:
+                Times, Values = self.GetPowerLogEntries(Minutes)
+            else:
+                try:
+                    StartTime = None if not Minutes else time.time() - (Minutes * 60)
+                    Times, Values = self.PowerLogStore.GetReducedEntries(StartTime, 500)
+                except Exception as e1:
+                    self.LogErrorLine("Error in ReadPowerLogFromFile: " + str(e1))
+                    return []
+            PowerList = [
+                self.FormatPowerLogEntry(TimeStamp, Value)
+                for TimeStamp, Value in zip(reversed(Times), reversed(Values))
+            ]
+            if not Minutes and not NoReduce:
                 self.PowerLogList = PowerList
+                self.PowerLogListTimes = list(reversed(Times))
         return PowerList
 
     # ------------ GeneratorController::GetPowerHistory--------------------------
@@ -1709,26 +1944,19 @@ class GeneratorController(MySupport):
 
         try:
 
-            PowerList = self.ReadPowerLogFromFile(Minutes=Minutes)
-
-            # Shorten list to 500 if specific duration requested
-            # if not KWHours and len(PowerList) > 500 and Minutes and not NoReduce:
-            if len(PowerList) > 500 and Minutes and not NoReduce:
-                PowerList = self.ReducePowerSamples(PowerList, 500)
+            if KWHours or FuelConsumption or RunHours:
+                AvgPower, TotalSeconds = self.GetAveragePower(Minutes)
             if KWHours:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 return "%.2f" % ((TotalSeconds / 3600) * AvgPower)
             if FuelConsumption:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 Consumption, Label = self.GetFuelConsumption(AvgPower, TotalSeconds)
                 if Consumption == None:
                     return "Unknown"
                 return "%.2f %s" % (Consumption, Label)
             if RunHours:
-                AvgPower, TotalSeconds = self.GetAveragePower(PowerList)
                 return "%.2f" % (TotalSeconds / 60.0 / 60.0)
 
-            return PowerList
+            return self.ReadPowerLogFromFile(Minutes=Minutes, NoReduce=NoReduce)
 
         except Exception as e1:
             self.LogErrorLine("Error in  GetPowerHistory: " + str(e1))
@@ -1736,51 +1964,157 @@ class GeneratorController(MySupport):
             return msgbody
 
     # ----------  GeneratorController::GetAveragePower---------------------------
-    # a list of the power log is passed in (already parsed for a time period)
-    # returns a time period and average power used for that time period
-    def GetAveragePower(self, PowerList):
+    # returns the average power and the time in seconds the generator was
+    # producing power for the last Minutes (0 is the whole log), from the
+    # running totals kept by the power log
+    def GetAveragePower(self, Minutes=0):
 
         try:
-            TotalTime = datetime.timedelta(seconds=0)
-            Entries = 0
-            TotalPower = 0.0
-            LastPower = 0.0
-            LastTime = None
-            for Items in PowerList:
-                try:
-                    # is the power value a float?
-                    Power = float(Items[1])
-                except Exception as e1:
-                    Power = 0.0
-                    continue
-                try:
-                    # This should be date time
-                    struct_time = time.strptime(Items[0], "%x %X")
-                    LogEntryTime = datetime.datetime.fromtimestamp(
-                        time.mktime(struct_time)
-                    )
-                except Exception as e1:
-                    self.LogErrorLine("Invalid time entry in power log: " + str(e1))
-                    continue
-
-                # Changes in Daylight savings time will effect this
-                if LastTime == None or Power == 0:
-                    TotalTime += LogEntryTime - LogEntryTime
-                else:
-                    TotalTime += LastTime - LogEntryTime
-                    TotalPower += (Power + LastPower) / 2
-                    Entries += 1
-                LastTime = LogEntryTime
-                LastPower = Power
-
-            if Entries == 0:
+            if self.PowerLogStore == None:
                 return 0, 0
-            TotalPower = TotalPower / Entries
-            return TotalPower, TotalTime.total_seconds()
+            if not Minutes:
+                return self.PowerLogStore.GetAveragePower()
+            return self.PowerLogStore.GetAveragePower(StartTime=time.time() - (Minutes * 60))
         except Exception as e1:
             self.LogErrorLine("Error in  GetAveragePower: " + str(e1))
             return 0, 0
 
+    # ------------ GeneratorController::GetFuelHistory---------------------------
+    # "fuel_log_json=<minutes>" returns a list of [time, fuel level (percent)]
+    # entries, newest first, reduced to 500 entries. "fuel_log_json=<minutes>,rate"
+    # returns the fuel used and the consumption rate and "fuel_log_json=<minutes>,refills"
+    # returns a list of [time, level before, level after] refills, newest first.
+    # Minutes of 0 (or no minutes) is the whole log.
+    def GetFuelHistory(self, CmdString):
+
+        msgbody = "Invalid command syntax for command fuel_log_json"
+
+        try:
+            if self.FuelLogStore == None:
+                # fuel log disabled
+                return []
+
+            CmdList = CmdString.split("=")
+            if len(CmdList) > 2 or not CmdList[0].strip().lower() == "fuel_log_json":
+                self.LogError(
+                    "Validation Error: Error parsing command string in GetFuelHistory: "
+                    + CmdString
+                )
+                return msgbody
+
+            Minutes = 0
+            Option = ""
+            if len(CmdList) == 2:
+                ParseList = CmdList[1].split(",")
+                if len(ParseList) > 2:
+                    self.LogError(
+                        "Validation Error: Error parsing command string in GetFuelHistory (parse2): "
+                        + CmdString
+                    )
+                    return msgbody
+                if len(ParseList[0].strip()):
+                    Minutes = int(ParseList[0].strip())
+                if len(ParseList) == 2:
+                    Option = ParseList[1].strip().lower()
+            if not Option in ["", "rate", "refills"]:
+                return msgbody
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error in  GetFuelHistory (Parse): %s : %s" % (CmdString, str(e1))
+            )
+            return msgbody
+
+        try:
+            StartTime = None if not Minutes else time.time() - (Minutes * 60)
+            with self.FuelLock:
+                if Option == "rate":
+                    return self.GetFuelConsumptionRate(StartTime)
+                if Option == "refills":
+                    return [
+                        [
+                            datetime.datetime.fromtimestamp(TimeStamp).strftime("%x %X"),
+                            str(round(Before, 2)),
+                            str(round(After, 2)),
+                        ]
+                        for TimeStamp, Before, After in reversed(
+                            self.FuelLogStore.GetRefills(StartTime)
+                        )
+                    ]
+                Times, Values = self.FuelLogStore.GetReducedEntries(StartTime, 500)
+            return [
+                [
+                    datetime.datetime.fromtimestamp(TimeStamp).strftime("%x %X"),
+                    str(round(Value, 2)),
+                ]
+                for TimeStamp, Value in zip(reversed(Times), reversed(Values))
+            ]
+        except Exception as e1:
+            self.LogErrorLine("Error in  GetFuelHistory: " + str(e1))
+            return "Error in  GetFuelHistory: " + str(e1)
+
+    # ------------ GeneratorController::GetFuelConsumptionRate-------------------
+    # returns the fuel used and the average consumption rate since StartTime
+    # (None is the whole log) and since the last refill, from the running
+    # totals kept by the fuel log
+    def GetFuelConsumptionRate(self, StartTime=None):
+
+        ReturnDict = collections.OrderedDict()
+        try:
+            Units = "L" if self.UseMetric else "gal"
+            FuelUsed, Seconds = self.FuelLogStore.GetConsumption(StartTime)
+            Refills = self.FuelLogStore.GetRefills()
+            if len(Refills) and (StartTime == None or Refills[-1][0] > StartTime):
+                # the rate since the last refill is the best estimate of the
+                # current rate
+                ReturnDict["Last Refill"] = datetime.datetime.fromtimestamp(
+                    Refills[-1][0]
+                ).strftime("%x %X")
+                RateUsed, RateSeconds = self.FuelLogStore.GetConsumption(Refills[-1][0])
+            else:
+                RateUsed, RateSeconds = FuelUsed, Seconds
+
+            ReturnDict["Fuel Used"] = "%.2f %%" % FuelUsed
+            if self.TankSize:
+                ReturnDict["Fuel Used (" + Units + ")"] = "%.2f %s" % (
+                    FuelUsed * 0.01 * float(self.TankSize),
+                    Units,
+                )
+            ReturnDict["Time Period"] = "%.2f hours" % (Seconds / 3600.0)
+            if RateSeconds <= 0:
+                ReturnDict["Consumption Rate"] = "Unknown"
+                return ReturnDict
+            Rate = RateUsed / (RateSeconds / 3600.0)  # percent per hour
+            ReturnDict["Consumption Rate"] = "%.3f %%/hour" % Rate
+            if self.TankSize:
+                ReturnDict["Consumption Rate (" + Units + ")"] = "%.3f %s/hour" % (
+                    Rate * 0.01 * float(self.TankSize),
+                    Units,
+                )
+            if Rate > 0:
+                ReturnDict["Estimated Time Remaining"] = "%.1f days" % (
+                    self.FuelLogStore.LastValue / Rate / 24.0
+                )
+        except Exception as e1:
+            self.LogErrorLine("Error in GetFuelConsumptionRate: " + str(e1))
+        return ReturnDict
+
+    # ----------  GeneratorController::PowerLogPrune-----------------------------
+    # ----------  Daily housekeeping on the kW log
+    def PowerLogPrune(self):
+
+        time.sleep(1)
+        # wait a day before the first check, same as the previous check in PowerMeter
+        while True:
+            if self.WaitForExit("PowerLogPrune", 60 * 60 * 24):
+                return
+            try:
+                if not self.PowerMeterIsSupported() or self.PowerLogStore == None:
+                    continue
+                # delete log entries greater than three years
+                self.PrunePowerLog(60 * 24 * 30 * 36)
+            except Exception as e1:
+                self.LogErrorLine("Error in PowerLogPrune: " + str(e1))
+
     # ----------  GeneratorController::PowerMeter--------------------------------
     # ----------  Monitors Power Output
     def PowerMeter(self):
@@ -1796,37 +2130,22 @@ class GeneratorController(MySupport):
 
         # if power meter is not supported do nothing.
         # Note: This is done since if we killed the thread here
-        while not self.PowerMeterIsSupported() or not len(self.PowerLog):
+        while not self.PowerMeterIsSupported() or self.PowerLogStore == None:
             if self.WaitForExit("PowerMeter", 60):
                 return
 
-        # if log file is empty or does not exist, make a zero entry in log to denote start of collection
-        if not os.path.isfile(self.PowerLog) or os.path.getsize(self.PowerLog) == 0:
-            TimeStamp = datetime.datetime.now().strftime("%x %X")
-            self.LogError("Creating Power Log: " + self.PowerLog)
-            self.LogToPowerLog(TimeStamp, "0.0")
+        # if log file is empty, make a zero entry in log to denote start of collection
+        if self.PowerLogStore.Count == 0:
+            self.LogError("Creating Power Log: " + self.PowerLogStore.FileName)
+            self.LogToPowerLog(datetime.datetime.now(), 0.0)
 
         LastValue = 0.0
-        LastPruneTime = datetime.datetime.now()
         LastFuelCheckTime = datetime.datetime.now()
         while True:
             try:
                 if self.WaitForExit("PowerMeter", 10):
                     return
 
-                # Housekeeping on kw Log
-                if LastValue == 0:
-                    if (
-                        self.GetDeltaTimeMinutes(
-                            datetime.datetime.now() - LastPruneTime
-                        )
-                        > 1440
-                    ):  # check every day
-                        self.PrunePowerLog(
-                            60 * 24 * 30 * 36
-                        )  # delete log entries greater than three years
-                        LastPruneTime = datetime.datetime.now()
-
                 if (
                     self.GetDeltaTimeMinutes(
                         datetime.datetime.now() - LastFuelCheckTime
@@ -1846,13 +2165,11 @@ class GeneratorController(MySupport):
 
                 if LastValue == 0:
                     StartTime = datetime.datetime.now() - datetime.timedelta(seconds=1)
-                    TimeStamp = StartTime.strftime("%x %X")
-                    self.LogToPowerLog(TimeStamp, str(LastValue))
+                    self.LogToPowerLog(StartTime, LastValue)
 
                 LastValue = KWFloat
                 # Log to file
-                TimeStamp = datetime.datetime.now().strftime("%x %X")
-                self.LogToPowerLog(TimeStamp, str(KWFloat))
+                self.LogToPowerLog(datetime.datetime.now(), KWFloat)
 
             except Exception as e1:
                 self.LogErrorLine("Error in PowerMeter: " + str(e1))
@@ -2766,6 +3083,8 @@ class GeneratorController(MySupport):
                     if self.TankData == None:
                         bInitTiles = True
                     self.TankData = json.loads(CmdList[1])
+                    self.DataGeneration += 1
+                    self.NotifyChange()
                 if bInitTiles:
                     self.UseExternalFuelData = True
                     self.SetupTiles()
@@ -2793,6 +3112,8 @@ class GeneratorController(MySupport):
                         bInitTempTiles = True
                     self.ExternalTempData = json.loads(CmdList[1])
                     self.ExternalTempDataTime = datetime.datetime.now()
+                    self.DataGeneration += 1
+                    self.NotifyChange()
                 else:
                     self.LogError("Error in  SetExternalTemperatureData: invalid input: " + str(len(CmdList)))
                     return "Error"
@@ -2847,6 +3168,8 @@ class GeneratorController(MySupport):
                 CmdList = command.split("=")
                 if len(CmdList) == 2:
                     self.ExternalTempBounds = json.loads(CmdList[1])
+                    self.DataGeneration += 1
+                    self.NotifyChange()
 
                 else:
                     self.LogError("Error in  SetExternalTemperatureBounds: invalid input: " + str(len(CmdList)))
@@ -2867,6 +3190,8 @@ class GeneratorController(MySupport):
                     if self.ExternalCTData == None:
                         bInitTiles = True
                     self.ExternalCTData = json.loads(CmdList[1])
+                    self.DataGeneration += 1
+                    self.NotifyChange()
                 if bInitTiles:
                     self.UseExternalCTData = True
                     self.SetupTiles()
@@ -2878,6 +3203,23 @@ class GeneratorController(MySupport):
             return "Error"
         return "OK"
 
+    # ----------  GeneratorController::GetDataGeneration-------------------------
+    # returns a value that changes when a register value changes or external
+    # data is received, used to tell if cached status output is still valid
+    def GetDataGeneration(self):
+        return (self.Registers.Sequence, self.DataGeneration)
+
+    # ----------  GeneratorController::NotifyChange------------------------------
+    # called when register values, external data, the outage state or the
+    # alarm state change, genmon uses this to push changes to subscribers
+    def NotifyChange(self):
+
+        try:
+            if self.ChangeCallback != None:
+                self.ChangeCallback()
+        except Exception as e1:
+            self.LogErrorLine("Error in NotifyChange: " + str(e1))
+
     # ----------  GeneratorController::GetExternalCTData-------------------------
     def GetExternalCTData(self):
         try:
@@ -3299,6 +3641,18 @@ class GeneratorController(MySupport):
             except:
                 pass
 
+            try:
+                self.KillThread("PowerLogPrune")
+            except:
+                pass
+
+            try:
+                # write any buffered log entries
+                if self.LogWriter != None:
+                    self.LogWriter.Close()
+            except:
+                pass
+
         except Exception as e1:
             self.LogErrorLine("Error Closing Controller: " + str(e1))
 
@@ -513,36 +513,90 @@ class CustomController(GeneratorController):
                 self.ValidateConfig()
                 if not self.ConfigValidated:
                     return
-            for Register, RegisterData in self.controllerimport["log_registers"].items():
-                if not isinstance(RegisterData, dict):
-                    self.LogDebug("Invalid register data in log register description")
-                    return
-                try:
-                    Length = RegisterData["length"]
-                    Step = RegisterData["step"]
-                    Iteration = RegisterData["iteration"]
-                    RegisterInt = int(Register, 16)
-                    while(Iteration > 0):
-                        Register = "%04x" % RegisterInt
-                        if self.IsStopping:
-                            return
-                        localTimeoutCount = self.ModBus.ComTimoutError
-                        localSyncError = self.ModBus.ComSyncError
-                        self.ModBus.ProcessTransaction(Register, Length / 2)
-                        if (
-                            localSyncError != self.ModBus.ComSyncError
-                            or localTimeoutCount != self.ModBus.ComTimoutError
-                        ) and self.ModBus.RxPacketCount:
-                            self.WaitAndPergeforTimeout()
-                        RegisterInt += Step
-                        Iteration -= 1
-
-                except Exception as e1:
-                    self.LogErrorLine("Error in MasterEmulation: " + str(e1))
+            with self.ModBus.BusPriority(self.ModBus.BUS_PRIORITY_LOG):
+                for Register, RegisterData in self.controllerimport["log_registers"].items():
+                    if not isinstance(RegisterData, dict):
+                        self.LogDebug("Invalid register data in log register description")
+                        return
+                    try:
+                        Length = RegisterData["length"]
+                        Step = RegisterData["step"]
+                        Iteration = RegisterData["iteration"]
+                        RegisterInt = int(Register, 16)
+                        LogName = Register
+                        if self.IncrementalLogRead and RegisterData.get("newest_first", False):
+                            # newest entry is first, older entries shift down as entries are added
+                            localTimeoutCount = self.ModBus.ComTimoutError
+                            localSyncError = self.ModBus.ComSyncError
+                            if not self.ReadLogRegisters(RegisterInt, Iteration, Step, Length / 2):
+                                return
+                            if (
+                                localSyncError != self.ModBus.ComSyncError
+                                or localTimeoutCount != self.ModBus.ComTimoutError
+                            ) and self.ModBus.RxPacketCount:
+                                self.WaitAndPergeforTimeout()
+                            continue
+                        # optional register (i.e. log count or index) that changes when the log changes
+                        HeadRegister = RegisterData.get("head_register", None)
+                        if self.IncrementalLogRead and HeadRegister != None:
+                            Head = self.ModBus.ProcessTransaction(
+                                HeadRegister, RegisterData.get("head_length", 2) / 2, skipupdate=True
+                            )
+                            if not len(Head) or not self.LogHeadChanged(LogName, Head):
+                                continue
+                        Complete = True
+                        while(Iteration > 0):
+                            Register = "%04x" % RegisterInt
+                            if self.IsStopping:
+                                return
+                            localTimeoutCount = self.ModBus.ComTimoutError
+                            localSyncError = self.ModBus.ComSyncError
+                            if not len(self.ModBus.ProcessTransaction(Register, Length / 2)):
+                                Complete = False
+                            if (
+                                localSyncError != self.ModBus.ComSyncError
+                                or localTimeoutCount != self.ModBus.ComTimoutError
+                            ) and self.ModBus.RxPacketCount:
+                                self.WaitAndPergeforTimeout()
+                            RegisterInt += Step
+                            Iteration -= 1
+                        if self.IncrementalLogRead and HeadRegister != None and Complete:
+                            self.SetLogFullRead(LogName, Head)
+
+                    except Exception as e1:
+                        self.LogErrorLine("Error in MasterEmulation: " + str(e1))
 
         except Exception as e1:
             self.LogErrorLing("Error in UpdateLogRegistersAsMaster: " + str(e1))
 
+    # -------------CustomController:GetAlwaysReadRegisters-----------------------
+    # status, alarm and utility voltage registers from the controller config,
+    # read every poll cycle so alarms and outages are detected without delay
+    def GetAlwaysReadRegisters(self):
+
+        RegisterList = []
+        try:
+            Entries = []
+            for Key in [
+                "switch_state",
+                "alarm_active",
+                "alarm_conditions",
+                "generator_status",
+                "engine_state",
+                "linevoltage",
+            ]:
+                Entries.append(self.controllerimport.get(Key, None))
+            while len(Entries):
+                Entry = Entries.pop()
+                if isinstance(Entry, list):
+                    Entries.extend(Entry)
+                elif isinstance(Entry, dict) and "reg" in Entry:
+                    if Entry["reg"] not in RegisterList:
+                        RegisterList.append(Entry["reg"])
+        except Exception as e1:
+            self.LogErrorLine("Error in GetAlwaysReadRegisters: " + str(e1))
+        return RegisterList
+
     # -------------CustomController:MasterEmulation------------------------------
     def MasterEmulation(self):
 
@@ -552,17 +606,28 @@ class CustomController(GeneratorController):
                 if not self.ConfigValidated:
                     return
             
+            RegisterList = []
+            NoMerge = []
             for Register, RegisterData in self.controllerimport["base_registers"].items():
                 if isinstance(RegisterData, dict):
                     Length = RegisterData["length"]
+                    # registers the controller will not return as part of a block read
+                    if RegisterData.get("do_not_merge", False):
+                        NoMerge.append(Register)
                 else:
                     Length = RegisterData
+                RegisterList.append((Register, Length))
+
+            ReadPlan = self.GetReadPlan(
+                RegisterList, NoMerge=NoMerge, AlwaysRead=self.GetAlwaysReadRegisters()
+            )
+            for Blocks in self.GetReadBatches(ReadPlan):
                 try:
                     if self.IsStopping:
                         return
                     localTimeoutCount = self.ModBus.ComTimoutError
                     localSyncError = self.ModBus.ComSyncError
-                    self.ModBus.ProcessTransaction(Register, Length / 2)
+                    self.ProcessReadBlocks(Blocks)
                     if (
                         localSyncError != self.ModBus.ComSyncError
                         or localTimeoutCount != self.ModBus.ComTimoutError
@@ -636,6 +701,7 @@ class CustomController(GeneratorController):
                 msgbody += "For additional information : " + self.UserURL + "\n"
             if not EngineState == self.LastEngineState:
                 self.LastEngineState = EngineState
+                self.NotifyChange()
                 
                 self.UpdateLogRegistersAsMaster()
 
@@ -652,12 +718,14 @@ class CustomController(GeneratorController):
             # Check for Alarms
             if self.SystemInAlarm():
                 if not self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Active at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
                     self.MessagePipe.SendMessage(msgsubject, msgbody, msgtype="warn")
             else:
                 if self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Clear at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
@@ -703,8 +771,8 @@ class CustomController(GeneratorController):
                             + self.HexStringToString(Value) +"]"
                         )
                         return False
-                    else:
-                        self.Registers[Register] = Value
+                    elif self.Registers.Set(Register, Value) != Value:
+                        self.NotifyChange()
                 else:
                     # TODO Validate log registers
                     ReturnStatus, LogRegLength, Name = self.RegisterIsLog(Register)
@@ -741,6 +809,23 @@ class CustomController(GeneratorController):
             self.LogErrorLine("Error in GetRegisterLabels: " + str(e1))
         return "{}"
 
+    # ---------------------CustomController::GetAlarmState-----------------------
+    # return a description of the current alarm, "" if none
+    def GetAlarmState(self):
+
+        try:
+            if not self.SystemInAlarm():
+                return ""
+            for Key in ["alarm_conditions", "alarm_active"]:
+                if Key in self.controllerimport:
+                    AlarmState = self.GetExtendedDisplayString(self.controllerimport, Key)
+                    if len(AlarmState) and not AlarmState == "Unknown":
+                        return AlarmState
+            return ""
+        except Exception as e1:
+            self.LogErrorLine("Error in GetAlarmState: " + str(e1))
+            return ""
+
     # ---------------------CustomController::SystemInAlarm-----------------------
     # return True if generator is in alarm, else False
     def SystemInAlarm(self):
@@ -1254,7 +1339,7 @@ class CustomController(GeneratorController):
                         self.LogDebug("Error in SetGeneratorRemoteCommand: invalid command sequence")
                         continue
 
-                    with self.ModBus.CommAccessLock:
+                    with self.ModBus.CommAccessLock.Priority(self.ModBus.BUS_PRIORITY_CONTROL):
                         return self.ExecuteCommandSequence(command_sequence)
         except Exception as e1:
             self.LogErrorLine("Error in SetGeneratorRemoteCommand: " + str(e1))
@@ -1641,12 +1726,13 @@ class CustomController(GeneratorController):
 
             RegList = []
 
-            Regs["Num Regs"] = "%d" % len(self.Registers)
+            # a consistent copy, the registers may change while iterating
+            Sequence, RegisterValues = self.Registers.Snapshot()
+            Regs["Num Regs"] = "%d" % len(RegisterValues)
 
             Regs["Base Registers"] = RegList
             # display all the registers
-            temp_regsiters = self.Registers
-            for Register, Value in temp_regsiters.items():
+            for Register, Value in RegisterValues.items():
                 RegList.append({Register: Value})
 
         except Exception as e1:
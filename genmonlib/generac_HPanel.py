@@ -16,6 +16,7 @@ import threading
 
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_file import ModbusFile
+from genmonlib.myalarmcatalog import MyAlarmCatalog
 from genmonlib.mymodbus import ModbusProtocol
 from genmonlib.mytile import MyTile
 
@@ -1116,6 +1117,7 @@ class HPanel(GeneratorController):
         self.HPanelDetected = True  # False if G-Panel
         self.Reg = HPanelReg()
         self.IO = HPanelIO()
+        self.LoadConditionCatalogs()
 
         self.DaysOfWeek = {
             1: "Sunday",  # decode for register values with day of week
@@ -1244,11 +1246,13 @@ class HPanel(GeneratorController):
                 self.HPanelDetected = True
                 self.Reg = HPanelReg()
                 self.IO = HPanelIO()
+                self.LoadConditionCatalogs()
             else:
                 self.LogError("Detected G-Panel Controller")
                 self.HPanelDetected = False
                 self.Reg = GPanelReg()
                 self.IO = GPanelIO()
+                self.LoadConditionCatalogs()
             return True
         except Exception as e1:
             self.LogErrorLine("Error in IdentifyController: " + str(e1))
@@ -1596,32 +1600,49 @@ class HPanel(GeneratorController):
     def GetGeneratorLogFileData(self):
 
         try:
-            for RegValue in range(
-                EVENT_LOG_START + EVENT_LOG_ENTRIES - 1, EVENT_LOG_START - 1, -1
-            ):
-                Register = "%04x" % RegValue
-                localTimeoutCount = self.ModBus.ComTimoutError
-                localSyncError = self.ModBus.ComSyncError
-                self.ModBus.ProcessFileReadTransaction(Register, EVENT_LOG_LENGTH / 2)
-                if (
-                    localSyncError != self.ModBus.ComSyncError
-                    or localTimeoutCount != self.ModBus.ComTimoutError
-                ) and self.ModBus.RxPacketCount:
-                    self.WaitAndPergeforTimeout()
-            for RegValue in range(
-                ALARM_LOG_START + ALARM_LOG_ENTRIES - 1, ALARM_LOG_START - 1, -1
-            ):
+            self.ReadLogFileRecords(EVENT_LOG_START, EVENT_LOG_ENTRIES, EVENT_LOG_LENGTH)
+            self.ReadLogFileRecords(ALARM_LOG_START, ALARM_LOG_ENTRIES, ALARM_LOG_LENGTH)
+        except Exception as e1:
+            self.LogErrorLine("Error in GetGeneratorLogFileData: " + str(e1))
+
+    # ------------ HPanel:ReadLogFileRecords ------------------------------------
+    # Length is in bytes. If incremental_log_read is enabled the first and last
+    # records are read and the log is only read if one of them has changed
+    def ReadLogFileRecords(self, Start, Entries, Length):
+
+        try:
+            Name = "%04x" % Start
+            Ends = ["%04x" % Start, "%04x" % (Start + Entries - 1)]
+            if self.IncrementalLogRead and not self.LogNeedsFullRead(Name):
+                Head = [
+                    self.ModBus.ProcessFileReadTransaction(Register, Length / 2)
+                    for Register in Ends
+                ]
+                if "" in Head or not self.LogHeadChanged(Name, Head):
+                    return
+
+            Complete = True
+            for RegValue in range(Start + Entries - 1, Start - 1, -1):
+                if self.IsStopping:
+                    return
                 Register = "%04x" % RegValue
                 localTimeoutCount = self.ModBus.ComTimoutError
                 localSyncError = self.ModBus.ComSyncError
-                self.ModBus.ProcessFileReadTransaction(Register, ALARM_LOG_LENGTH / 2)
+                if not len(
+                    self.ModBus.ProcessFileReadTransaction(Register, Length / 2)
+                ):
+                    Complete = False
                 if (
                     localSyncError != self.ModBus.ComSyncError
                     or localTimeoutCount != self.ModBus.ComTimoutError
                 ) and self.ModBus.RxPacketCount:
                     self.WaitAndPergeforTimeout()
+            if Complete:
+                self.SetLogFullRead(
+                    Name, [self.FileData.get(Register, "") for Register in Ends]
+                )
         except Exception as e1:
-            self.LogErrorLine("Error in GetGeneratorLogFileData: " + str(e1))
+            self.LogErrorLine("Error in ReadLogFileRecords: " + str(e1))
 
     # -------------HPanel:GetGeneratorStrings------------------------------------
     def GetGeneratorStrings(self):
@@ -1648,6 +1669,35 @@ class HPanel(GeneratorController):
         except Exception as e1:
             self.LogErrorLine("Error in GetGeneratorStrings: " + str(e1))
 
+    # -------------HPanel:GetAlarmRegisters--------------------------------------
+    # registers decoded with the alarms condition catalog
+    def GetAlarmRegisters(self):
+
+        return [
+            self.Reg.OUTPUT_1[REGISTER],
+            self.Reg.OUTPUT_2[REGISTER],
+            self.Reg.OUTPUT_3[REGISTER],
+            self.Reg.OUTPUT_4[REGISTER],
+            self.Reg.OUTPUT_5[REGISTER],
+            self.Reg.OUTPUT_6[REGISTER],
+            self.Reg.OUTPUT_7[REGISTER],
+            self.Reg.OUTPUT_8[REGISTER],
+        ]
+
+    # -------------HPanel:GetAlwaysReadRegisters---------------------------------
+    # status, alarm and utility voltage registers, read every poll cycle so
+    # alarms and outages are detected without delay
+    def GetAlwaysReadRegisters(self):
+
+        return self.GetAlarmRegisters() + [
+            self.Reg.ALARM_ACK[REGISTER],
+            self.Reg.ACTIVE_ALARM_COUNT[REGISTER],
+            self.Reg.ENGINE_STATUS_CODE[REGISTER],
+            self.Reg.KEY_SWITCH_STATE[REGISTER],
+            self.Reg.EXT_SW_GENERAL_STATUS[REGISTER],
+            self.Reg.EXT_SW_UTILITY_AVG_VOLTS[REGISTER],
+        ]
+
     # -------------HPanel:MasterEmulation----------------------------------------
     def MasterEmulation(self):
 
@@ -1656,15 +1706,20 @@ class HPanel(GeneratorController):
                 self.IdentifyController()
                 if not self.ControllerDetected:
                     return
-            for RegisterList in self.Reg.GetRegList():
+            ReadPlan = self.GetReadPlan(
+                [
+                    (RegisterList[REGISTER], RegisterList[LENGTH])
+                    for RegisterList in self.Reg.GetRegList()
+                ],
+                AlwaysRead=self.GetAlwaysReadRegisters(),
+            )
+            for Blocks in self.GetReadBatches(ReadPlan):
                 try:
                     if self.IsStopping:
                         return
                     localTimeoutCount = self.ModBus.ComTimoutError
                     localSyncError = self.ModBus.ComSyncError
-                    self.ModBus.ProcessTransaction(
-                        RegisterList[REGISTER], RegisterList[LENGTH] / 2
-                    )
+                    self.ProcessReadBlocks(Blocks)
                     if (
                         localSyncError != self.ModBus.ComSyncError
                         or localTimeoutCount != self.ModBus.ComTimoutError
@@ -1673,8 +1728,10 @@ class HPanel(GeneratorController):
                 except Exception as e1:
                     self.LogErrorLine("Error in MasterEmulation: " + str(e1))
 
-            self.GetGeneratorStrings()
-            self.GetGeneratorFileData()
+            # file record reads wait behind commands and polling for the bus
+            with self.ModBus.BusPriority(self.ModBus.BUS_PRIORITY_LOG):
+                self.GetGeneratorStrings()
+                self.GetGeneratorFileData()
             self.CheckForAlarmEvent.set()
         except Exception as e1:
             self.LogErrorLine("Error in MasterEmulation: " + str(e1))
@@ -1695,19 +1752,24 @@ class HPanel(GeneratorController):
                 LineState = "Generator"
         return LineState
 
+    # ------------ HPanel:LoadConditionCatalogs --------------------------------
+    # indexes the alarm, input and output bit tables for the detected controller
+    def LoadConditionCatalogs(self):
+
+        self.ConditionCatalogs = {
+            "alarms": MyAlarmCatalog(table=self.IO.Alarms, log=self.log),
+            "inputs": MyAlarmCatalog(table=self.IO.Inputs, log=self.log),
+            "outputs": MyAlarmCatalog(table=self.IO.Outputs, log=self.log),
+        }
+
     # ------------ HPanel:GetCondition ------------------------------------------
     def GetCondition(self, RegList=None, type=None):
 
         try:
             if type == None or RegList == None:
                 return []
-            if type.lower() == "alarms":
-                Lookup = self.IO.Alarms
-            elif type.lower() == "inputs":
-                Lookup = self.IO.Inputs
-            elif type.lower() == "outputs":
-                Lookup = self.IO.Outputs
-            else:
+            Lookup = self.ConditionCatalogs.get(type.lower(), None)
+            if Lookup == None:
                 self.LogError(
                     "Error in GetCondition: Invalid input for type: " + str(type)
                 )
@@ -1716,14 +1778,7 @@ class HPanel(GeneratorController):
             StringList = []
             for Register in RegList:
                 Output = self.GetParameter(Register, ReturnInt=True)
-                Mask = 1
-                while Output:
-                    if Output & 0x01:
-                        Value = Lookup.get((Register, Mask), None)
-                        if not Value == None:
-                            StringList.append(Value)
-                    Mask <<= 1
-                    Output >>= 1
+                StringList.extend(Lookup.GetConditions(Register, Output))
 
             return StringList
         except Exception as e1:
@@ -1839,6 +1894,7 @@ class HPanel(GeneratorController):
                 msgbody += "For additional information : " + self.UserURL + "\n"
             if not EngineState == self.LastEngineState:
                 self.LastEngineState = EngineState
+                self.NotifyChange()
                 msgsubject = "Generator Notice: " + self.SiteName
                 if not self.SystemInAlarm():
                     msgbody += "NOTE: This message is a notice that the state of the generator has changed. The system is not in alarm.\n"
@@ -1852,12 +1908,14 @@ class HPanel(GeneratorController):
             # Check for Alarms
             if self.SystemInAlarm():
                 if not self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Active at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
                     self.MessagePipe.SendMessage(msgsubject, msgbody, msgtype="warn")
             else:
                 if self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Clear at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
@@ -1942,7 +2000,8 @@ class HPanel(GeneratorController):
 
             if not IsFile and self.RegisterIsBaseRegister(Register, Value):
                 # TODO validate register length
-                self.Registers[Register] = Value
+                if self.Registers.Set(Register, Value) != Value:
+                    self.NotifyChange()
             elif not IsFile and self.RegisterIsStringRegister(Register):
                 # TODO validate register string length
                 self.Strings[Register] = Value
@@ -1967,6 +2026,20 @@ class HPanel(GeneratorController):
             self.LogErrorLine("Error in UpdateRegisterList: " + str(e1))
             return False
 
+    # ---------------------HPanel::GetAlarmState---------------------------------
+    # return a description of the current alarm, "" if none
+    def GetAlarmState(self):
+
+        try:
+            if not self.SystemInAlarm():
+                return ""
+            return ", ".join(
+                self.GetCondition(RegList=self.GetAlarmRegisters(), type="alarms")
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in GetAlarmState: " + str(e1))
+            return ""
+
     # ---------------------HPanel::SystemInAlarm---------------------------------
     # return True if generator is in alarm, else False
     def SystemInAlarm(self):
@@ -2731,18 +2804,10 @@ class HPanel(GeneratorController):
                 }
             )
 
-            OutputList = [
-                self.Reg.OUTPUT_1[REGISTER],
-                self.Reg.OUTPUT_2[REGISTER],
-                self.Reg.OUTPUT_3[REGISTER],
-                self.Reg.OUTPUT_4[REGISTER],
-                self.Reg.OUTPUT_5[REGISTER],
-                self.Reg.OUTPUT_6[REGISTER],
-                self.Reg.OUTPUT_7[REGISTER],
-                self.Reg.OUTPUT_8[REGISTER],
-            ]
             if self.SystemInAlarm():
-                AlarmList = self.GetCondition(RegList=OutputList, type="alarms")
+                AlarmList = self.GetCondition(
+                    RegList=self.GetAlarmRegisters(), type="alarms"
+                )
                 if len(AlarmList):
                     Alarms.append({"Alarm List": AlarmList})
 
@@ -3284,12 +3349,13 @@ class HPanel(GeneratorController):
 
             RegList = []
 
-            Regs["Num Regs"] = "%d" % len(self.Registers)
+            # a consistent copy, the registers may change while iterating
+            Sequence, RegisterValues = self.Registers.Snapshot()
+            Regs["Num Regs"] = "%d" % len(RegisterValues)
 
             Regs["Base Registers"] = RegList
             # display all the registers
-            temp_regsiters = self.Registers
-            for Register, Value in temp_regsiters.items():
+            for Register, Value in RegisterValues.items():
                 RegList.append({Register: Value})
 
             if AllRegs:
@@ -3652,11 +3718,6 @@ class HPanel(GeneratorController):
             self.LogErrorLine("Error in CheckExternalCTData: " + str(e1))
             return DefaultReturn
 
-    # ----------  HPanel:GetCommStatus  -----------------------------------------
-    # return Dict with communication stats
-    def GetCommStatus(self):
-        return self.ModBus.GetCommStats()
-
     # ------------ HPanel:GetBaseStatus -----------------------------------------
     # return one of the following: "ALARM", "SERVICEDUE", "EXERCISING", "RUNNING",
     # "RUNNING-MANUAL", "OFF", "MANUAL", "READY"
@@ -25,10 +25,12 @@ else:
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_evo2 import ModbusEvo2
 from genmonlib.modbus_file import ModbusFile
+from genmonlib.myalarmcatalog import MyAlarmCatalog
 from genmonlib.mytile import MyTile
 
 # -------------------Generator specific const defines for Generator class--------
 LOG_DEPTH = 50
+MAX_LOG_CACHE_ENTRIES = 1024  # parsed log entries kept before the cache is cleared
 START_LOG_STARTING_REG = (
     0x012C  # the most current start log entry should be at this register
 )
@@ -99,6 +101,10 @@ class Evolution(GeneratorController):
         self.LiquidCooled = None
         self.LiquidCooledParams = None
         self.SavedFirmwareVersion = None
+        # Log Info
+        self.LogEntryCache = {}  # (register, value) : parsed log entry
+        self.LogListCache = {}  # (title, start register, all, raw) : (sequence, log list)
+        self.LogCacheContext = None  # controller settings used to parse the cached logs
         # State Info
         self.GeneratorInAlarm = (
             False  # Flag to let the heartbeat thread know there is a problem
@@ -306,6 +312,7 @@ class Evolution(GeneratorController):
             )
             with open(self.AlarmFile, "r") as AlarmFile:  #
                 pass
+            self.AlarmCatalog = MyAlarmCatalog(filename=self.AlarmFile, log=self.log)
         except Exception as e1:
             self.LogErrorLine("Unable to open alarm file: " + str(e1))
             sys.exit(1)
@@ -1134,7 +1141,7 @@ class Evolution(GeneratorController):
         Value = self.GetRegisterValueFromList("0000")
         if len(Value) != 4:
             return ""
-        ProductModel = int(Value, 16)
+        ProductModel = self.Registers.GetInt("0000")
         # 0x02  Pre-Nexus
         # 0x03  Nexus, Air Cooled
         # 0x06  Nexus, Liquid Cooled
@@ -1263,7 +1270,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("0000")
             if len(Value) != 4:
                 return ""
-            ProductModel = int(Value, 16)
+            ProductModel = self.Registers.GetInt("0000")
 
             return ControllerDecoder.get(ProductModel, "Unknown 0x%02X" % ProductModel)
         else:
@@ -1291,48 +1298,67 @@ class Evolution(GeneratorController):
 
         return outstr
 
+    # -------------Evolution:ReadPrimeRegisters----------------------------------
+    # returns False if we are exiting
+    def ReadPrimeRegisters(self):
+
+        for PrimeReg, PrimeInfo in self.PrimeRegisters.items():
+            localTimeoutCount = self.ModBus.ComTimoutError
+            localSyncError = self.ModBus.ComSyncError
+            # prime registers are used to detect alarms
+            with self.ModBus.BusPriority(self.ModBus.BUS_PRIORITY_ALARM):
+                self.ModBus.ProcessTransaction(
+                    PrimeReg, int(PrimeInfo[self.REGLEN] / 2)
+                )
+            if self.IsStopping:
+                return False
+            if (
+                localSyncError != self.ModBus.ComSyncError
+                or localTimeoutCount != self.ModBus.ComTimoutError
+            ) and self.ModBus.RxPacketCount:
+                # if we get here a timeout occured, and we have recieved at least one good packet
+                # this logic is to keep from receiving a packet that we have already requested once we
+                # timeout and start to request another
+                # Wait for a bit to allow any missed response from the controller to arrive
+                # otherwise this could get us out of sync
+                # This assumes MasterEmulation is called from ProcessThread
+                if self.WaitForExit(
+                    "ProcessThread",
+                    float(self.ModBus.ModBusPacketTimoutMS / 1000.0),
+                ):  #
+                    return False
+                self.ModBus.Flush()
+        # check for unknown events (i.e. events we are not decoded) and send an email if they occur
+        self.CheckForAlarmEvent.set()
+        return True
+
     # -------------Evolution:MasterEmulation-------------------------------------
     def MasterEmulation(self):
 
         counter = 0
-        for Reg, Info in self.BaseRegisters.items():
+        # the status, alarm and utility voltage registers are the prime
+        # registers (read below), 0056 and 0057 are engine status bits
+        ReadPlan = self.GetReadPlan(
+            [(Reg, Info[self.REGLEN]) for Reg, Info in self.BaseRegisters.items()],
+            AlwaysRead=list(self.PrimeRegisters.keys()) + ["0056", "0057"],
+        )
+        for Block in ReadPlan:
 
             if counter % 6 == 0:
-                for PrimeReg, PrimeInfo in self.PrimeRegisters.items():
-                    localTimeoutCount = self.ModBus.ComTimoutError
-                    localSyncError = self.ModBus.ComSyncError
-                    self.ModBus.ProcessTransaction(
-                        PrimeReg, int(PrimeInfo[self.REGLEN] / 2)
-                    )
-                    if self.IsStopping:
-                        return
-                    if (
-                        localSyncError != self.ModBus.ComSyncError
-                        or localTimeoutCount != self.ModBus.ComTimoutError
-                    ) and self.ModBus.RxPacketCount:
-                        # if we get here a timeout occured, and we have recieved at least one good packet
-                        # this logic is to keep from receiving a packet that we have already requested once we
-                        # timeout and start to request another
-                        # Wait for a bit to allow any missed response from the controller to arrive
-                        # otherwise this could get us out of sync
-                        # This assumes MasterEmulation is called from ProcessThread
-                        if self.WaitForExit(
-                            "ProcessThread",
-                            float(self.ModBus.ModBusPacketTimoutMS / 1000.0),
-                        ):  #
-                            return
-                        self.ModBus.Flush()
-                # check for unknown events (i.e. events we are not decoded) and send an email if they occur
-                self.CheckForAlarmEvent.set()
+                if not self.ReadPrimeRegisters():
+                    return
 
             if self.IsStopping:
                 return
-            # The divide by 2 is due to the diference in the values in our dict are bytes
-            # but modbus makes register request in word increments so the request needs to
-            # in word multiples, not bytes
-            self.ModBus.ProcessTransaction(Reg, int(Info[self.REGLEN] / 2))
+            # The read plan converts the lengths in our dict (bytes) to modbus word
+            # lengths and merges adjacent registers if block reads are enabled
+            self.ProcessReadBlock(Block)
             counter += 1
 
+        # with adaptive polling no base registers may be due this cycle
+        if counter == 0 and not self.ReadPrimeRegisters():
+            return
+
         # check that we have the serial number, if we do not then retry
         RegStr = "%04x" % SERIAL_NUM_REG
         Value = self.GetRegisterValueFromList(RegStr)  # Serial Number Register
@@ -1344,40 +1370,22 @@ class Evolution(GeneratorController):
     # -------------Evolution:UpdateLogRegistersAsMaster--------------------------
     def UpdateLogRegistersAsMaster(self):
 
-        # Start / Stop Log
-        for Register in self.LogRange(
-            START_LOG_STARTING_REG, LOG_DEPTH, START_LOG_STRIDE
-        ):
-            RegStr = "%04x" % Register
-            self.ModBus.ProcessTransaction(RegStr, START_LOG_STRIDE)
-            if self.IsStopping:
-                return
-
         if self.EvolutionController:
-            # Service Log
-            for Register in self.LogRange(
-                SERVICE_LOG_STARTING_REG, LOG_DEPTH, SERVICE_LOG_STRIDE
-            ):
-                RegStr = "%04x" % Register
-                self.ModBus.ProcessTransaction(RegStr, SERVICE_LOG_STRIDE)
-                if self.IsStopping:
-                    return
-            # Alarm Log
-            for Register in self.LogRange(
-                ALARM_LOG_STARTING_REG, LOG_DEPTH, ALARM_LOG_STRIDE
-            ):
-                RegStr = "%04x" % Register
-                self.ModBus.ProcessTransaction(RegStr, ALARM_LOG_STRIDE)
-                if self.IsStopping:
-                    return
+            Logs = [
+                [START_LOG_STARTING_REG, START_LOG_STRIDE],  # Start / Stop Log
+                [SERVICE_LOG_STARTING_REG, SERVICE_LOG_STRIDE],  # Service Log
+                [ALARM_LOG_STARTING_REG, ALARM_LOG_STRIDE],  # Alarm Log
+            ]
         else:
-            # Alarm Log
-            for Register in self.LogRange(
-                NEXUS_ALARM_LOG_STARTING_REG, LOG_DEPTH, NEXUS_ALARM_LOG_STRIDE
-            ):
-                RegStr = "%04x" % Register
-                self.ModBus.ProcessTransaction(RegStr, NEXUS_ALARM_LOG_STRIDE)
-                if self.IsStopping:
+            Logs = [
+                [START_LOG_STARTING_REG, START_LOG_STRIDE],  # Start / Stop Log
+                [NEXUS_ALARM_LOG_STARTING_REG, NEXUS_ALARM_LOG_STRIDE],  # Alarm Log
+            ]
+
+        # log reads wait behind commands and polling for the bus
+        with self.ModBus.BusPriority(self.ModBus.BUS_PRIORITY_LOG):
+            for StartReg, Stride in Logs:
+                if not self.ReadLogRegisters(StartReg, LOG_DEPTH, Stride, Stride):
                     return
 
     # ----------  GeneratorController:TestCommand--------------------------------
@@ -1508,7 +1516,7 @@ class Evolution(GeneratorController):
     def WriteIndexedRegister(self, register, value = None):
 
         try:
-            with self.ModBus.CommAccessLock:
+            with self.ModBus.CommAccessLock.Priority(self.ModBus.BUS_PRIORITY_CONTROL):
                 #
                 if value != None:
                     LowByte = value & 0x00FF
@@ -1716,7 +1724,7 @@ class Evolution(GeneratorController):
                 )
                 return msgbody
 
-        with self.ModBus.CommAccessLock:
+        with self.ModBus.CommAccessLock.Priority(self.ModBus.BUS_PRIORITY_CONTROL):
 
             if self.bEnhancedExerciseFrequency:
                 Data = []
@@ -2098,18 +2106,17 @@ class Evolution(GeneratorController):
             return False
         if not self.ValidateRegister(Register, Value):
             return False
-        RegValue = self.Registers.get(Register, "")
+        # returns the previous value, "" if this is the first time seeing this register
+        RegValue = self.Registers.Set(Register, Value)
 
         if RegValue == "":
-            self.Registers[
-                Register
-            ] = Value  # first time seeing this register so add it to the list
+            pass
         elif RegValue != Value:
             # don't print values of registers we have validated the purpose
             if not self.RegisterIsLog(Register):
                 self.MonitorUnknownRegisters(Register, RegValue, Value)
-            self.Registers[Register] = Value
             self.Changed += 1
+            self.NotifyChange()
         else:
             self.NotChanged += 1
         return True
@@ -2134,7 +2141,9 @@ class Evolution(GeneratorController):
 
             RegList = []
 
-            Regs["Num Regs"] = "%d" % len(self.Registers)
+            # a consistent copy, the registers may change while iterating
+            Sequence, RegisterValues = self.Registers.Snapshot()
+            Regs["Num Regs"] = "%d" % len(RegisterValues)
             if self.NotChanged == 0:
                 self.TotalChanged = 0.0
             else:
@@ -2145,9 +2154,7 @@ class Evolution(GeneratorController):
 
             Regs["Base Registers"] = RegList
             # print all the registers
-            # make a temp copy in case the registers change whil iterating
-            temp_regsiters = self.Registers
-            for Register, Value in temp_regsiters.items():
+            for Register, Value in RegisterValues.items():
 
                 # do not display log registers or model register
                 if self.RegisterIsLog(Register):
@@ -2256,7 +2263,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("0001")
             if len(Value) != 8:
                 return  # we don't have a value for this register yet
-            RegVal = int(Value, 16)
+            RegVal = self.Registers.GetInt("0001")
 
             RegVal = self.FilterReg0001(RegVal)
 
@@ -2272,6 +2279,7 @@ class Evolution(GeneratorController):
             # if we get past this point there is something to report, either first time through
             # or there is an alarm that has been set or reset
             self.LastAlarmValue = RegVal  # update the stored alarm
+            self.NotifyChange()
 
             self.UpdateLogRegistersAsMaster()  # Update all log registers
 
@@ -2695,7 +2703,14 @@ class Evolution(GeneratorController):
         if len(Value) == 0:
             return False, ""
         if not RawOutput:
-            LogStr = self.ParseLogEntry(Value, LogBase=LogBase)
+            # entries are only parsed when the register value changes
+            Key = (Register, Value)
+            LogStr = self.LogEntryCache.get(Key, None)
+            if LogStr == None:
+                LogStr = self.ParseLogEntry(Value, LogBase=LogBase)
+                if len(self.LogEntryCache) >= MAX_LOG_CACHE_ENTRIES:
+                    self.LogEntryCache = {}
+                self.LogEntryCache[Key] = LogStr
             if len(LogStr):  # if the register is there but no log entry exist
                 outstring += self.printToString(LogStr, nonewline=True)
         else:
@@ -2714,6 +2729,21 @@ class Evolution(GeneratorController):
         Title = Title.strip()
         Title = Title.replace(":", "")
 
+        # the log is rendered again only if one of its registers has changed
+        CacheKey = (Title, StartReg, AllLogs, RawOutput)
+        if AllLogs:
+            Sequence = max(
+                self.Registers.GetSequence(Register)
+                for Register in self.LogRange(StartReg, LOG_DEPTH, Stride)
+            )
+        else:
+            Sequence = self.Registers.GetSequence(StartReg)
+        CacheEntry = self.LogListCache.get(CacheKey, None)
+        if CacheEntry != None and CacheEntry[0] == Sequence:
+            if CacheEntry[1] != None:
+                RetValue[Title] = list(CacheEntry[1]) if AllLogs else CacheEntry[1]
+            return RetValue
+
         if AllLogs:
             for Register in self.LogRange(StartReg, LOG_DEPTH, Stride):
                 bSuccess, LogEntry = self.GetOneLogEntry(Register, StartReg, RawOutput)
@@ -2722,13 +2752,35 @@ class Evolution(GeneratorController):
                 LogList.append(LogEntry)
 
             RetValue[Title] = LogList
+            self.LogListCache[CacheKey] = (Sequence, list(LogList))
             return RetValue
         else:
             bSuccess, LogEntry = self.GetOneLogEntry(StartReg, StartReg, RawOutput)
             if bSuccess:
                 RetValue[Title] = LogEntry
+            self.LogListCache[CacheKey] = (Sequence, LogEntry if bSuccess else None)
             return RetValue
 
+    # ------------ Evolution:CheckLogCache --------------------------------------
+    # the parsed log entries depend on the controller type, firmware version,
+    # date format and alarm file, clear the cached logs if any of these change
+    def CheckLogCache(self):
+
+        self.AlarmCatalog.CheckForChange()
+        Context = (
+            self.EvolutionController,
+            self.LiquidCooled,
+            self.PreNexus,
+            self.Evolution2,
+            self.GetFirmwareVersion() if self.Evolution2 else "",
+            self.bAlternateDateFormat,
+            self.AlarmCatalog.FileMTime,
+        )
+        if Context != self.LogCacheContext:
+            self.LogEntryCache = {}
+            self.LogListCache = {}
+            self.LogCacheContext = Context
+
     # ------------ Evolution:DisplayLogs ----------------------------------------
     def DisplayLogs(self, AllLogs=False, DictOut=False, RawOutput=False):
 
@@ -2755,6 +2807,7 @@ class Evolution(GeneratorController):
 
             LogParams = EvolutionLog if self.EvolutionController else NexusLog
 
+            self.CheckLogCache()
             RetValue = collections.OrderedDict()
             LogDict = collections.OrderedDict()
 
@@ -3162,36 +3215,24 @@ class Evolution(GeneratorController):
                     # This can occur if the controller was power cycled and not alarms have occurred since power applied
                     return "Error Code 0000: No alarms occured since controller has been power cycled.\n"
 
-            with open(self.AlarmFile, "r") as AlarmFile:  # opens file
-
-                for line in AlarmFile:
-                    line = (
-                        line.strip()
-                    )  # remove newline at beginning / end and trailing whitespace
-                    if not len(line):
-                        continue
-                    if line[0] == "#":  # comment?
-                        continue
-                    Items = line.split("!")
-                    if len(Items) != 5:
-                        continue
-                    if Items[0] == str(int(ErrorCode, 16)):
-                        if ReturnNameOnly:
-                            outstr = Items[2]
-                        else:
-                            outstr = (
-                                Items[2]
-                                + ", Error Code: "
-                                + Items[0]
-                                + "\n"
-                                + "    Description: "
-                                + Items[3]
-                                + "\n"
-                                + "    Additional Info: "
-                                + Items[4]
-                                + "\n"
-                            )
-                        return outstr
+            Items = self.AlarmCatalog.Get(int(ErrorCode, 16))
+            if Items != None:
+                if ReturnNameOnly:
+                    outstr = Items[2]
+                else:
+                    outstr = (
+                        Items[2]
+                        + ", Error Code: "
+                        + Items[0]
+                        + "\n"
+                        + "    Description: "
+                        + Items[3]
+                        + "\n"
+                        + "    Additional Info: "
+                        + Items[4]
+                        + "\n"
+                    )
+                return outstr
 
         except Exception as e1:
             self.LogErrorLine("Error in  GetAlarmInfo " + str(e1))
@@ -3269,7 +3310,7 @@ class Evolution(GeneratorController):
         Value = self.GetRegisterValueFromList("0001")
         if len(Value) != 8:
             return ""
-        RegVal = int(Value, 16)
+        RegVal = self.Registers.GetInt("0001")
 
         RegVal = self.FilterReg0001(RegVal)
 
@@ -3491,7 +3532,7 @@ class Evolution(GeneratorController):
         if len(Value) != 4:
             return ""
 
-        RegVal = int(Value, 16)
+        RegVal = self.Registers.GetInt("0052")
 
         if self.LiquidCooled:
             return self.GetDigitalValues(RegVal, DealerInputs_Evo_LC)
@@ -3532,7 +3573,7 @@ class Evolution(GeneratorController):
         Value = self.GetRegisterValueFromList(Register)
         if len(Value) != 4:
             return ""
-        RegVal = int(Value, 16)
+        RegVal = self.Registers.GetInt(Register)
 
         return self.GetDigitalValues(RegVal, DigitalOutputs_LC)
 
@@ -3543,7 +3584,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("0001")
             if len(Value) != 8:
                 return ""
-            RegVal = int(Value, 16)
+            RegVal = self.Registers.GetInt("0001")
             RegVal = self.FilterReg0001(RegVal)
         else:
             RegVal = Reg0001Value
@@ -3600,7 +3641,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("0001")
             if len(Value) != 8:
                 return ""
-            RegVal = int(Value, 16)
+            RegVal = self.Registers.GetInt("0001")
             RegVal = self.FilterReg0001(RegVal)
         else:
             RegVal = Reg0001Value
@@ -4341,7 +4382,7 @@ class Evolution(GeneratorController):
         if len(Value) != 8:
             return False
 
-        RegVal = int(Value, 16)
+        RegVal = self.Registers.GetInt("0001")
 
         RegVal = self.FilterReg0001(RegVal)
 
@@ -4509,7 +4550,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("002a")
             if len(Value) != 4:
                 return ""
-            RegVal = int(Value, 16)
+            RegVal = self.Registers.GetInt("002a")
 
             IntTemp = RegVal >> 8  # high byte is firmware version
             FloatTemp = IntTemp / 100.0
@@ -4525,7 +4566,7 @@ class Evolution(GeneratorController):
             Value = self.GetRegisterValueFromList("002a")
             if len(Value) != 4:
                 return ""
-            RegVal = int(Value, 16)
+            RegVal = self.Registers.GetInt("002a")
 
             IntTemp = RegVal & 0xFF  # low byte is firmware version
             FloatTemp = IntTemp / 100.0
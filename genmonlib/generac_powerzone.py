@@ -15,6 +15,7 @@ import threading
 
 from genmonlib.controller import GeneratorController
 from genmonlib.modbus_file import ModbusFile
+from genmonlib.myalarmcatalog import MyAlarmCatalog
 from genmonlib.mymodbus import ModbusProtocol
 from genmonlib.mytile import MyTile
 
@@ -516,6 +517,7 @@ class PowerZone(GeneratorController):
         self.ControllerDetected = False
         self.Reg = PowerZoneReg()
         self.IO = PowerZoneIO()
+        self.LoadConditionCatalogs()
 
         self.DaysOfWeek = {
             0: "Sunday",  # decode for register values with day of week
@@ -969,6 +971,37 @@ class PowerZone(GeneratorController):
         except Exception as e1:
             self.LogErrorLine("Error in GetGeneratorStrings: " + str(e1))
 
+    # -------------PowerZone:GetAlarmRegisters-----------------------------------
+    # registers decoded with the alarms condition catalog
+    def GetAlarmRegisters(self):
+
+        return [
+            self.Reg.RA_STATUS_0[REGISTER],
+            self.Reg.RA_STATUS_1[REGISTER],
+            self.Reg.RA_STATUS_2[REGISTER],
+            self.Reg.RA_STATUS_3[REGISTER],
+            self.Reg.RA_STATUS_4[REGISTER],
+            self.Reg.RA_STATUS_5[REGISTER],
+            self.Reg.RA_STATUS_6[REGISTER],
+            self.Reg.RA_STATUS_7[REGISTER],
+            self.Reg.RA_STATUS_8[REGISTER],
+            self.Reg.RA_STATUS_9[REGISTER],
+        ]
+
+    # -------------PowerZone:GetAlwaysReadRegisters------------------------------
+    # status, alarm and utility voltage registers, read every poll cycle so
+    # alarms and outages are detected without delay
+    def GetAlwaysReadRegisters(self):
+
+        return self.GetAlarmRegisters() + [
+            self.Reg.ALARM_GLOBAL_FLAGS[REGISTER],
+            self.Reg.ENGINE_STATUS[REGISTER],
+            self.Reg.GENERATOR_STATUS[REGISTER],
+            self.Reg.KEY_SWITCH_STATE[REGISTER],
+            self.Reg.EXT_SW_GENERAL_STATUS[REGISTER],
+            self.Reg.EXT_SW_UTILITY_AVG_VOLTS[REGISTER],
+        ]
+
     # -------------PowerZone:MasterEmulation-------------------------------------
     def MasterEmulation(self):
 
@@ -977,15 +1010,20 @@ class PowerZone(GeneratorController):
                 self.IdentifyController()
                 if not self.ControllerDetected:
                     return
-            for RegisterList in self.Reg.GetRegList():
+            ReadPlan = self.GetReadPlan(
+                [
+                    (RegisterList[REGISTER], RegisterList[LENGTH])
+                    for RegisterList in self.Reg.GetRegList()
+                ],
+                AlwaysRead=self.GetAlwaysReadRegisters(),
+            )
+            for Blocks in self.GetReadBatches(ReadPlan):
                 try:
                     if self.IsStopping:
                         return
                     localTimeoutCount = self.ModBus.ComTimoutError
                     localSyncError = self.ModBus.ComSyncError
-                    self.ModBus.ProcessTransaction(
-                        RegisterList[REGISTER], RegisterList[LENGTH] / 2
-                    )
+                    self.ProcessReadBlocks(Blocks)
                     if (
                         localSyncError != self.ModBus.ComSyncError
                         or localTimeoutCount != self.ModBus.ComTimoutError
@@ -994,8 +1032,10 @@ class PowerZone(GeneratorController):
                 except Exception as e1:
                     self.LogErrorLine("Error in MasterEmulation: " + str(e1))
 
-            self.GetGeneratorStrings()
-            self.GetGeneratorFileData()
+            # file record reads wait behind commands and polling for the bus
+            with self.ModBus.BusPriority(self.ModBus.BUS_PRIORITY_LOG):
+                self.GetGeneratorStrings()
+                self.GetGeneratorFileData()
             self.CheckForAlarmEvent.set()
         except Exception as e1:
             self.LogErrorLine("Error in MasterEmulation: " + str(e1))
@@ -1008,19 +1048,24 @@ class PowerZone(GeneratorController):
 
         return LineState
 
+    # ------------ PowerZone:LoadConditionCatalogs -----------------------------
+    # indexes the alarm, input and output bit tables for the detected controller
+    def LoadConditionCatalogs(self):
+
+        self.ConditionCatalogs = {
+            "alarms": MyAlarmCatalog(table=self.IO.Alarms, log=self.log),
+            "inputs": MyAlarmCatalog(table=self.IO.Inputs, log=self.log),
+            "outputs": MyAlarmCatalog(table=self.IO.Outputs, log=self.log),
+        }
+
     # ------------ PowerZone:GetCondition ---------------------------------------
     def GetCondition(self, RegList=None, type=None):
 
         try:
             if type == None or RegList == None:
                 return []
-            if type.lower() == "alarms":
-                Lookup = self.IO.Alarms
-            elif type.lower() == "inputs":
-                Lookup = self.IO.Inputs
-            elif type.lower() == "outputs":
-                Lookup = self.IO.Outputs
-            else:
+            Lookup = self.ConditionCatalogs.get(type.lower(), None)
+            if Lookup == None:
                 self.LogError(
                     "Error in GetCondition: Invalid input for type: " + str(type)
                 )
@@ -1029,14 +1074,7 @@ class PowerZone(GeneratorController):
             StringList = []
             for Register in RegList:
                 Output = self.GetParameter(Register, ReturnInt=True)
-                Mask = 1
-                while Output:
-                    if Output & 0x01:
-                        Value = Lookup.get((Register, Mask), None)
-                        if not Value == None:
-                            StringList.append(Value)
-                    Mask <<= 1
-                    Output >>= 1
+                StringList.extend(Lookup.GetConditions(Register, Output))
 
             return StringList
         except Exception as e1:
@@ -1126,6 +1164,7 @@ class PowerZone(GeneratorController):
                 msgbody += "For additional information : " + self.UserURL + "\n"
             if not EngineState == self.LastEngineState:
                 self.LastEngineState = EngineState
+                self.NotifyChange()
                 msgsubject = "Generator Notice: " + self.SiteName
                 if not self.SystemInAlarm():
                     msgbody += "NOTE: This message is a notice that the state of the generator has changed. The system is not in alarm.\n"
@@ -1139,12 +1178,14 @@ class PowerZone(GeneratorController):
             # Check for Alarms
             if self.SystemInAlarm():
                 if not self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Active at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
                     self.MessagePipe.SendMessage(msgsubject, msgbody, msgtype="warn")
             else:
                 if self.CurrentAlarmState:
+                    self.NotifyChange()
                     msgsubject = "Generator Notice: ALARM Clear at " + self.SiteName
                     if not status_included:
                         msgbody += self.DisplayStatus()
@@ -1226,7 +1267,8 @@ class PowerZone(GeneratorController):
             if not IsFile and self.RegisterIsBaseRegister(
                 Register, Value, validate_length=True
             ):
-                self.Registers[Register] = Value
+                if self.Registers.Set(Register, Value) != Value:
+                    self.NotifyChange()
             elif not IsFile and self.RegisterIsStringRegister(Register):
                 # TODO validate register string length
                 self.Strings[Register] = Value
@@ -1251,6 +1293,20 @@ class PowerZone(GeneratorController):
             self.LogErrorLine("Error in UpdateRegisterList: " + str(e1))
             return False
 
+    # ---------------------PowerZone::GetAlarmState------------------------------
+    # return a description of the current alarm, "" if none
+    def GetAlarmState(self):
+
+        try:
+            if not self.SystemInAlarm():
+                return ""
+            return ", ".join(
+                self.GetCondition(RegList=self.GetAlarmRegisters(), type="alarms")
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in GetAlarmState: " + str(e1))
+            return ""
+
     # ---------------------PowerZone::SystemInAlarm------------------------------
     # return True if generator is in alarm, else False
     def SystemInAlarm(self):
@@ -2210,20 +2266,10 @@ class PowerZone(GeneratorController):
                 }
             )
 
-            OutputList = [
-                self.Reg.RA_STATUS_0[REGISTER],
-                self.Reg.RA_STATUS_1[REGISTER],
-                self.Reg.RA_STATUS_2[REGISTER],
-                self.Reg.RA_STATUS_3[REGISTER],
-                self.Reg.RA_STATUS_4[REGISTER],
-                self.Reg.RA_STATUS_5[REGISTER],
-                self.Reg.RA_STATUS_6[REGISTER],
-                self.Reg.RA_STATUS_7[REGISTER],
-                self.Reg.RA_STATUS_8[REGISTER],
-                self.Reg.RA_STATUS_9[REGISTER],
-            ]
             if self.SystemInAlarm():
-                AlarmList = self.GetCondition(RegList=OutputList, type="alarms")
+                AlarmList = self.GetCondition(
+                    RegList=self.GetAlarmRegisters(), type="alarms"
+                )
                 if len(AlarmList):
                     Alarms.append({"Alarm List": AlarmList})
 
@@ -2795,12 +2841,13 @@ class PowerZone(GeneratorController):
 
             RegList = []
 
-            Regs["Num Regs"] = "%d" % len(self.Registers)
+            # a consistent copy, the registers may change while iterating
+            Sequence, RegisterValues = self.Registers.Snapshot()
+            Regs["Num Regs"] = "%d" % len(RegisterValues)
 
             Regs["Base Registers"] = RegList
             # display all the registers
-            temp_regsiters = self.Registers
-            for Register, Value in temp_regsiters.items():
+            for Register, Value in RegisterValues.items():
                 RegList.append({Register: Value})
 
             if AllRegs:
@@ -3176,11 +3223,6 @@ class PowerZone(GeneratorController):
             self.LogErrorLine("Error in CheckExternalCTData: " + str(e1))
             return DefaultReturn
 
-    # ----------  PowerZone:GetCommStatus  --------------------------------------
-    # return Dict with communication stats
-    def GetCommStatus(self):
-        return self.ModBus.GetCommStats()
-
     # ------------ PowerZone:GetBaseStatus --------------------------------------
     # return one of the following: "ALARM", "SERVICEDUE", "EXERCISING", "RUNNING",
     # "RUNNING-MANUAL", "OFF", "MANUAL", "READY"
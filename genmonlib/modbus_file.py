@@ -17,7 +17,6 @@ import collections
 import datetime
 import json
 import os
-import threading
 import time
 
 from genmonlib.modbusbase import ModbusBase
@@ -70,9 +69,8 @@ class ModbusFile(ModbusBase):
 
         if not os.path.isfile(self.InputFile):
             self.LogError("Error: File not present: " + self.InputFile)
-        self.CommAccessLock = (
-            threading.RLock()
-        )  # lock to synchronize access to the serial port comms
+        # lock to synchronize access to the serial port comms
+        self.CommAccessLock = self.CreateCommAccessLock()
         self.UpdateRegisterList = updatecallback
 
         if not self.ReadInputFile(self.InputFile):
@@ -15,9 +15,9 @@ from __future__ import (  # For python 3.x compatibility with print function
 
 import datetime
 import os
-import threading
 
 from genmonlib.mylog import SetupLogger
+from genmonlib.myprioritylock import MyPriorityLock
 from genmonlib.mysupport import MySupport
 from genmonlib.program_defaults import ProgramDefaults
 
@@ -110,6 +110,13 @@ class ModbusBase(MySupport):
     MBUS_EXCEP_GATEWAY = 0x10  # Gateway Path Unavailable
     MBUS_EXCEP_GATEWAY_TG = 0x11  # Gateway Target Device Failed to Respond
 
+    # Bus priorities, lower value is served first when waiting for CommAccessLock
+    BUS_PRIORITY_CONTROL = 0  # writes and remote commands
+    BUS_PRIORITY_ALARM = 1  # reads needed to detect alarms
+    BUS_PRIORITY_POLL = 2  # routine register polling
+    BUS_PRIORITY_LOG = 3  # log and file record reads
+    BUS_PRIORITY_NAMES = ["Control", "Alarm", "Poll", "Log"]
+
     # -------------------------__init__------------------------------------------
     def __init__(
         self,
@@ -131,6 +138,7 @@ class ModbusBase(MySupport):
         self.UpdateRegisterList = updatecallback
         self.RxPacketCount = 0
         self.TxPacketCount = 0
+        self.WriteTransactionCount = 0  # number of register or file writes
         self.ComTimoutError = 0
         self.TotalElapsedPacketeTime = 0
         self.ModbusException = 0
@@ -157,6 +165,9 @@ class ModbusBase(MySupport):
         )
         self.debug = False
         self.UseModbusFunction4 = use_fc4
+        self.SupportsBlockRead = False  # True if multi-register reads are supported
+        self.PipelineDepth = 1  # max outstanding requests (Modbus TCP only)
+        self.CaptureFileName = None  # record raw bus traffic to this file
 
         if self.config != None:
             self.debug = self.config.ReadValue("debug", return_type=bool, default=False)
@@ -175,6 +186,12 @@ class ModbusBase(MySupport):
             self.UseModbusFunction4 = self.config.ReadValue(
                 "use_modbus_fc4", return_type=bool, default=False
             )
+            self.PipelineDepth = self.config.ReadValue(
+                "modbus_tcp_pipeline_depth", return_type=int, default=1
+            )
+            self.CaptureFileName = self.config.ReadValue(
+                "bus_capture_file", default=None
+            )
             parity = self.config.ReadValue("serial_parity", default="None")
             if parity.lower() == "none":
                 self.Parity = None
@@ -205,9 +222,8 @@ class ModbusBase(MySupport):
         else:
             self.loglocation = default = "./"
 
-        self.CommAccessLock = (
-            threading.RLock()
-        )  # lock to synchronize access to the serial port comms
+        # lock to synchronize access to the serial port comms
+        self.CommAccessLock = self.CreateCommAccessLock()
         self.ModbusStartTime = datetime.datetime.now()  # used for com metrics
 
         # log errors in this module to a file
@@ -221,6 +237,45 @@ class ModbusBase(MySupport):
             self.MBUS_CMD_READ_REGS = self.MBUS_CMD_READ_INPUT_REGS
             self.LogError("Using Modbus function 4 instead of 3")
 
+    # -------------ModbusBase::CreateCommAccessLock------------------------------
+    def CreateCommAccessLock(self):
+        # waiters that are passed over too often are promoted, but never ahead
+        # of commands
+        return MyPriorityLock(
+            default_priority=self.BUS_PRIORITY_POLL,
+            num_priorities=len(self.BUS_PRIORITY_NAMES),
+            max_bypass=8,
+            aging_floor=self.BUS_PRIORITY_ALARM,
+        )
+
+    # -------------ModbusBase::BusPriority---------------------------------------
+    # use in a with statement, transactions from this thread inside the with
+    # statement wait for the bus at the given priority
+    def BusPriority(self, priority):
+        return self.CommAccessLock.Scope(priority)
+
+    # -------------ModbusBase::GetBusWaitStats-----------------------------------
+    # returns a list of dicts with the time each priority waited for the bus
+    def GetBusWaitStats(self):
+
+        BusStats = []
+        try:
+            for Name, Stats in zip(
+                self.BUS_PRIORITY_NAMES, self.CommAccessLock.GetWaitStats()
+            ):
+                Count, Average, Max = Stats
+                if not Count:
+                    continue
+                BusStats.append(
+                    {
+                        "Bus Wait (%s)" % Name: "Avg: %.1f ms, Max: %.1f ms, Count: %d"
+                        % (Average, Max, Count)
+                    }
+                )
+        except Exception as e1:
+            self.LogErrorLine("Error in GetBusWaitStats: " + str(e1))
+        return BusStats
+
     # -------------ModbusBase::ProcessWriteTransaction---------------------------
     def ProcessWriteTransaction(self, Register, Length, Data):
         return
@@ -231,6 +286,27 @@ class ModbusBase(MySupport):
     ):
         return
 
+    # -------------ModbusBase::ProcessTransactions-------------------------------
+    # RequestList is a list of (Register, Length, skipupdate) tuples. Returns a
+    # list with a (value read ("" on error), exception) tuple for each request,
+    # exception is True if the controller returned a modbus exception for it
+    def ProcessTransactions(self, RequestList):
+
+        ReturnList = []
+        for Register, Length, skipupdate in RequestList:
+            if self.IsStopping:
+                break
+            ExceptionCount = self.ModbusException
+            Value = self.ProcessTransaction(Register, Length, skipupdate=skipupdate)
+            ReturnList.append((Value, self.ModbusException != ExceptionCount))
+        ReturnList.extend([("", False)] * (len(RequestList) - len(ReturnList)))
+        return ReturnList
+
+    # -------------ModbusBase::GetPipelineDepth---------------------------------
+    # number of read requests ProcessTransactions will keep outstanding
+    def GetPipelineDepth(self):
+        return 1
+
     # -------------ModbusProtocol::ProcessFileReadTransaction--------------------
     def ProcessFileReadTransaction(
         self, Register, Length, skipupdate=False, file_num=1, ReturnString=False
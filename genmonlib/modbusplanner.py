@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: modbusplanner.py
+# PURPOSE: merge register reads into multi-register modbus transactions
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+from __future__ import (  # For python 3.x compatibility with print function
+    print_function,
+)
+
+import threading
+
+from genmonlib.mysupport import MySupport
+
+
+# ------------ ModbusReadPlanner class ------------------------------------------
+class ModbusReadPlanner(MySupport):
+    # A plan is a list of blocks. Each block is a tuple of:
+    #   (start register (hex string), length in words, members)
+    # members is a list of tuples (register (hex string), offset in words, length in words)
+    # A block with one member is read with a normal single register transaction.
+    #
+    # If adaptive polling is enabled the planner tracks how often each register
+    # changes and GetCyclePlan only returns the blocks that are due this cycle.
+    # Registers that change often are read every cycle, registers that rarely
+    # change are read every POLL_INTERVALS[-1] cycles.
+
+    MAX_READ_WORDS = 125  # modbus limit for function code 3 and 4
+
+    # adaptive polling
+    POLL_INTERVALS = [1, 4, 16]  # cycles between reads for each rate tier
+    POLL_THRESHOLDS = [0.05, 0.005]  # minimum change rate for tier 0 and 1
+    POLL_MIN_SAMPLES = 10  # reads before a register can leave tier 0
+    POLL_RATE_WEIGHT = 0.1  # weight of newest sample in the change rate
+
+    # ------------ ModbusReadPlanner::__init__-----------------------------------
+    def __init__(
+        self,
+        modbus,
+        updatecallback,
+        log=None,
+        enabled=False,
+        maxspan=16,
+        maxgap=0,
+        nomerge=None,
+        adaptive=False,
+        updatelock=None,
+    ):
+        super(ModbusReadPlanner, self).__init__()
+        self.ModBus = modbus
+        self.UpdateRegisterList = updatecallback
+        # held while the registers in a block are updated, so readers do not
+        # see a partly updated block
+        self.UpdateLock = updatelock if updatelock != None else threading.RLock()
+        self.log = log
+        self.debug = getattr(self.ModBus, "debug", False)
+        self.Enabled = enabled
+        self.MaxSpan = max(1, min(maxspan, self.MAX_READ_WORDS))  # words
+        self.MaxGap = max(0, maxgap)  # words
+        # registers that are always read by themselves
+        self.NoMerge = set()
+        if nomerge != None:
+            self.NoMerge.update(int(Register, 16) for Register in nomerge)
+        self.PlanCache = {}
+        self.PlanLock = threading.RLock()
+
+        self.Adaptive = adaptive
+        self.Cycle = 0
+        self.FullRefresh = True
+        self.LastWriteCount = 0
+        # register (int) : [last value, change rate, number of samples]
+        self.RegisterStats = {}
+        # registers that are always read every cycle
+        self.AlwaysRead = set()
+
+        if not getattr(self.ModBus, "SupportsBlockRead", False):
+            self.Enabled = False
+
+    # ------------ ModbusReadPlanner::AddNoMerge---------------------------------
+    def AddNoMerge(self, RegisterList):
+        with self.PlanLock:
+            for Register in RegisterList:
+                self.NoMerge.add(int(Register, 16))
+            self.PlanCache = {}
+
+    # ------------ ModbusReadPlanner::AddAlwaysRead------------------------------
+    def AddAlwaysRead(self, RegisterList):
+        with self.PlanLock:
+            for Register in RegisterList:
+                self.AlwaysRead.add(int(Register, 16))
+
+    # ------------ ModbusReadPlanner::RequestFullRefresh-------------------------
+    # the next call to GetCyclePlan will return every block
+    def RequestFullRefresh(self):
+        self.FullRefresh = True
+
+    # ------------ ModbusReadPlanner::GetCyclePlan-------------------------------
+    # returns the blocks that should be read this poll cycle
+    def GetCyclePlan(self, RegisterList):
+
+        Plan = self.GetPlan(RegisterList)
+        if not self.Adaptive:
+            return Plan
+        try:
+            with self.PlanLock:
+                self.Cycle += 1
+                # any write to the controller may change any register
+                WriteCount = getattr(self.ModBus, "WriteTransactionCount", 0)
+                if WriteCount != self.LastWriteCount:
+                    self.LastWriteCount = WriteCount
+                    self.FullRefresh = True
+                if self.FullRefresh:
+                    self.FullRefresh = False
+                    return Plan
+                return [Block for Block in Plan if self.BlockIsDue(Block)]
+        except Exception as e1:
+            self.LogErrorLine("Error in GetCyclePlan: " + str(e1))
+            return Plan
+
+    # ------------ ModbusReadPlanner::BlockIsDue---------------------------------
+    def BlockIsDue(self, Block):
+
+        Register, Length, Members = Block
+        Interval = min(self.GetPollInterval(Member[0]) for Member in Members)
+        # offset by register so registers in the same tier are spread over cycles
+        return (self.Cycle + int(Register, 16)) % Interval == 0
+
+    # ------------ ModbusReadPlanner::GetPollInterval----------------------------
+    def GetPollInterval(self, Register):
+
+        RegInt = int(Register, 16)
+        if RegInt in self.AlwaysRead:
+            return self.POLL_INTERVALS[0]
+        Stats = self.RegisterStats.get(RegInt, None)
+        if Stats == None or Stats[2] < self.POLL_MIN_SAMPLES:
+            return self.POLL_INTERVALS[0]
+        for Tier, Threshold in enumerate(self.POLL_THRESHOLDS):
+            if Stats[1] >= Threshold:
+                return self.POLL_INTERVALS[Tier]
+        return self.POLL_INTERVALS[-1]
+
+    # ------------ ModbusReadPlanner::RecordValue--------------------------------
+    # update the change statistics for a register
+    def RecordValue(self, Register, Value):
+
+        if not self.Adaptive or not len(Value):
+            return
+        RegInt = int(Register, 16)
+        Stats = self.RegisterStats.get(RegInt, None)
+        if Stats == None:
+            self.RegisterStats[RegInt] = [Value, 0.0, 1]
+            return
+        Changed = 1.0 if Stats[0] != Value else 0.0
+        Stats[0] = Value
+        Stats[1] += self.POLL_RATE_WEIGHT * (Changed - Stats[1])
+        Stats[2] += 1
+
+    # ------------ ModbusReadPlanner::GetPollStats-------------------------------
+    # returns the number of registers in each poll rate tier
+    def GetPollStats(self):
+
+        Tiers = [0] * len(self.POLL_INTERVALS)
+        for RegInt in list(self.RegisterStats.keys()):
+            Interval = self.GetPollInterval("%04x" % RegInt)
+            Tiers[self.POLL_INTERVALS.index(Interval)] += 1
+        return Tiers
+
+    # ------------ ModbusReadPlanner::GetPlan------------------------------------
+    # RegisterList is a list of (register (hex string), length in bytes) pairs
+    def GetPlan(self, RegisterList):
+
+        try:
+            Key = tuple((Register, int(Length)) for Register, Length in RegisterList)
+            with self.PlanLock:
+                Plan = self.PlanCache.get(Key, None)
+                if Plan == None:
+                    Plan = self.CreatePlan(Key)
+                    self.PlanCache[Key] = Plan
+                return Plan
+        except Exception as e1:
+            self.LogErrorLine("Error in GetPlan: " + str(e1))
+            return []
+
+    # ------------ ModbusReadPlanner::CreatePlan---------------------------------
+    def CreatePlan(self, RegisterList):
+
+        if not self.Enabled:
+            # one transaction per register in the order given, as before
+            # block reads were supported
+            Plan = []
+            for Register, Length in RegisterList:
+                RegInt = int(Register, 16)
+                Words = max(1, int(Length / 2))
+                Plan.append(
+                    self.MakeBlock(RegInt, RegInt + Words, [(RegInt, Register, Words)])
+                )
+            return Plan
+
+        Entries = {}
+        for Register, Length in RegisterList:
+            RegInt = int(Register, 16)
+            Words = max(1, int(Length / 2))
+            if RegInt in Entries and Entries[RegInt][1] >= Words:
+                continue
+            Entries[RegInt] = (Register, Words)
+
+        Plan = []
+        Start = End = None
+        Members = []
+        for RegInt in sorted(Entries.keys()):
+            Register, Words = Entries[RegInt]
+            NoMerge = RegInt in self.NoMerge
+            if (
+                len(Members)
+                and not NoMerge
+                and not Members[-1][0] in self.NoMerge
+                and RegInt - End <= self.MaxGap
+                and max(End, RegInt + Words) - Start <= self.MaxSpan
+            ):
+                Members.append((RegInt, Register, Words))
+                End = max(End, RegInt + Words)
+                continue
+            if len(Members):
+                Plan.append(self.MakeBlock(Start, End, Members))
+            Start = RegInt
+            End = RegInt + Words
+            Members = [(RegInt, Register, Words)]
+        if len(Members):
+            Plan.append(self.MakeBlock(Start, End, Members))
+
+        self.LogDebug(
+            "Read plan: %d registers in %d transactions" % (len(Entries), len(Plan))
+        )
+        return Plan
+
+    # ------------ ModbusReadPlanner::MakeBlock----------------------------------
+    def MakeBlock(self, Start, End, Members):
+        return (
+            "%04x" % Start,
+            End - Start,
+            [(Register, RegInt - Start, Words) for RegInt, Register, Words in Members],
+        )
+
+    # ------------ ModbusReadPlanner::ProcessBlock-------------------------------
+    def ProcessBlock(self, Block):
+        return self.ProcessBlocks([Block])[0]
+
+    # ------------ ModbusReadPlanner::ProcessBlocks------------------------------
+    # read a list of blocks, the transactions are pipelined if the modbus
+    # connection supports it. Returns a list of the values read for each block
+    def ProcessBlocks(self, Blocks):
+
+        try:
+            Requests = []
+            for Register, Length, Members in Blocks:
+                if len(Members) == 1:
+                    MemberRegister, Offset, Words = Members[0]
+                    Requests.append((MemberRegister, Words, False))
+                else:
+                    # skipupdate=True, the value is split up below
+                    Requests.append((Register, Length, True))
+
+            Values = self.ModBus.ProcessTransactions(Requests)
+            return [
+                self.ProcessBlockValue(Block, Value, Rejected)
+                for Block, (Value, Rejected) in zip(Blocks, Values)
+            ]
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessBlocks: " + str(e1))
+            return [""] * len(Blocks)
+
+    # ------------ ModbusReadPlanner::ProcessBlockValue--------------------------
+    # Rejected is True if the controller returned a modbus exception to the
+    # request for this block
+    def ProcessBlockValue(self, Block, Value, Rejected):
+
+        try:
+            Register, Length, Members = Block
+            if len(Members) == 1:
+                self.RecordValue(Members[0][0], Value)
+                return Value
+
+            if len(Value) != Length * 4:
+                if Rejected:
+                    # controller rejected the range, do not merge these registers again
+                    self.LogError(
+                        "Block read rejected at %s (%d words), reading registers individually"
+                        % (Register, Length)
+                    )
+                    self.AddNoMerge([Member[0] for Member in Members])
+                    for MemberRegister, Offset, Words in Members:
+                        self.RecordValue(
+                            MemberRegister,
+                            self.ModBus.ProcessTransaction(MemberRegister, Words),
+                        )
+                return ""
+
+            with self.UpdateLock:
+                for MemberRegister, Offset, Words in Members:
+                    MemberValue = Value[Offset * 4 : (Offset + Words) * 4]
+                    if not self.UpdateRegisterList(MemberRegister, MemberValue):
+                        self.ModBus.ComSyncError += 1
+                    self.RecordValue(MemberRegister, MemberValue)
+            return Value
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessBlockValue: " + str(e1))
+            return ""
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: modbusreplay.py
+# PURPOSE: replay a bus capture through the modbus packet decoder
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+from __future__ import (  # For python 3.x compatibility with print function
+    print_function,
+)
+
+import collections
+import time
+
+from genmonlib.mybuscapture import CAPTURE_TX, MonotonicTime, MyBusCaptureReader
+from genmonlib.mymodbus import ModbusProtocol
+from genmonlib.myrxbuffer import MyRxBuffer
+
+
+# ------------ ReplayDevice class -----------------------------------------------
+class ReplayDevice(object):
+    # stands in for SerialDevice / SerialTCPDevice, received data is added to
+    # the buffer by ModbusReplay instead of a read thread
+    def __init__(self):
+        self.DeviceName = "replay"
+        self.BaudRate = 0
+        self.Buffer = MyRxBuffer()
+        self.DiscardedBytes = 0
+        self.Restarts = 0
+        self.Threads = {}
+
+    # ---------- ReplayDevice::DiscardByte--------------------------------------
+    def DiscardByte(self):
+        discard = self.Buffer.PopByte()
+        if discard != None:
+            self.DiscardedBytes += 1
+        return discard
+
+    # ---------- ReplayDevice::Write--------------------------------------------
+    def Write(self, data):
+        return len(data)
+
+    # ---------- ReplayDevice::Flush--------------------------------------------
+    def Flush(self):
+        self.Buffer.Clear()
+
+    # ---------- ReplayDevice::Close--------------------------------------------
+    def Close(self):
+        pass
+
+    # ---------- ReplayDevice::ResetSerialStats---------------------------------
+    def ResetSerialStats(self):
+        pass
+
+    # ---------- ReplayDevice::GetRxBufferAsString------------------------------
+    def GetRxBufferAsString(self):
+        return self.Buffer.GetString()
+
+
+# ------------ ModbusReplay class -----------------------------------------------
+class ModbusReplay(ModbusProtocol):
+    # Feeds the frames in a capture file recorded by MyBusCapture through
+    # GetPacketFromSlave and UpdateRegistersFromPacket. speed is a multiple of
+    # the recorded rate, 1.0 replays at wire speed and 0 as fast as possible.
+    # Requests are taken from the capture rather than generated, so responses
+    # are matched to the request that was actually sent. The capture does not
+    # record how a read was used, so every register read is passed to
+    # updatecallback as a hex value (block reads are passed as one value for
+    # the starting register).
+    def __init__(self, updatecallback, capturefile, address=0x9D, speed=0.0):
+
+        self.Reader = MyBusCaptureReader(capturefile)
+        self.Speed = speed
+        self.ReplayPacketCount = 0
+        self.ReplayTime = 0.0
+        super(ModbusReplay, self).__init__(
+            updatecallback,
+            address=address,
+            modbustcp=self.Reader.ModbusTCP,
+        )
+
+    # ---------- ModbusReplay::CreateSlave-------------------------------------
+    def CreateSlave(self, name, OnePointFiveStopBits=None, host=None, port=None):
+        return ReplayDevice()
+
+    # ---------- ModbusReplay::Replay------------------------------------------
+    # returns the time in seconds spent in the replay
+    def Replay(self):
+
+        # transaction ID (0 for RTU) : master packet
+        Outstanding = collections.OrderedDict()
+        if self.ModbusTCP:
+            # any outstanding transaction ID is accepted, same as pipelining
+            self.InFlightTransactionIDs = Outstanding
+        StartTime = MonotonicTime()
+        try:
+            for TimeStamp, Direction, Data in self.Reader:
+                if self.IsStopping:
+                    break
+                if self.Speed > 0:
+                    Delay = (TimeStamp / self.Speed) - (MonotonicTime() - StartTime)
+                    if Delay > 0:
+                        time.sleep(Delay)
+
+                if Direction == CAPTURE_TX:
+                    MasterPacket = list(bytearray(Data))
+                    self.TxPacketCount += 1
+                    if self.ModbusTCP:
+                        ID = (MasterPacket[0] << 8) | MasterPacket[1]
+                    else:
+                        ID = 0
+                        if len(Outstanding):
+                            # the previous request was not answered
+                            self.ComTimoutError += 1
+                            Outstanding.clear()
+                    if not len(Outstanding) and len(self.Slave.Buffer):
+                        self.UnexpectedData += 1
+                        self.Flush()
+                    Outstanding[ID] = MasterPacket
+                else:
+                    self.Slave.Buffer.Append(bytearray(Data))
+                    self.ProcessReplayData(Outstanding)
+        except Exception as e1:
+            self.LogErrorLine("Error in Replay: " + str(e1))
+        finally:
+            self.InFlightTransactionIDs = None
+        self.ReplayTime = MonotonicTime() - StartTime
+        return self.ReplayTime
+
+    # ---------- ModbusReplay::ProcessReplayData-------------------------------
+    def ProcessReplayData(self, Outstanding):
+
+        while len(self.Slave.Buffer):
+            Pending = len(self.Slave.Buffer)
+            RetVal, SlavePacket = self.GetPacketFromSlave()
+            if not len(SlavePacket):
+                if RetVal == False:
+                    # errors are logged and counted in GetPacketFromSlave
+                    Outstanding.clear()
+                    return
+                if len(self.Slave.Buffer) < Pending:
+                    # a response was dropped, check for another one
+                    continue
+                # more data is needed
+                return
+
+            if self.ModbusTCP:
+                MasterPacket = Outstanding.pop(self.RxTransactionID, None)
+            elif len(Outstanding):
+                MasterPacket = Outstanding.popitem(last=False)[1]
+            else:
+                MasterPacket = None
+            if MasterPacket == None:
+                self.UnexpectedData += 1
+                continue
+            if RetVal == False:
+                # modbus exception or CRC error
+                continue
+            Value = self.UpdateRegistersFromPacket(MasterPacket, SlavePacket)
+            if Value == "Error":
+                self.LogHexList(MasterPacket, prefix="Master")
+                self.LogHexList(SlavePacket, prefix="Slave")
+                self.ComValidationError += 1
+                continue
+            self.ReplayPacketCount += 1
+
+    # ---------- ModbusReplay::GetReplayStats----------------------------------
+    def GetReplayStats(self):
+
+        ReplayStats = []
+        ReplayStats.append({"Decoded Responses": self.ReplayPacketCount})
+        ReplayStats.append({"Replay Time": "%.4f sec" % self.ReplayTime})
+        if self.ReplayTime:
+            ReplayStats.append(
+                {
+                    "Responses Per Second": "%.2f"
+                    % (self.ReplayPacketCount / self.ReplayTime)
+                }
+            )
+        ReplayStats.extend(self.GetCommStats())
+        return ReplayStats
+
+    # ---------- ModbusReplay::Close-------------------------------------------
+    def Close(self):
+        super(ModbusReplay, self).Close()
+        self.Reader.Close()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myalarmcatalog.py
+# PURPOSE: in memory lookup for alarm codes and alarm / condition bit tables
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import os
+import threading
+import time
+
+from genmonlib.mysupport import MySupport
+
+
+# ------------ MyAlarmCatalog class ---------------------------------------------
+class MyAlarmCatalog(MySupport):
+    # Alarm descriptions indexed for lookup. The catalog is loaded from either
+    # an alarm file (data/ALARMS.txt format, keyed by the integer alarm code)
+    # or from a table dict of (register, mask) : name as used by the H-Panel
+    # and PowerZone controllers.
+    #
+    # An alarm file is read once and read again if the file modification time
+    # changes. The file is checked at most once every checkinterval seconds.
+
+    # ---------- MyAlarmCatalog::__init__---------------------------------------
+    def __init__(self, filename=None, table=None, log=None, checkinterval=10):
+        super(MyAlarmCatalog, self).__init__()
+        self.log = log
+        self.FileName = filename
+        self.CheckInterval = checkinterval
+        self.Lock = threading.RLock()
+        # key : (code (string), type, name, condition, additional info), file only
+        self.Entries = {}
+        # key : name
+        self.Names = {}
+        # register : list of (mask, name) sorted by mask, table only
+        self.Registers = {}
+        self.FileMTime = None
+        self.LastCheck = 0
+
+        if self.FileName != None:
+            self.LoadFile()
+        elif table != None:
+            self.LoadTable(table)
+
+    # ---------- MyAlarmCatalog::LoadFile---------------------------------------
+    # Format: items are delimited by !, each line must have 5 items
+    # AlarmCode! Type (ALARM, WARNING)! AlarmName! Condition! Additional Info
+    def LoadFile(self):
+
+        try:
+            with self.Lock:
+                MTime = os.path.getmtime(self.FileName)
+                Entries = {}
+                with open(self.FileName, "r") as AlarmFile:
+                    for line in AlarmFile:
+                        line = line.strip()
+                        if not len(line):
+                            continue
+                        if line[0] == "#":  # comment?
+                            continue
+                        Items = line.split("!")
+                        if len(Items) != 5:
+                            continue
+                        try:
+                            Code = int(Items[0])
+                        except ValueError:
+                            continue
+                        # the first entry for a code is used
+                        if Code not in Entries:
+                            Entries[Code] = tuple(Items)
+                self.Entries = Entries
+                self.Names = dict((Code, Items[2]) for Code, Items in Entries.items())
+                self.FileMTime = MTime
+                self.LastCheck = time.time()
+                return True
+        except Exception as e1:
+            self.LogErrorLine("Error in MyAlarmCatalog:LoadFile: " + str(e1))
+            return False
+
+    # ---------- MyAlarmCatalog::LoadTable--------------------------------------
+    def LoadTable(self, Table):
+
+        with self.Lock:
+            Registers = {}
+            for (Register, Mask), Name in Table.items():
+                # each entry describes a single bit
+                if Mask <= 0 or Mask & (Mask - 1):
+                    continue
+                Registers.setdefault(Register, []).append((Mask, Name))
+            for MaskList in Registers.values():
+                MaskList.sort(key=lambda Item: Item[0])
+            self.Names = dict(Table)
+            self.Registers = Registers
+
+    # ---------- MyAlarmCatalog::CheckForChange---------------------------------
+    def CheckForChange(self):
+
+        if self.FileName == None:
+            return
+        Now = time.time()
+        if Now - self.LastCheck < self.CheckInterval:
+            return
+        self.LastCheck = Now
+        try:
+            if os.path.getmtime(self.FileName) != self.FileMTime:
+                self.LoadFile()
+        except Exception as e1:
+            self.LogErrorLine("Error in MyAlarmCatalog:CheckForChange: " + str(e1))
+
+    # ---------- MyAlarmCatalog::Get--------------------------------------------
+    # returns the alarm file entry for Key (code, type, name, condition, info)
+    def Get(self, Key, default=None):
+
+        self.CheckForChange()
+        return self.Entries.get(Key, default)
+
+    # ---------- MyAlarmCatalog::GetName----------------------------------------
+    def GetName(self, Key, default=None):
+
+        self.CheckForChange()
+        return self.Names.get(Key, default)
+
+    # ---------- MyAlarmCatalog::GetConditions----------------------------------
+    # returns a list of names for the bits set in Value for Register
+    def GetConditions(self, Register, Value):
+
+        self.CheckForChange()
+        if not Value:
+            return []
+        return [Name for Mask, Name in self.Registers.get(Register, []) if Value & Mask]
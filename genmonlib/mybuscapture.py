@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mybuscapture.py
+# PURPOSE: record raw modbus bus traffic to a binary capture file and read it
+#          back
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import mmap
+import struct
+import threading
+import time
+
+# capture file layout (all values little endian)
+#   header:  magic (4 bytes) "GMBC", version (uint8), flags (uint8),
+#            reserved (uint16), capture start time (double, seconds since epoch)
+#   records: time since capture start (uint64, microseconds, monotonic clock),
+#            direction (uint8), data length (uint16), data
+CAPTURE_MAGIC = b"GMBC"
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = struct.Struct("<4sBBHd")
+CAPTURE_RECORD = struct.Struct("<QBH")
+
+CAPTURE_FLAG_MODBUS_TCP = 0x01
+
+CAPTURE_TX = 0  # master to slave
+CAPTURE_RX = 1  # slave to master
+
+# python 2 does not have a monotonic clock
+MonotonicTime = getattr(time, "monotonic", time.time)
+
+
+# ------------ MyBusCapture class -----------------------------------------------
+class MyBusCapture(object):
+    # Records each chunk of data written to or read from the bus. Receive data
+    # is recorded in the chunks returned by the device, so a replay exercises
+    # the packet framing the same way the live data did. Recording stops when
+    # the file reaches maxsize bytes.
+
+    # ---------- MyBusCapture::__init__-----------------------------------------
+    def __init__(self, filename, modbustcp=False, maxsize=64 * 1024 * 1024, log=None):
+        self.FileName = filename
+        self.MaxSize = maxsize
+        self.log = log
+        self.Lock = threading.Lock()
+        self.Size = 0
+        self.Records = 0
+        self.Full = False
+        self.File = open(filename, "wb")
+        self.StartTime = MonotonicTime()
+        Flags = CAPTURE_FLAG_MODBUS_TCP if modbustcp else 0
+        self.Write(
+            CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, Flags, 0, time.time())
+        )
+
+    # ---------- MyBusCapture::Write--------------------------------------------
+    def Write(self, data):
+        self.File.write(data)
+        self.Size += len(data)
+
+    # ---------- MyBusCapture::Record-------------------------------------------
+    # direction is CAPTURE_TX or CAPTURE_RX, data is bytes or a bytearray
+    def Record(self, direction, data):
+
+        if not data:
+            return
+        TimeStamp = int((MonotonicTime() - self.StartTime) * 1000000)
+        with self.Lock:
+            if self.File == None or self.Full:
+                return
+            if self.Size + CAPTURE_RECORD.size + len(data) > self.MaxSize:
+                self.Full = True
+                self.File.flush()
+                if self.log != None:
+                    self.log.error(
+                        "Bus capture file full, recording stopped: " + self.FileName
+                    )
+                return
+            # records are limited to 64k, longer chunks are split
+            for Start in range(0, len(data), 0xFFFF):
+                Chunk = bytes(data[Start : Start + 0xFFFF])
+                self.Write(CAPTURE_RECORD.pack(TimeStamp, direction, len(Chunk)))
+                self.Write(Chunk)
+                self.Records += 1
+
+    # ---------- MyBusCapture::Close--------------------------------------------
+    def Close(self):
+        with self.Lock:
+            if self.File != None:
+                self.File.close()
+                self.File = None
+
+
+# ------------ MyBusCaptureReader class -----------------------------------------
+class MyBusCaptureReader(object):
+    # Memory maps a capture file. Iterating returns tuples of
+    # (time since capture start (seconds), direction, data) where data is a
+    # read only view into the file.
+
+    # ---------- MyBusCaptureReader::__init__-----------------------------------
+    def __init__(self, filename):
+        self.FileName = filename
+        self.File = open(filename, "rb")
+        try:
+            self.Map = mmap.mmap(self.File.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.File.close()
+            raise
+        if len(self.Map) < CAPTURE_HEADER.size:
+            self.Close()
+            raise ValueError("Invalid bus capture file: " + filename)
+        Magic, Version, Flags, Reserved, StartTime = CAPTURE_HEADER.unpack_from(
+            self.Map, 0
+        )
+        if Magic != CAPTURE_MAGIC or Version != CAPTURE_VERSION:
+            self.Close()
+            raise ValueError("Invalid bus capture file: " + filename)
+        self.ModbusTCP = bool(Flags & CAPTURE_FLAG_MODBUS_TCP)
+        self.StartTime = StartTime  # seconds since epoch
+
+    # ---------- MyBusCaptureReader::__iter__-----------------------------------
+    def __iter__(self):
+
+        View = memoryview(self.Map)
+        Offset = CAPTURE_HEADER.size
+        End = len(self.Map)
+        while Offset + CAPTURE_RECORD.size <= End:
+            TimeStamp, Direction, Length = CAPTURE_RECORD.unpack_from(self.Map, Offset)
+            Offset += CAPTURE_RECORD.size
+            if Offset + Length > End:
+                # truncated record, the capture was not closed
+                break
+            yield TimeStamp / 1000000.0, Direction, View[Offset : Offset + Length]
+            Offset += Length
+
+    # ---------- MyBusCaptureReader::Close--------------------------------------
+    def Close(self):
+        try:
+            self.Map.close()
+        except Exception:
+            pass
+        self.File.close()
@@ -7,7 +7,10 @@
 #    DATE: 5-Apr-2017
 # MODIFICATIONS:
 # -------------------------------------------------------------------------------
+import collections
+import json
 import os
+import select
 import socket
 import sys
 import threading
@@ -15,6 +18,15 @@ import time
 
 from genmonlib.mycommon import MyCommon
 from genmonlib.mylog import SetupLogger
+from genmonlib.mysocketprotocol import (
+    PROTOCOL_COMMAND,
+    PROTOCOL_FRAMED,
+    PROTOCOL_TEXT,
+    PUSH_REQUEST_ID,
+    SUBSCRIBE_COMMAND,
+    PackFrame,
+    ReceiveFrame,
+)
 from genmonlib.program_defaults import ProgramDefaults
 
 
@@ -26,6 +38,11 @@ class ClientInterface(MyCommon):
         port=ProgramDefaults.ServerPort,
         log=None,
         loglocation=ProgramDefaults.LogPath,
+        protocol=PROTOCOL_FRAMED,
+        compress=False,
+        timeout=None,
+        maxretries=10,
+        exitonerror=True,
     ):
         super(ClientInterface, self).__init__()
         if log != None:
@@ -41,9 +58,26 @@ class ClientInterface(MyCommon):
         self.rxdatasize = 2098152  # max json string size plus 1000
         self.host = host
         self.port = port
-        self.max_reties = 10
+        self.max_reties = maxretries
+        self.Timeout = timeout  # socket timeout in seconds, None is no timeout
+        self.ExitOnError = exitonerror  # exit if the connect fails, else raise
+        self.RequestedProtocol = protocol  # PROTOCOL_TEXT to not negotiate
+        # compression costs CPU on both ends, only worth it over the network
+        self.RequestCompression = compress or not self.IsLoopbackHost(host)
+        self.Protocol = PROTOCOL_TEXT  # protocol in use on the connection
+        self.RequestID = 0
+        self.Messages = collections.deque()  # pushed messages not yet read
         self.Connect()
 
+    # ----------  ClientInterface::IsLoopbackHost -------------------------------
+    def IsLoopbackHost(self, host):
+
+        try:
+            return socket.gethostbyname(host).startswith("127.")
+        except Exception as e1:
+            self.LogErrorLine("Error in IsLoopbackHost: " + str(e1))
+            return True
+
     # ----------  ClientInterface::Connect --------------------------------------
     def Connect(self):
 
@@ -53,38 +87,68 @@ class ClientInterface(MyCommon):
             try:
                 # create an INET, STREAMing socket
                 self.Socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self.Socket.settimeout(self.Timeout)
 
                 # now connect to the server on our port
                 self.Socket.connect((self.host, self.port))
+                self.Protocol = PROTOCOL_TEXT
                 sRetData, data = self.Receive(
                     noeom=True
                 )  # Get initial status before commands are sent
                 self.console.info(data)
+                if self.RequestedProtocol == PROTOCOL_FRAMED:
+                    self.NegotiateProtocol()
                 return
             except Exception as e1:
                 retries += 1
                 if retries >= self.max_reties:
                     self.LogErrorLine("Error: Connect : " + str(e1))
+                    if not self.ExitOnError:
+                        raise
                     self.console.error("Genmon not loaded.")
                     sys.exit(1)
                 else:
                     time.sleep(1)
                     continue
 
+    # ----------  ClientInterface::NegotiateProtocol ----------------------------
+    # switches the connection to framed messages if the server supports them,
+    # older servers return an error and the text protocol is used
+    def NegotiateProtocol(self):
+
+        command = PROTOCOL_COMMAND + str(PROTOCOL_FRAMED)
+        if self.RequestCompression:
+            command += ",compress"
+        self.Socket.sendall(command.encode("utf-8"))
+        RetStatus, data = self.Receive()
+        if RetStatus and data.strip().startswith("protocol=" + str(PROTOCOL_FRAMED)):
+            self.Protocol = PROTOCOL_FRAMED
+
     # ----------  ClientInterface::SendCommand ----------------------------------
     def SendCommand(self, cmd):
 
         try:
+            if self.Protocol == PROTOCOL_FRAMED:
+                self.RequestID = self.NextRequestID()
+                self.Socket.sendall(PackFrame(cmd.encode("utf-8"), self.RequestID))
+                return
             self.Socket.sendall(cmd.encode("utf-8"))
         except Exception as e1:
             self.LogErrorLine("Error: TX: " + str(e1))
             self.Close()
             self.Connect()
 
+    # ----------  ClientInterface::NextRequestID --------------------------------
+    # request IDs are 1 to 0xFFFFFFFF, PUSH_REQUEST_ID is not used
+    def NextRequestID(self):
+        return (self.RequestID % 0xFFFFFFFF) + 1
+
     # ----------  ClientInterface::Receive --------------------------------------
     def Receive(self, noeom=False):
 
         with self.AccessLock:
+            if self.Protocol == PROTOCOL_FRAMED:
+                return self.ReceiveFrame()
             RetStatus = True
             try:
                 bytedata = self.Socket.recv(self.rxdatasize)
@@ -116,6 +180,23 @@ class ClientInterface(MyCommon):
 
             return RetStatus, data
 
+    # ----------  ClientInterface::ReceiveFrame ---------------------------------
+    def ReceiveFrame(self):
+
+        try:
+            while True:
+                RequestID, data = ReceiveFrame(self.Socket)
+                # skip a response to an earlier command that was not read
+                if RequestID == self.RequestID:
+                    return True, data
+                if RequestID == PUSH_REQUEST_ID:
+                    self.Messages.append(data)
+        except Exception as e1:
+            self.LogErrorLine("Error: RX:" + str(e1))
+            self.Close()
+            self.Connect()
+            return False, "Retry"
+
     # ----------  ClientInterface::CheckForStarupMessage ------------------------
     def CheckForStarupMessage(self, data):
 
@@ -133,6 +214,81 @@ class ClientInterface(MyCommon):
     def Close(self):
         self.Socket.close()
 
+    # ----------  ClientInterface::IsConnected ----------------------------------
+    # returns False if the server closed the connection or sent data that was
+    # not requested, without waiting
+    def IsConnected(self):
+
+        try:
+            with self.AccessLock:
+                readable, writable, error = select.select([self.Socket], [], [], 0)
+                if not len(readable):
+                    return True
+                # readable with no command sent is a close or a stale response
+                return False
+        except Exception:
+            return False
+
+    # ----------  ClientInterface::SendReceive ----------------------------------
+    # sends one command and returns the response. Unlike ProcessMonitorCommand
+    # there is no reconnect or retry, an exception (socket.timeout if the
+    # socket timeout expires) is raised and the connection must be closed.
+    def SendReceive(self, cmd):
+
+        with self.AccessLock:
+            if self.Protocol == PROTOCOL_FRAMED:
+                self.RequestID = self.NextRequestID()
+                self.Socket.sendall(PackFrame(cmd.encode("utf-8"), self.RequestID))
+                while True:
+                    RequestID, data = ReceiveFrame(self.Socket)
+                    if RequestID == self.RequestID:
+                        return data
+                    if RequestID == PUSH_REQUEST_ID:
+                        self.Messages.append(data)
+            self.Socket.sendall(cmd.encode("utf-8"))
+            EndOfMessage = self.EndOfMessage.encode("utf-8")
+            bytedata = b""
+            while not bytedata.endswith(EndOfMessage):
+                more = self.Socket.recv(self.rxdatasize)
+                if not len(more):
+                    raise EOFError("connection closed")
+                bytedata += more
+            return bytedata[: -len(EndOfMessage)].decode("utf-8")
+
+    # ----------  ClientInterface::Subscribe ------------------------------------
+    # subscribes the connection to Topics, see mysocketprotocol.py. Returns
+    # False if genmon does not support subscriptions or a topic, raises an
+    # exception if the connection fails. A subscribed connection should only
+    # be used to receive messages.
+    def Subscribe(self, Topics):
+
+        if self.Protocol != PROTOCOL_FRAMED:
+            return False
+        data = self.SendReceive(SUBSCRIBE_COMMAND + ",".join(Topics))
+        if data.strip() != "OK":
+            self.LogError("Error in Subscribe: " + data.strip())
+            return False
+        return True
+
+    # ----------  ClientInterface::ReceiveMessage -------------------------------
+    # returns the next pushed message as (topic, data), or None if there is
+    # no message within timeout seconds. Raises an exception if the
+    # connection fails.
+    def ReceiveMessage(self, timeout=None):
+
+        with self.AccessLock:
+            while not len(self.Messages):
+                readable, writable, error = select.select(
+                    [self.Socket], [], [], timeout
+                )
+                if not len(readable):
+                    return None
+                RequestID, data = ReceiveFrame(self.Socket)
+                if RequestID == PUSH_REQUEST_ID:
+                    self.Messages.append(data)
+            Message = json.loads(self.Messages.popleft())
+            return Message["topic"], Message["data"]
+
     # ----------  ClientInterface::ProcessMonitorCommand ------------------------
     def ProcessMonitorCommand(self, cmd):
 
@@ -146,3 +302,250 @@ class ClientInterface(MyCommon):
         except Exception as e1:
             self.LogErrorLine("Error in ProcessMonitorCommand:" + str(e1))
         return data
+
+    # ----------  ClientInterface::ProcessBatchCommand --------------------------
+    # sends CommandList (command names without "generator: ") as one
+    # batch_json command and returns a dict of command name : response.
+    # Responses to _json commands are decoded. If genmon does not support
+    # batch_json the commands are sent one at a time.
+    def ProcessBatchCommand(self, CommandList):
+
+        try:
+            data = self.ProcessMonitorCommand(
+                "generator: batch_json=" + ",".join(CommandList)
+            )
+            try:
+                Responses = json.loads(data)
+            except ValueError:
+                Responses = None
+            if isinstance(Responses, dict) and all(
+                Command in Responses for Command in CommandList
+            ):
+                return Responses
+
+            Responses = {}
+            for Command in CommandList:
+                data = self.ProcessMonitorCommand("generator: " + Command)
+                if Command.endswith("_json"):
+                    try:
+                        data = json.loads(data)
+                    except ValueError:
+                        pass
+                Responses[Command] = data
+            return Responses
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessBatchCommand:" + str(e1))
+            return {}
+
+
+# ----------  ClientInterfacePool::init--- --------------------------------------
+class ClientInterfacePool(MyCommon):
+    # A pool of up to size ClientInterface connections for clients that send
+    # commands from several threads (e.g. genserv), so a slow command does not
+    # hold up the others. Connections are opened when needed and kept open.
+    # An idle connection is checked before it is used and replaced if the
+    # server closed it. A command that does not complete within timeout
+    # seconds returns "Retry" and its connection is closed. Errors never
+    # exit the program, ProcessMonitorCommand returns "Retry" instead.
+    def __init__(
+        self,
+        host=ProgramDefaults.LocalHost,
+        port=ProgramDefaults.ServerPort,
+        log=None,
+        loglocation=ProgramDefaults.LogPath,
+        size=4,
+        timeout=30.0,
+    ):
+        super(ClientInterfacePool, self).__init__()
+        if log != None:
+            self.log = log
+        else:
+            # log errors in this module to a file
+            self.log = SetupLogger("client", os.path.join(loglocation, "myclient.log"))
+
+        self.host = host
+        self.port = port
+        self.Size = max(size, 1)
+        self.Timeout = timeout
+        self.Idle = []  # connections not in use, most recently used last
+        self.Count = 0  # connections open, idle or in use
+        self.Closed = False
+        self.Condition = threading.Condition(threading.Lock())
+
+    # ----------  ClientInterfacePool::Acquire ----------------------------------
+    # returns a connection, waits up to timeout seconds for one if size
+    # connections are in use. Returns None on timeout or if a connection
+    # can not be opened.
+    def Acquire(self, timeout=None):
+
+        if timeout == None:
+            timeout = self.Timeout
+        Deadline = time.time() + timeout
+        with self.Condition:
+            while True:
+                if self.Closed:
+                    return None
+                while len(self.Idle):
+                    Client = self.Idle.pop()
+                    if Client.IsConnected():
+                        return Client
+                    # closed by the server (e.g. genmon restarted)
+                    self.Count -= 1
+                    self.CloseClient(Client)
+                if self.Count < self.Size:
+                    self.Count += 1
+                    break
+                Remaining = Deadline - time.time()
+                if Remaining <= 0:
+                    self.LogError(
+                        "Error in ClientInterfacePool: no connection available"
+                    )
+                    return None
+                self.Condition.wait(Remaining)
+
+        # connect without holding the lock so other threads are not held up
+        try:
+            return ClientInterface(
+                host=self.host,
+                port=self.port,
+                log=self.log,
+                timeout=self.Timeout,
+                maxretries=1,
+                exitonerror=False,
+            )
+        except Exception as e1:
+            self.LogErrorLine("Error in ClientInterfacePool:Acquire: " + str(e1))
+            with self.Condition:
+                self.Count -= 1
+                self.Condition.notify()
+            return None
+
+    # ----------  ClientInterfacePool::Release ----------------------------------
+    # returns a connection to the pool, a connection that had an error is
+    # closed
+    def Release(self, Client, ok=True):
+
+        with self.Condition:
+            if ok and not self.Closed:
+                self.Idle.append(Client)
+            else:
+                self.Count -= 1
+                self.CloseClient(Client)
+            self.Condition.notify()
+
+    # ----------  ClientInterfacePool::CloseClient ------------------------------
+    def CloseClient(self, Client):
+        try:
+            Client.Close()
+        except Exception:
+            pass
+
+    # ----------  ClientInterfacePool::ProcessMonitorCommand --------------------
+    # timeout is the number of seconds to wait for the response, None is the
+    # pool timeout
+    def ProcessMonitorCommand(self, cmd, timeout=None):
+
+        # a reused connection may have been closed since it was checked, try
+        # once more on a new connection unless the command timed out
+        for Attempt in range(2):
+            Client = self.Acquire()
+            if Client == None:
+                return "Retry"
+            try:
+                Client.Socket.settimeout(self.Timeout if timeout == None else timeout)
+                data = Client.SendReceive(cmd)
+                Client.Socket.settimeout(self.Timeout)
+                self.Release(Client)
+                return data
+            except socket.timeout:
+                self.LogError("Error in ClientInterfacePool: timeout: " + cmd)
+                self.Release(Client, ok=False)
+                return "Retry"
+            except Exception as e1:
+                self.LogErrorLine(
+                    "Error in ClientInterfacePool:ProcessMonitorCommand: " + str(e1)
+                )
+                self.Release(Client, ok=False)
+        return "Retry"
+
+    # ----------  ClientInterfacePool::Close ------------------------------------
+    def Close(self):
+
+        with self.Condition:
+            self.Closed = True
+            for Client in self.Idle:
+                self.CloseClient(Client)
+                self.Count -= 1
+            self.Idle = []
+            self.Condition.notify_all()
+
+
+# ----------  ClientSubscription::init--- ---------------------------------------
+class ClientSubscription(MyCommon):
+    # A connection subscribed to Topics for clients that track genmon data.
+    # Receive returns the pushed messages, or None if the client should poll
+    # instead because genmon does not support subscriptions (e.g. an older
+    # version) or the connection failed. The connection is opened again on
+    # the next call after a failure.
+    def __init__(
+        self,
+        topics,
+        host=ProgramDefaults.LocalHost,
+        port=ProgramDefaults.ServerPort,
+        log=None,
+        loglocation=ProgramDefaults.LogPath,
+    ):
+        super(ClientSubscription, self).__init__()
+        if log != None:
+            self.log = log
+        else:
+            # log errors in this module to a file
+            self.log = SetupLogger("client", os.path.join(loglocation, "myclient.log"))
+
+        self.host = host
+        self.port = port
+        self.Topics = topics
+        self.Client = None
+        self.Supported = True
+
+    # ----------  ClientSubscription::Receive -----------------------------------
+    # returns a list of (topic, data) received within timeout seconds (an
+    # empty list if nothing changed) or None if the client should poll
+    def Receive(self, timeout):
+
+        if not self.Supported:
+            return None
+        try:
+            if self.Client == None:
+                self.Client = ClientInterface(
+                    host=self.host,
+                    port=self.port,
+                    log=self.log,
+                    maxretries=1,
+                    exitonerror=False,
+                )
+                if not self.Client.Subscribe(self.Topics):
+                    self.LogError("Genmon subscriptions are not supported, polling")
+                    self.Supported = False
+                    self.Close()
+                    return None
+            Messages = []
+            Message = self.Client.ReceiveMessage(timeout)
+            while Message != None:
+                Messages.append(Message)
+                Message = self.Client.ReceiveMessage(0)
+            return Messages
+        except Exception as e1:
+            self.LogErrorLine("Error in ClientSubscription:Receive: " + str(e1))
+            self.Close()
+            return None
+
+    # ----------  ClientSubscription::Close -------------------------------------
+    def Close(self):
+
+        try:
+            if self.Client != None:
+                self.Client.Close()
+        except Exception:
+            pass
+        self.Client = None
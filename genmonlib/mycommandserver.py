@@ -0,0 +1,483 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mycommandserver.py
+# PURPOSE: command socket server, one event loop for all client connections
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import errno
+import socket
+import threading
+
+try:
+    import selectors
+except ImportError:  # python 2
+    selectors = None
+
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue
+
+from genmonlib.mysocketprotocol import (
+    END_OF_MESSAGE,
+    PROTOCOL_FRAMED,
+    PROTOCOL_TEXT,
+    PUSH_REQUEST_ID,
+    FrameReader,
+    PackFrame,
+    ParseProtocolCommand,
+    ParseSubscribeCommand,
+)
+from genmonlib.mysupport import MySupport
+from genmonlib.mythread import MyThread
+
+# socket errors that mean try again later on a non blocking socket
+RETRY_ERRORS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+
+# ------------ CommandClient class ----------------------------------------------
+class CommandClient(object):
+    # state for one client connection, only used by the event loop thread
+    # except for Closed and Compress which are also read by the workers
+
+    # ---------- CommandClient::__init__----------------------------------------
+    def __init__(self, conn):
+        self.Socket = conn
+        self.Protocol = PROTOCOL_TEXT
+        self.Compress = False
+        self.Reader = FrameReader()
+        # (kind, value, request ID) waiting to be run, kind is "status",
+        # "command" or "reply" (value is the response)
+        self.Commands = collections.deque()
+        self.Busy = False  # a command is being run by a worker
+        self.Output = bytearray()  # data waiting to be sent
+        self.Events = 0  # events registered with the selector
+        self.Closed = False
+        self.Topics = set()  # subscribed topics
+        self.Pending = set()  # subscribed topics not yet sent
+
+
+# ------------ MyCommandServer class --------------------------------------------
+class MyCommandServer(MySupport):
+    # Accepts command socket connections and reads commands from all clients
+    # in one thread (Serve) using a selector. Commands are run by a pool of
+    # worker threads. Each client has at most one command running so
+    # responses are sent in order. A client with maxqueued commands waiting,
+    # or maxoutput bytes not yet sent, is not read from until it catches up.
+    # Connections over maxconnections are sent a warning and closed.
+    #
+    # A client can subscribe to topics (see mysocketprotocol.py), the messages
+    # passed to Publish for those topics are then pushed to it. A subscriber
+    # that does not read its messages is closed when it reaches maxoutput.
+    #
+    # processcommand(command) returns the response to a command (in text
+    # protocol format, ending with "EndOfMessage"), getstatus() returns the
+    # status line sent when a client connects. validtopic(topic) returns True
+    # if a topic can be subscribed to, onsubscribe() is called when a client
+    # subscribes. See mysocketprotocol.py for the protocols.
+
+    Supported = selectors != None  # selectors is not available in python 2
+
+    # ---------- MyCommandServer::__init__--------------------------------------
+    def __init__(
+        self,
+        host,
+        port,
+        processcommand,
+        getstatus,
+        log=None,
+        validtopic=None,
+        onsubscribe=None,
+        maxconnections=32,
+        workers=4,
+        maxqueued=8,
+        maxoutput=8 * 1024 * 1024,
+    ):
+        super(MyCommandServer, self).__init__()
+        self.log = log
+        self.ProcessCommand = processcommand
+        self.GetStatus = getstatus
+        self.ValidTopic = validtopic
+        self.OnSubscribe = onsubscribe
+        self.MaxConnections = maxconnections
+        self.MaxQueued = maxqueued
+        self.MaxOutput = maxoutput
+        self.IsStopping = False
+        self.Clients = {}  # socket : CommandClient
+        self.Jobs = queue.Queue()  # (client, kind, value, request ID)
+        # (client, response (bytes), None to close the client)
+        self.Completed = collections.deque()
+        self.Published = collections.deque()  # dicts of topic : (message, changed)
+        self.TopicCounts = {}  # topic : number of subscribers
+        self.Lock = threading.Lock()
+
+        self.Selector = selectors.DefaultSelector()
+        self.ServerSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # set some socket options so we can resuse the port
+        self.ServerSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.ServerSocket.bind((host, port))
+        self.ServerSocket.listen(16)
+        self.ServerSocket.setblocking(False)
+        self.Selector.register(self.ServerSocket, selectors.EVENT_READ)
+        # workers write to WakeSend to wake the event loop when a response is ready
+        self.WakeReceive, self.WakeSend = socket.socketpair()
+        self.WakeReceive.setblocking(False)
+        self.WakeSend.setblocking(False)
+        self.Selector.register(self.WakeReceive, selectors.EVENT_READ)
+
+        for Worker in range(max(workers, 1)):
+            Name = "CommandWorker%d" % Worker
+            self.Threads[Name] = MyThread(self.WorkerThread, Name=Name)
+
+    # ---------- MyCommandServer::Serve-----------------------------------------
+    # runs the event loop until Close is called
+    def Serve(self):
+
+        while not self.IsStopping:
+            try:
+                for Key, Mask in self.Selector.select(0.5):
+                    if Key.fileobj is self.ServerSocket:
+                        self.Accept()
+                    elif Key.fileobj is self.WakeReceive:
+                        self.ClearWake()
+                    else:
+                        Client = self.Clients.get(Key.fileobj, None)
+                        if Client == None:
+                            continue
+                        if Mask & selectors.EVENT_READ:
+                            self.ReadClient(Client)
+                        if Mask & selectors.EVENT_WRITE and not Client.Closed:
+                            self.WriteClient(Client)
+                self.ProcessCompleted()
+            except Exception as e1:
+                if self.IsStopping:
+                    break
+                self.LogErrorLine("Error in MyCommandServer:Serve: " + str(e1))
+
+    # ---------- MyCommandServer::Accept----------------------------------------
+    def Accept(self):
+
+        try:
+            conn, addr = self.ServerSocket.accept()
+        except socket.error as e1:
+            if e1.errno not in RETRY_ERRORS:
+                self.LogErrorLine("Error in Accept: " + str(e1))
+            return
+        if len(self.Clients) >= self.MaxConnections:
+            self.LogError(
+                "Command connection refused, too many connections: " + str(addr[0])
+            )
+            try:
+                conn.sendall("WARNING: Too many connections".encode("utf-8"))
+                conn.close()
+            except Exception:
+                pass
+            return
+        conn.setblocking(False)
+        Client = CommandClient(conn)
+        self.Clients[conn] = Client
+        # the status line is the first thing sent to a client
+        Client.Commands.append(("status", None, None))
+        self.Dispatch(Client)
+        self.UpdateEvents(Client)
+
+    # ---------- MyCommandServer::ReadClient------------------------------------
+    def ReadClient(self, Client):
+
+        try:
+            data = Client.Socket.recv(65536)
+        except socket.error as e1:
+            if e1.errno not in RETRY_ERRORS:
+                self.CloseClient(Client)
+            return
+        if not len(data):
+            # socket closed remotely
+            self.CloseClient(Client)
+            return
+
+        try:
+            if Client.Protocol == PROTOCOL_FRAMED:
+                for RequestID, command in Client.Reader.Add(data):
+                    Topics = ParseSubscribeCommand(command)
+                    if Topics == None:
+                        Client.Commands.append(("command", command, RequestID))
+                    else:
+                        Response = self.Subscribe(Client, Topics)
+                        Client.Commands.append(("reply", Response, RequestID))
+            else:
+                # each read is one command, same as the previous server
+                Request = ParseProtocolCommand(data.decode("utf-8", "ignore"))
+                Topics = ParseSubscribeCommand(data.decode("utf-8", "ignore"))
+                if Topics != None:
+                    Response = self.Subscribe(Client, Topics)
+                    Client.Commands.append(("reply", Response + END_OF_MESSAGE, None))
+                elif Request == None:
+                    Client.Commands.append(("command", data, None))
+                else:
+                    # the response is sent with the current protocol
+                    if Request[0] == PROTOCOL_FRAMED:
+                        Client.Protocol = PROTOCOL_FRAMED
+                        Client.Compress = Request[1]
+                        Response = "protocol=2" + (
+                            ",compress" if Client.Compress else ""
+                        )
+                    else:
+                        Response = "protocol=1"
+                    Client.Commands.append(("reply", Response + END_OF_MESSAGE, None))
+        except ValueError as e1:
+            # invalid frame, the connection can not be resynchronized
+            self.LogError("Error in ReadClient: " + str(e1))
+            self.CloseClient(Client)
+            return
+        self.Dispatch(Client)
+        self.UpdateEvents(Client)
+
+    # ---------- MyCommandServer::Dispatch--------------------------------------
+    # starts the next command for a client if it does not have one running
+    def Dispatch(self, Client):
+
+        while not Client.Busy and len(Client.Commands):
+            Kind, Value, RequestID = Client.Commands.popleft()
+            if Kind == "reply":
+                if RequestID == None:
+                    Client.Output.extend(Value.encode("utf-8"))
+                else:
+                    Client.Output.extend(PackFrame(Value.encode("utf-8"), RequestID))
+                continue
+            Client.Busy = True
+            self.Jobs.put((Client, Kind, Value, RequestID))
+
+    # ---------- MyCommandServer::WorkerThread----------------------------------
+    def WorkerThread(self):
+
+        while not self.IsStopping:
+            try:
+                Client, Kind, Value, RequestID = self.Jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            Response = b""
+            if not Client.Closed:
+                try:
+                    if Kind == "status":
+                        outstr = self.GetStatus()
+                    else:
+                        outstr = self.ProcessCommand(Value)
+                except Exception as e1:
+                    self.LogErrorLine("Error in CommandWorker: " + str(e1))
+                    # always reply, the client is waiting for the response
+                    if Kind == "status":
+                        outstr = "WARNING: Error getting status"
+                    else:
+                        outstr = "Error processing command" + END_OF_MESSAGE
+                try:
+                    if RequestID == None:
+                        Response = outstr.encode("utf-8")
+                    else:
+                        if outstr.endswith(END_OF_MESSAGE):
+                            outstr = outstr[: -len(END_OF_MESSAGE)]
+                        Response = PackFrame(
+                            outstr.encode("utf-8"), RequestID, Client.Compress
+                        )
+                except Exception as e1:
+                    self.LogErrorLine("Error in CommandWorker: " + str(e1))
+                    Response = None  # no reply can be sent, close the client
+            with self.Lock:
+                self.Completed.append((Client, Response))
+            self.Wake()
+
+    # ---------- MyCommandServer::Subscribe-------------------------------------
+    # replaces the topics a client is subscribed to (an empty list
+    # unsubscribes), returns the response to the subscribe command
+    def Subscribe(self, Client, Topics):
+
+        for Topic in Topics:
+            if self.ValidTopic == None or not self.ValidTopic(Topic):
+                return "Error: invalid topic: " + Topic
+        self.RemoveTopics(Client)
+        Client.Topics = set(Topics)
+        Client.Pending = set(Topics)  # the first message is always sent
+        with self.Lock:
+            for Topic in Client.Topics:
+                self.TopicCounts[Topic] = self.TopicCounts.get(Topic, 0) + 1
+        if len(Topics) and self.OnSubscribe != None:
+            self.OnSubscribe()
+        return "OK"
+
+    # ---------- MyCommandServer::RemoveTopics----------------------------------
+    def RemoveTopics(self, Client):
+
+        with self.Lock:
+            for Topic in Client.Topics:
+                Count = self.TopicCounts.get(Topic, 0) - 1
+                if Count > 0:
+                    self.TopicCounts[Topic] = Count
+                else:
+                    self.TopicCounts.pop(Topic, None)
+        Client.Topics = set()
+        Client.Pending = set()
+
+    # ---------- MyCommandServer::GetTopics-------------------------------------
+    # returns the topics that have subscribers
+    def GetTopics(self):
+        with self.Lock:
+            return list(self.TopicCounts.keys())
+
+    # ---------- MyCommandServer::Publish---------------------------------------
+    # Messages is a dict of topic : (message (string), changed). A message is
+    # sent to the subscribers of its topic if it changed, or if the
+    # subscriber has not been sent a message for the topic yet. Messages is
+    # expected to hold every subscribed topic, it can be called from any
+    # thread.
+    def Publish(self, Messages):
+
+        with self.Lock:
+            self.Published.append(Messages)
+        self.Wake()
+
+    # ---------- MyCommandServer::SendPublished---------------------------------
+    def SendPublished(self):
+
+        with self.Lock:
+            Published = list(self.Published)
+            self.Published.clear()
+        for Messages in Published:
+            for Client in list(self.Clients.values()):
+                if not len(Client.Topics):
+                    continue
+                for Topic in Client.Topics:
+                    Message = Messages.get(Topic, None)
+                    if Message == None:
+                        continue
+                    if Message[1] or Topic in Client.Pending:
+                        Client.Pending.discard(Topic)
+                        Payload = Message[0].encode("utf-8")
+                        if Client.Protocol == PROTOCOL_FRAMED:
+                            Client.Output.extend(
+                                PackFrame(Payload, PUSH_REQUEST_ID, Client.Compress)
+                            )
+                        else:
+                            Client.Output.extend(
+                                Payload + END_OF_MESSAGE.encode("utf-8")
+                            )
+                if len(Client.Output) >= self.MaxOutput:
+                    # the subscriber is not reading, it must subscribe again
+                    self.LogError(
+                        "Closing command connection, subscriber is not reading"
+                    )
+                    self.CloseClient(Client)
+                    continue
+                self.WriteClient(Client)
+
+    # ---------- MyCommandServer::Wake------------------------------------------
+    def Wake(self):
+        try:
+            self.WakeSend.send(b"\0")
+        except socket.error:
+            # the wake socket is full, the loop is already awake
+            pass
+
+    # ---------- MyCommandServer::ClearWake-------------------------------------
+    def ClearWake(self):
+        try:
+            while len(self.WakeReceive.recv(4096)):
+                pass
+        except socket.error:
+            pass
+
+    # ---------- MyCommandServer::ProcessCompleted------------------------------
+    # adds published messages and the responses from the workers to the
+    # client output
+    def ProcessCompleted(self):
+
+        self.SendPublished()
+        with self.Lock:
+            Completed = list(self.Completed)
+            self.Completed.clear()
+        for Client, Response in Completed:
+            Client.Busy = False
+            if Client.Closed:
+                continue
+            if Response == None:
+                self.CloseClient(Client)
+                continue
+            Client.Output.extend(Response)
+            self.Dispatch(Client)
+            self.WriteClient(Client)
+
+    # ---------- MyCommandServer::WriteClient-----------------------------------
+    def WriteClient(self, Client):
+
+        if len(Client.Output):
+            try:
+                Sent = Client.Socket.send(Client.Output)
+                del Client.Output[:Sent]
+            except socket.error as e1:
+                if e1.errno not in RETRY_ERRORS:
+                    self.CloseClient(Client)
+                    return
+        self.UpdateEvents(Client)
+
+    # ---------- MyCommandServer::UpdateEvents----------------------------------
+    # a client is read from only if it is not over the queued command and
+    # output limits, and written to only if it has output waiting
+    def UpdateEvents(self, Client):
+
+        if Client.Closed:
+            return
+        Events = 0
+        if (
+            len(Client.Commands) < self.MaxQueued
+            and len(Client.Output) < self.MaxOutput
+        ):
+            Events |= selectors.EVENT_READ
+        if len(Client.Output):
+            Events |= selectors.EVENT_WRITE
+        if Events == Client.Events:
+            return
+        if Client.Events == 0:
+            self.Selector.register(Client.Socket, Events)
+        elif Events == 0:
+            self.Selector.unregister(Client.Socket)
+        else:
+            self.Selector.modify(Client.Socket, Events)
+        Client.Events = Events
+
+    # ---------- MyCommandServer::CloseClient-----------------------------------
+    def CloseClient(self, Client):
+
+        if Client.Closed:
+            return
+        Client.Closed = True
+        self.RemoveTopics(Client)
+        try:
+            if Client.Events:
+                self.Selector.unregister(Client.Socket)
+            Client.Events = 0
+            Client.Socket.close()
+        except Exception:
+            pass
+        self.Clients.pop(Client.Socket, None)
+
+    # ---------- MyCommandServer::Close-----------------------------------------
+    def Close(self):
+
+        self.IsStopping = True
+        try:
+            for Name in list(self.Threads.keys()):
+                self.KillThread(Name)
+            for Client in list(self.Clients.values()):
+                self.CloseClient(Client)
+            for Socket in [self.ServerSocket, self.WakeReceive, self.WakeSend]:
+                try:
+                    Socket.close()
+                except Exception:
+                    pass
+            self.Selector.close()
+        except Exception as e1:
+            self.LogErrorLine("Error in MyCommandServer:Close: " + str(e1))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myfuellog.py
+# PURPOSE: binary time indexed fuel level log with consumption and refills
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import bisect
+
+from genmonlib.mypowerlog import POWERLOG_BUCKET_SECONDS, MyPowerLog
+
+
+# ------------ MyFuelLog class --------------------------------------------------
+class MyFuelLog(MyPowerLog):
+    # Fuel level (percent) log, stored in the power log file format (see
+    # mypowerlog.py) with the fuel level in place of kW, so range queries and
+    # reduced charts work the same way.
+    #
+    # Instead of power totals each day bucket holds [seconds, fuel used
+    # (percent), intervals]. Fuel used is the net drop in level, so sensor
+    # noise cancels out. A rise of refillthreshold percent or more between
+    # two records is a refill, it is kept in Refills and is not counted as
+    # fuel used. The buckets and refills are updated as records are appended
+    # so queries do not scan the file.
+
+    LogName = "fuel log"  # used in log messages
+
+    # ---------- MyFuelLog::__init__--------------------------------------------
+    def __init__(self, filename, log=None, writer=None, refillthreshold=5.0):
+        self.RefillThreshold = refillthreshold
+        self.Refills = []  # (time, level before, level after), oldest first
+        super(MyFuelLog, self).__init__(filename, log=log, writer=writer)
+
+    # ---------- MyFuelLog::ResetState------------------------------------------
+    def ResetState(self):
+        super(MyFuelLog, self).ResetState()
+        self.Refills = []
+
+    # ---------- MyFuelLog::AddInterval-----------------------------------------
+    def AddInterval(self, Time, Value, NextTime, NextValue):
+
+        Bucket = self.Buckets.get(Time // POWERLOG_BUCKET_SECONDS, None)
+        if Bucket == None:
+            Bucket = self.Buckets[Time // POWERLOG_BUCKET_SECONDS] = [0, 0.0, 0]
+        Bucket[0] += NextTime - Time
+        Bucket[2] += 1
+        if NextValue - Value >= self.RefillThreshold:
+            self.Refills.append((NextTime, Value, NextValue))
+        else:
+            Bucket[1] += Value - NextValue
+
+    # ---------- MyFuelLog::GetConsumption--------------------------------------
+    # returns (fuel used (percent), time (seconds)) for the intervals that
+    # start at or after StartTime (None is the whole log)
+    def GetConsumption(self, StartTime=None):
+
+        with self.Lock:
+            Seconds = 0
+            FuelUsed = 0.0
+            if StartTime == None:
+                FirstDay = None
+            else:
+                StartTime = int(StartTime)
+                FirstDay = StartTime // POWERLOG_BUCKET_SECONDS
+                # the first day is partly in the window, add its intervals
+                # from the records
+                DayEnd = (FirstDay + 1) * POWERLOG_BUCKET_SECONDS
+                Start = self.FindRecord(StartTime)
+                End = min(self.FindRecord(DayEnd) + 1, self.Count)
+                Times, Values = self.Unpack(self.ReadData(Start, End))
+                for Time, Value, NextTime, NextValue in zip(
+                    Times, Values, Times[1:], Values[1:]
+                ):
+                    if Time >= DayEnd:
+                        break
+                    Seconds += NextTime - Time
+                    if NextValue - Value < self.RefillThreshold:
+                        FuelUsed += Value - NextValue
+
+            for Day, Bucket in self.Buckets.items():
+                if FirstDay == None or Day > FirstDay:
+                    Seconds += Bucket[0]
+                    FuelUsed += Bucket[1]
+
+            return FuelUsed, float(Seconds)
+
+    # ---------- MyFuelLog::GetRefills------------------------------------------
+    # returns a list of (time, level before, level after), oldest first, for
+    # refills at or after StartTime (None is the whole log)
+    def GetRefills(self, StartTime=None):
+
+        with self.Lock:
+            if StartTime == None:
+                return list(self.Refills)
+            First = bisect.bisect_left(self.Refills, (int(StartTime),))
+            return self.Refills[First:]
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mylogwriter.py
+# PURPOSE: buffered append writer for log files
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import os
+import sys
+import threading
+import time
+
+from genmonlib.mysupport import MySupport
+from genmonlib.mythread import MyThread
+
+# Fix Python 2.x. unicode type
+if sys.version_info[0] >= 3:  # PYTHON 3
+    unicode = str
+
+
+# ------------ MyLogWriter class ------------------------------------------------
+class MyLogWriter(MySupport):
+    # Data appended to a file with Write is held in a per file buffer and
+    # written with one open / write / close of the file when the oldest data
+    # in the buffer is flushinterval seconds old, when the file has batchsize
+    # writes waiting, or when more than maxpending bytes are waiting for all
+    # files (the write that goes over the limit flushes all files). If fsync
+    # is True each flush is synced to the disk. A flushinterval of zero writes
+    # each Write directly to the file.
+    #
+    # Read and GetSize include data that has not been written yet. Flush a file
+    # before reading it directly and Discard it before replacing or removing it.
+
+    # ---------- MyLogWriter::__init__------------------------------------------
+    def __init__(
+        self,
+        log=None,
+        flushinterval=30,
+        batchsize=100,
+        maxpending=256 * 1024,
+        fsync=False,
+    ):
+        super(MyLogWriter, self).__init__()
+        self.log = log
+        self.FlushInterval = flushinterval
+        self.BatchSize = batchsize
+        self.MaxPending = maxpending
+        self.FSync = fsync
+        self.Lock = threading.RLock()
+        # file name : [pending data (bytearray), pending writes, time of oldest write]
+        self.Files = collections.OrderedDict()
+        self.Pending = 0  # bytes waiting for all files
+        self.FileWrites = 0  # number of times data was written to a file
+        self.IsClosed = False
+
+        if self.FlushInterval > 0:
+            self.Threads["LogWriter"] = MyThread(
+                self.LogWriterThread, Name="LogWriter", start=False
+            )
+            self.Threads["LogWriter"].Start()
+
+    # ---------- MyLogWriter::LogWriterThread-----------------------------------
+    def LogWriterThread(self):
+
+        while True:
+            if self.WaitForExit("LogWriter", min(self.FlushInterval, 5)):
+                return
+            try:
+                Now = time.time()
+                with self.Lock:
+                    Expired = [
+                        FileName
+                        for FileName, Entry in self.Files.items()
+                        if Now - Entry[2] >= self.FlushInterval
+                    ]
+                    for FileName in Expired:
+                        self.Flush(FileName)
+            except Exception as e1:
+                self.LogErrorLine("Error in LogWriterThread: " + str(e1))
+
+    # ---------- MyLogWriter::Write---------------------------------------------
+    # appends Data (bytes or a string) to FileName
+    def Write(self, FileName, Data):
+
+        if isinstance(Data, unicode):
+            Data = Data.encode("utf-8")
+        with self.Lock:
+            if self.FlushInterval <= 0 or self.IsClosed:
+                self.WriteFile(FileName, Data)
+                return
+            Entry = self.Files.get(FileName, None)
+            if Entry == None:
+                Entry = self.Files[FileName] = [bytearray(), 0, time.time()]
+            Entry[0].extend(Data)
+            Entry[1] += 1
+            self.Pending += len(Data)
+            if self.Pending > self.MaxPending:
+                self.Flush()
+            elif Entry[1] >= self.BatchSize:
+                self.Flush(FileName)
+
+    # ---------- MyLogWriter::WriteFile-----------------------------------------
+    def WriteFile(self, FileName, Data):
+
+        try:
+            with open(FileName, "ab") as LogFile:
+                LogFile.write(Data)
+                LogFile.flush()
+                if self.FSync:
+                    os.fsync(LogFile.fileno())
+            self.FileWrites += 1
+        except Exception as e1:
+            self.LogError("Error in WriteFile : File: %s: %s " % (FileName, str(e1)))
+
+    # ---------- MyLogWriter::Flush---------------------------------------------
+    # writes the data waiting for FileName, or for all files if FileName is None
+    def Flush(self, FileName=None):
+
+        with self.Lock:
+            if FileName == None:
+                FileList = list(self.Files.keys())
+            else:
+                FileList = [FileName]
+            for FileName in FileList:
+                Entry = self.Files.pop(FileName, None)
+                if Entry == None:
+                    continue
+                self.Pending -= len(Entry[0])
+                self.WriteFile(FileName, bytes(Entry[0]))
+
+    # ---------- MyLogWriter::Discard-------------------------------------------
+    # drops the data waiting for FileName without writing it
+    def Discard(self, FileName):
+
+        with self.Lock:
+            Entry = self.Files.pop(FileName, None)
+            if Entry != None:
+                self.Pending -= len(Entry[0])
+
+    # ---------- MyLogWriter::GetSize-------------------------------------------
+    # returns the size of FileName including data that has not been written
+    def GetSize(self, FileName):
+
+        with self.Lock:
+            Size = os.path.getsize(FileName) if os.path.isfile(FileName) else 0
+            Entry = self.Files.get(FileName, None)
+            if Entry != None:
+                Size += len(Entry[0])
+            return Size
+
+    # ---------- MyLogWriter::Read----------------------------------------------
+    # returns up to Size bytes of FileName starting at Offset, including data
+    # that has not been written
+    def Read(self, FileName, Offset, Size):
+
+        with self.Lock:
+            Data = b""
+            FileSize = 0
+            if os.path.isfile(FileName):
+                with open(FileName, "rb") as LogFile:
+                    LogFile.seek(0, os.SEEK_END)
+                    FileSize = LogFile.tell()
+                    if Offset < FileSize:
+                        LogFile.seek(Offset)
+                        Data = LogFile.read(Size)
+            Entry = self.Files.get(FileName, None)
+            if Entry != None and len(Data) < Size:
+                Start = max(Offset - FileSize, 0)
+                Data += bytes(Entry[0][Start : Start + Size - len(Data)])
+            return Data
+
+    # ---------- MyLogWriter::Close---------------------------------------------
+    # writes all waiting data, later writes go directly to the file
+    def Close(self):
+
+        try:
+            if self.FlushInterval > 0:
+                self.KillThread("LogWriter")
+            with self.Lock:
+                self.Flush()
+                self.IsClosed = True
+        except Exception as e1:
+            self.LogErrorLine("Error in MyLogWriter:Close: " + str(e1))
@@ -13,19 +13,27 @@ from __future__ import (  # For python 3.x compatibility with print function
     print_function,
 )
 
+import collections
 import datetime
+import os
 import sys
 import time
 
 import crcmod
 
 from genmonlib.modbusbase import ModbusBase
+from genmonlib.mybuscapture import MyBusCapture
 from genmonlib.myserial import SerialDevice
 from genmonlib.myserialtcp import SerialTCPDevice
 
 
 # ------------ ModbusProtocol class ---------------------------------------------
 class ModbusProtocol(ModbusBase):
+    # longest single wait for response data, so IsStopping is checked regularly
+    MAX_RESPONSE_WAIT_SLICE = 0.5
+    # most requests kept outstanding when pipelining Modbus TCP requests
+    MAX_PIPELINE_DEPTH = 16
+
     def __init__(
         self,
         updatecallback,
@@ -39,6 +47,7 @@ class ModbusProtocol(ModbusBase):
         port=None,
         modbustcp=False,  # True of Modbus TCP, else if TCP then assume serial over TCP (Modbus RTU over serial)
         use_fc4=False,
+        capturefile=None,  # record raw bus traffic to this file
     ):
 
         super(ModbusProtocol, self).__init__(
@@ -58,7 +67,15 @@ class ModbusProtocol(ModbusBase):
                 self.Parity = Parity
                 self.Rate = rate
             self.TransactionID = 0
+            self.CurrentTransactionID = 0
+            # when pipelining, transaction IDs of all outstanding requests
+            self.InFlightTransactionIDs = None
+            self.RxTransactionID = None  # ID of the last Modbus TCP response
             self.AlternateFileProtocol = False
+            self.SupportsBlockRead = True
+            self.PipelineDepth = max(
+                1, min(self.PipelineDepth, self.MAX_PIPELINE_DEPTH)
+            )
 
             if host != None and port != None and self.config == None:
                 # in this instance we do not use a config file, but config comes from command line
@@ -80,17 +97,16 @@ class ModbusProtocol(ModbusBase):
 
             if self.UseTCP:
                 self.ModBusPacketTimoutMS = self.ModBusPacketTimoutMS + 2000
+            if capturefile != None:
+                self.CaptureFileName = capturefile
+            self.Capture = self.OpenCapture()
             # Starting serial connection
-            if self.UseTCP:
-                self.Slave = SerialTCPDevice(config=self.config, host=host, port=port)
-            else:
-                self.Slave = SerialDevice(
-                    name=name,
-                    rate=self.Rate,
-                    Parity=self.Parity,
-                    OnePointFiveStopBits=OnePointFiveStopBits,
-                    config=self.config,
-                )
+            self.Slave = self.CreateSlave(
+                name=name,
+                OnePointFiveStopBits=OnePointFiveStopBits,
+                host=host,
+                port=port,
+            )
             self.Threads = self.MergeDicts(self.Threads, self.Slave.Threads)
 
         except Exception as e1:
@@ -104,6 +120,38 @@ class ModbusProtocol(ModbusBase):
         except Exception as e1:
             self.FatalError("Unable to find crcmod package: " + str(e1))
 
+    # ---------- ModbusProtocol::CreateSlave-----------------------------------
+    # returns the device used to talk to the controller
+    def CreateSlave(self, name, OnePointFiveStopBits=None, host=None, port=None):
+
+        if self.UseTCP:
+            return SerialTCPDevice(
+                config=self.config, host=host, port=port, capture=self.Capture
+            )
+        return SerialDevice(
+            name=name,
+            rate=self.Rate,
+            Parity=self.Parity,
+            OnePointFiveStopBits=OnePointFiveStopBits,
+            config=self.config,
+            capture=self.Capture,
+        )
+
+    # ---------- ModbusProtocol::OpenCapture-----------------------------------
+    def OpenCapture(self):
+
+        if self.CaptureFileName == None or not len(self.CaptureFileName.strip()):
+            return None
+        try:
+            FileName = self.CaptureFileName.strip()
+            if not os.path.isabs(FileName):
+                FileName = os.path.join(self.loglocation, FileName)
+            self.LogError("Recording bus traffic to " + FileName)
+            return MyBusCapture(FileName, modbustcp=self.ModbusTCP, log=self.log)
+        except Exception as e1:
+            self.LogErrorLine("Error in OpenCapture: " + str(e1))
+            return None
+
     # --------------------ModbusProtocol:GetExceptionString----------------------
     def GetExceptionString(self, Code):
 
@@ -172,8 +220,9 @@ class ModbusProtocol(ModbusBase):
         LocalErrorCount = 0
         Packet = []
         EmptyPacket = []  # empty packet
+        Buffer = self.Slave.Buffer
         try:
-            if not len(self.Slave.Buffer):
+            if not len(Buffer):
                 return True, EmptyPacket
 
             if self.ModbusTCP:
@@ -187,55 +236,60 @@ class ModbusProtocol(ModbusBase):
                 # byte 7:   MODBUS function code
                 # byte 8 on:    data as needed
 
-                if len(self.Slave.Buffer) < (
+                if len(Buffer) < (
                     self.MIN_PACKET_ERR_LENGTH + self.MODBUS_TCP_HEADER_SIZE
                 ):
                     return True, EmptyPacket
 
-                # transaction ID must match
-                rxID = (self.Slave.Buffer[0] << 8) | (self.Slave.Buffer[1] & 0xFF)
-                if self.CurrentTransactionID != rxID:
-                    self.LogError(
-                        "ModbusTCP transaction ID mismatch: %x %x"
-                        % (self.CurrentTransactionID, rxID)
-                    )
-                    self.DiscardByte(reason="Transaction ID")
-                    self.Flush()
-                    return False, EmptyPacket
+                rxID = (Buffer[0] << 8) | (Buffer[1] & 0xFF)
                 # protocol ID is zero
-                if self.Slave.Buffer[2] != 0 or self.Slave.Buffer[3] != 0:
+                if Buffer[2] != 0 or Buffer[3] != 0:
                     self.LogError(
                         "ModbusTCP protocool ID non zero: %x %x"
-                        % (self.Slave.Buffer[2], self.Slave.Buffer[3])
+                        % (Buffer[2], Buffer[3])
                     )
                     self.DiscardByte(reason="protocol error")
                     self.Flush()
                     return False, EmptyPacket
                 # Modbus TCP payload length
-                ModbusTCPLength = (self.Slave.Buffer[4] << 8) | (
-                    self.Slave.Buffer[5] & 0xFF
-                )
-                if len(self.Slave.Buffer[6:]) != ModbusTCPLength:
+                ModbusTCPLength = (Buffer[4] << 8) | (Buffer[5] & 0xFF)
+                if (len(Buffer) - self.MODBUS_TCP_HEADER_SIZE) < ModbusTCPLength:
                     # more data is needed
                     return True, EmptyPacket
 
+                if self.InFlightTransactionIDs != None:
+                    # pipelined, the response can be for any outstanding request.
+                    # Responses to requests that have timed out are dropped
+                    if not rxID in self.InFlightTransactionIDs:
+                        self.LogError("ModbusTCP unexpected transaction ID: %x" % rxID)
+                        self.UnexpectedData += 1
+                        Buffer.Consume(self.MODBUS_TCP_HEADER_SIZE + ModbusTCPLength)
+                        return True, EmptyPacket
+                # transaction ID must match
+                elif self.CurrentTransactionID != rxID:
+                    self.LogError(
+                        "ModbusTCP transaction ID mismatch: %x %x"
+                        % (self.CurrentTransactionID, rxID)
+                    )
+                    self.DiscardByte(reason="Transaction ID")
+                    self.Flush()
+                    return False, EmptyPacket
+
+                self.RxTransactionID = rxID
                 # remove modbud TCP header
-                for i in range(0, self.MODBUS_TCP_HEADER_SIZE):
-                    self.Slave.Buffer.pop(0)
+                Buffer.Consume(self.MODBUS_TCP_HEADER_SIZE)
 
-            if not self.CheckResponseAddress(self.Slave.Buffer[self.MBUS_OFF_ADDRESS]):
+            if not self.CheckResponseAddress(Buffer[self.MBUS_OFF_ADDRESS]):
                 self.DiscardByte(reason="Response Address")
                 self.Flush()
                 return False, EmptyPacket
 
-            if len(self.Slave.Buffer) < self.MIN_PACKET_ERR_LENGTH:
+            if len(Buffer) < self.MIN_PACKET_ERR_LENGTH:
                 return True, EmptyPacket  # No full packet ready
 
-            if self.Slave.Buffer[self.MBUS_OFF_COMMAND] & self.MBUS_ERROR_BIT:
-                for i in range(0, self.MIN_PACKET_ERR_LENGTH):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Exception code, and CRC
+            if Buffer[self.MBUS_OFF_COMMAND] & self.MBUS_ERROR_BIT:
+                # pop Address, Function, Exception code, and CRC
+                Packet = Buffer.PopPacket(self.MIN_PACKET_ERR_LENGTH)
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
                     self.ModbusException += 1
@@ -253,27 +307,25 @@ class ModbusProtocol(ModbusBase):
                 return False, Packet
 
             if min_response_override != None:
-                if len(self.Slave.Buffer) < min_response_override:
+                if len(Buffer) < min_response_override:
                     return True, EmptyPacket  # No full packet ready
             else:
-                if len(self.Slave.Buffer) < self.MIN_PACKET_RESPONSE_LENGTH:
+                if len(Buffer) < self.MIN_PACKET_RESPONSE_LENGTH:
                     return True, EmptyPacket  # No full packet ready
 
-            if self.Slave.Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_READ_REGS]:
+            if Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_READ_REGS]:
                 # it must be a read command response
-                length = self.Slave.Buffer[
+                length = Buffer[
                     self.MBUS_OFF_RESPONSE_LEN
                 ]  # our packet tells us the length of the payload
                 # if the full length of the packet has not arrived, return and try again
-                if (length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH) > len(
-                    self.Slave.Buffer
-                ):
+                if (length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH) > len(Buffer):
                     return True, EmptyPacket
 
-                for i in range(0, length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # pop Address, Function, Length, message and CRC
+                Packet = Buffer.PopPacket(
+                    length + self.MBUS_RES_PAYLOAD_SIZE_MINUS_LENGTH
+                )
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -281,14 +333,12 @@ class ModbusProtocol(ModbusBase):
                 else:
                     self.CrcError += 1
                     return False, Packet
-            elif self.Slave.Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_WRITE_REGS]:
+            elif Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_WRITE_REGS]:
                 # it must be a write command response
-                if len(self.Slave.Buffer) < self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH:
+                if len(Buffer) < self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH:
                     return True, EmptyPacket
-                for i in range(0, self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # address, function, address hi, address low, quantity hi, quantity low, CRC high, crc low
+                # address, function, address hi, address low, quantity hi, quantity low, CRC high, crc low
+                Packet = Buffer.PopPacket(self.MIN_PACKET_MIN_WRITE_RESPONSE_LENGTH)
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -296,30 +346,25 @@ class ModbusProtocol(ModbusBase):
                 else:
                     self.CrcError += 1
                     return False, Packet
-            elif self.Slave.Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_READ_FILE]:
-                length = self.Slave.Buffer[
+            elif Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_READ_FILE]:
+                length = Buffer[
                     self.MBUS_OFF_RESPONSE_LEN
                 ]  # our packet tells us the length of the payload
-                if (
-                    self.Slave.Buffer[self.MBUS_OFF_FILE_TYPE]
-                    != self.MBUS_FILE_TYPE_VALUE
-                ):
+                if Buffer[self.MBUS_OFF_FILE_TYPE] != self.MBUS_FILE_TYPE_VALUE:
                     self.LogError("Invalid modbus file record type")
                     self.ComValidationError += 1
                     return False, EmptyPacket
                 # if the full length of the packet has not arrived, return and try again
                 if (length + self.MBUS_FILE_READ_PAYLOAD_SIZE_MINUS_LENGTH) > len(
-                    self.Slave.Buffer
+                    Buffer
                 ):
                     return True, EmptyPacket
                 # we will copy the entire buffer, this will be validated at a later time
-                for i in range(0, len(self.Slave.Buffer)):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # pop Address, Function, Length, message and CRC
+                Packet = Buffer.PopPacket(len(Buffer))
 
-                if len(self.Slave.Buffer):
-                    self.LogHexList(self.Slave.Buffer, prefix="Left Over")
+                if len(Buffer):
+                    self.LogHexList(Buffer.ToList(), prefix="Left Over")
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -327,30 +372,25 @@ class ModbusProtocol(ModbusBase):
                 else:
                     self.CrcError += 1
                     return False, Packet
-            elif self.Slave.Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_WRITE_FILE]:
-                length = self.Slave.Buffer[
+            elif Buffer[self.MBUS_OFF_COMMAND] in [self.MBUS_CMD_WRITE_FILE]:
+                length = Buffer[
                     self.MBUS_OFF_RESPONSE_LEN
                 ]  # our packet tells us the length of the payload
-                if (
-                    self.Slave.Buffer[self.MBUS_OFF_WRITE_FILE_TYPE]
-                    != self.MBUS_FILE_TYPE_VALUE
-                ):
+                if Buffer[self.MBUS_OFF_WRITE_FILE_TYPE] != self.MBUS_FILE_TYPE_VALUE:
                     self.LogError("Invalid modbus write file record type")
                     self.ComValidationError += 1
                     return False, EmptyPacket
                 # if the full length of the packet has not arrived, return and try again
                 if (length + self.MBUS_FILE_READ_PAYLOAD_SIZE_MINUS_LENGTH) > len(
-                    self.Slave.Buffer
+                    Buffer
                 ):
                     return True, EmptyPacket
                 # we will copy the entire buffer, this will be validated at a later time
-                for i in range(0, len(self.Slave.Buffer)):
-                    Packet.append(
-                        self.Slave.Buffer.pop(0)
-                    )  # pop Address, Function, Length, message and CRC
+                # pop Address, Function, Length, message and CRC
+                Packet = Buffer.PopPacket(len(Buffer))
 
-                if len(self.Slave.Buffer):
-                    self.LogHexList(self.Slave.Buffer, prefix="Left Over")
+                if len(Buffer):
+                    self.LogHexList(Buffer.ToList(), prefix="Left Over")
 
                 if self.CheckCRC(Packet):
                     self.RxPacketCount += 1
@@ -381,7 +421,7 @@ class ModbusProtocol(ModbusBase):
     def _PWT(self, Register, Length, Data, min_response_override=None):
 
         try:
-            with self.CommAccessLock:
+            with self.CommAccessLock.Priority(self.BUS_PRIORITY_CONTROL):
                 MasterPacket = []
 
                 MasterPacket = self.CreateMasterPacket(
@@ -394,6 +434,7 @@ class ModbusProtocol(ModbusBase):
                 if len(MasterPacket) == 0:
                     return False
 
+                self.WriteTransactionCount += 1
                 # skipupdate=True to skip writing results to cached reg values
                 return self.ProcessOneTransaction(
                     MasterPacket,
@@ -437,6 +478,140 @@ class ModbusProtocol(ModbusBase):
     ):
         return self._PT(Register, Length, skipupdate, ReturnString)
 
+    # -------------ModbusProtocol::GetPipelineDepth------------------------------
+    def GetPipelineDepth(self):
+
+        if self.ModbusTCP:
+            return self.PipelineDepth
+        return 1
+
+    # -------------ModbusProtocol::ProcessTransactions---------------------------
+    # RequestList is a list of (Register, Length, skipupdate) tuples. With Modbus
+    # TCP up to PipelineDepth read requests are sent before waiting for a
+    # response, responses are matched to requests by transaction ID and may
+    # arrive in any order. Returns a list with a (value read ("" on error),
+    # exception) tuple for each request, see ModbusBase::ProcessTransactions
+    def ProcessTransactions(self, RequestList):
+
+        if self.GetPipelineDepth() < 2 or len(RequestList) < 2:
+            return super(ModbusProtocol, self).ProcessTransactions(RequestList)
+
+        ReturnList = [("", False)] * len(RequestList)
+        try:
+            with self.CommAccessLock:
+                if len(self.Slave.Buffer):
+                    self.UnexpectedData += 1
+                    self.LogError("Flushing, unexpected data. Likely timeout.")
+                    self.Flush()
+
+                # transaction ID : (index in RequestList, master packet, sent time)
+                InFlight = collections.OrderedDict()
+                self.InFlightTransactionIDs = InFlight
+                # indexes in RequestList of the requests not yet sent
+                Queue = collections.deque(range(len(RequestList)))
+                while len(Queue) or len(InFlight):
+                    if self.IsStopping:
+                        break
+                    # keep the pipeline full
+                    while len(Queue) and len(InFlight) < self.PipelineDepth:
+                        NextRequest = Queue.popleft()
+                        Register, Length, skipupdate = RequestList[NextRequest]
+                        MasterPacket = self.CreateMasterPacket(
+                            Register,
+                            command=self.MBUS_CMD_READ_REGS,
+                            length=int(Length),
+                        )
+                        if len(MasterPacket):
+                            InFlight[self.CurrentTransactionID] = (
+                                NextRequest,
+                                MasterPacket,
+                                datetime.datetime.now(),
+                            )
+                            self.SendPacketAsMaster(MasterPacket)
+                    if not len(InFlight):
+                        break
+
+                    Pending = len(self.Slave.Buffer)
+                    ExceptionCount = self.ModbusException
+                    RetVal, SlavePacket = self.GetPacketFromSlave()
+                    if len(SlavePacket):
+                        Index, MasterPacket, SentTime = InFlight.pop(
+                            self.RxTransactionID
+                        )
+                        if self.ModbusException != ExceptionCount:
+                            ReturnList[Index] = ("", True)
+                        elif RetVal == True:
+                            self.TotalElapsedPacketeTime += (
+                                self.MillisecondsElapsed(SentTime) / 1000
+                            )
+                            Value = self.UpdateRegistersFromPacket(
+                                MasterPacket,
+                                SlavePacket,
+                                SkipUpdate=RequestList[Index][2],
+                            )
+                            if Value == "Error":
+                                self.LogHexList(MasterPacket, prefix="Master")
+                                self.LogHexList(SlavePacket, prefix="Slave")
+                                self.ComValidationError += 1
+                                Value = ""
+                            ReturnList[Index] = (Value, False)
+                        # errors returned here are logged in GetPacketFromSlave
+                        continue
+                    if RetVal == False:
+                        # the stream is out of sync, give up on outstanding requests
+                        self.LogError(
+                            "Error Receiving slave packet, %d requests outstanding"
+                            % len(InFlight)
+                        )
+                        InFlight.clear()
+                        time.sleep(1)
+                        self.Flush()
+                        continue
+
+                    if len(self.Slave.Buffer) < Pending:
+                        # a response was dropped, check for another one
+                        continue
+
+                    # time out the oldest outstanding request
+                    OldestID = next(iter(InFlight))
+                    Index, MasterPacket, SentTime = InFlight[OldestID]
+                    msElapsed = self.MillisecondsElapsed(SentTime)
+                    if msElapsed > self.ModBusPacketTimoutMS:
+                        self.ComTimoutError += 1
+                        self.LogError(
+                            "Error: timeout receiving slave packet for register %04x Buffer: %d, transaction %x"
+                            % (
+                                self.GetRegisterFromPacket(
+                                    MasterPacket, offset=self.MODBUS_TCP_HEADER_SIZE
+                                ),
+                                len(self.Slave.Buffer),
+                                OldestID,
+                            )
+                        )
+                        del InFlight[OldestID]
+                        if len(self.Slave.Buffer):
+                            # a partial response (i.e. a truncated frame passed
+                            # on by a serial gateway) would misalign every later
+                            # response, flush and send the other requests again
+                            self.LogHexList(self.Slave.Buffer.ToList(), prefix="Buffer")
+                            for Index, MasterPacket, SentTime in reversed(
+                                list(InFlight.values())
+                            ):
+                                Queue.appendleft(Index)
+                            InFlight.clear()
+                            self.Flush()
+                        continue
+
+                    WaitTime = (self.ModBusPacketTimoutMS - msElapsed) / 1000.0
+                    self.Slave.Buffer.WaitForData(
+                        Pending, min(WaitTime, self.MAX_RESPONSE_WAIT_SLICE)
+                    )
+        except Exception as e1:
+            self.LogErrorLine("Error in ProcessTransactions: " + str(e1))
+        finally:
+            self.InFlightTransactionIDs = None
+        return ReturnList
+
     # -------------ModbusProtocol::ProcessFileReadTransaction--------------------
     def ProcessFileReadTransaction(
         self, Register, Length, skipupdate=False, file_num=1, ReturnString=False
@@ -472,7 +647,7 @@ class ModbusProtocol(ModbusBase):
         MasterPacket = []
 
         try:
-            with self.CommAccessLock:
+            with self.CommAccessLock.Priority(self.BUS_PRIORITY_CONTROL):
                 MasterPacket = self.CreateMasterPacket(
                     Register,
                     length=int(Length),
@@ -484,6 +659,7 @@ class ModbusProtocol(ModbusBase):
                 if len(MasterPacket) == 0:
                     return ""
 
+                self.WriteTransactionCount += 1
                 # skipupdate=True to skip writing results to cached reg values
                 return self.ProcessOneTransaction(
                     MasterPacket,
@@ -510,6 +686,8 @@ class ModbusProtocol(ModbusBase):
             else:
                 PacketOffset = 0
 
+            MinResponseLength = self.MIN_PACKET_ERR_LENGTH + PacketOffset
+
             with self.CommAccessLock:  # this lock should allow calls from multiple threads
 
                 if len(self.Slave.Buffer):
@@ -520,15 +698,11 @@ class ModbusProtocol(ModbusBase):
 
                 SentTime = datetime.datetime.now()
                 while True:
-                    # be kind to other processes, we know we are going to have to wait for the packet to arrive
-                    # so let's sleep for a bit before we start polling
-                    if self.SlowCPUOptimization:
-                        time.sleep(0.03)
-                    else:
-                        time.sleep(0.01)
-
                     if self.IsStopping:
                         return ""
+                    # number of bytes seen before we parse, if more arrive after this
+                    # the wait below returns right away
+                    Pending = len(self.Slave.Buffer)
                     RetVal, SlavePacket = self.GetPacketFromSlave(
                         min_response_override=min_response_override
                     )
@@ -572,10 +746,20 @@ class ModbusProtocol(ModbusBase):
                             )
                         )
                         if len(self.Slave.Buffer):
-                            self.LogHexList(self.Slave.Buffer, prefix="Buffer")
+                            self.LogHexList(self.Slave.Buffer.ToList(), prefix="Buffer")
                         self.Flush()
                         return ""
 
+                    # wait for the read thread to signal more data has arrived (or
+                    # the remaining timeout). On slower CPUs don't wake up until
+                    # there is at least enough data for the smallest response
+                    if self.SlowCPUOptimization:
+                        Pending = max(Pending, MinResponseLength - 1)
+                    WaitTime = (self.ModBusPacketTimoutMS - msElapsed) / 1000.0
+                    self.Slave.Buffer.WaitForData(
+                        Pending, min(WaitTime, self.MAX_RESPONSE_WAIT_SLICE)
+                    )
+
                 # update our cached register dict
                 ReturnRegValue = self.UpdateRegistersFromPacket(
                     MasterPacket,
@@ -1126,6 +1310,7 @@ class ModbusProtocol(ModbusBase):
                 SerialStats.append({"Serial Data Rate": "%d" % (self.Slave.BaudRate)})
             else:
                 SerialStats.append({"Modbus Transport": "TCP"})
+            SerialStats.extend(self.GetBusWaitStats())
         except Exception as e1:
             self.LogErrorLine("Error in GetCommStats: " + str(e1))
         return SerialStats
@@ -1138,6 +1323,7 @@ class ModbusProtocol(ModbusBase):
             self.TxPacketCount = 0
             self.TotalElapsedPacketeTime = 0
             self.ModbusStartTime = datetime.datetime.now()  # used for com metrics
+            self.CommAccessLock.ResetWaitStats()
             self.Slave.ResetSerialStats()
         except Exception as e1:
             self.LogErrorLine("Error in ResetCommStats: " + str(e1))
@@ -1151,3 +1337,5 @@ class ModbusProtocol(ModbusBase):
     def Close(self):
         self.IsStopping = True
         self.Slave.Close()
+        if self.Capture != None:
+            self.Capture.Close()
@@ -7,17 +7,39 @@
 #    DATE: 25-Apr-2017
 # MODIFICATIONS:
 # -------------------------------------------------------------------------------
-import collections
-import json
 import threading
 import time
 
-from genmonlib.myclient import ClientInterface
+from genmonlib.myclient import ClientInterface, ClientSubscription
 from genmonlib.mycommon import MyCommon
 from genmonlib.mylog import SetupLogger
+from genmonlib.mysocketprotocol import GetJSONPath
 from genmonlib.mythread import MyThread
 from genmonlib.program_defaults import ProgramDefaults
 
+# subscription topics (command / JSON path) for the values used to track the
+# generator state, so only changes to these values are pushed
+BASE_TOPIC = "getbase"
+OUTAGE_STATUS_TOPIC = "outage_json/Outage/Status"
+OUTAGE_TOPIC = "outage_json/Outage/System In Outage"
+UPDATE_TOPIC = "monitor_json/Monitor/Generator Monitor Stats/Update Available"
+HEALTH_TOPIC = "monitor_json/Monitor/Generator Monitor Stats/Monitor Health"
+THROTTLING_TOPIC = "monitor_json/Monitor/Platform Stats/Pi CPU Frequency Throttling"
+FREQUENCY_CAP_TOPIC = "monitor_json/Monitor/Platform Stats/Pi ARM Frequency Cap"
+UNDERVOLTAGE_TOPIC = "monitor_json/Monitor/Platform Stats/Pi Undervoltage"
+FUEL_STATE_TOPIC = "maint_json/Maintenance/Fuel Level State"
+NOTIFY_TOPICS = [
+    BASE_TOPIC,
+    OUTAGE_STATUS_TOPIC,
+    OUTAGE_TOPIC,
+    UPDATE_TOPIC,
+    HEALTH_TOPIC,
+    THROTTLING_TOPIC,
+    FREQUENCY_CAP_TOPIC,
+    UNDERVOLTAGE_TOPIC,
+    FUEL_STATE_TOPIC,
+]
+
 
 # ----------  GenNotify::init--- ------------------------------------------------
 class GenNotify(MyCommon):
@@ -127,6 +149,10 @@ class GenNotify(MyCommon):
             self.Generator = ClientInterface(
                 host=host, port=port, log=log, loglocation=loglocation
             )
+            # genmon pushes changes on this connection, see MainPollingThread
+            self.Subscription = ClientSubscription(
+                NOTIFY_TOPICS, host=host, port=port, log=log, loglocation=loglocation
+            )
 
             self.Threads["PollingThread"] = MyThread(
                 self.MainPollingThread, Name="PollingThread", start=start
@@ -143,53 +169,74 @@ class GenNotify(MyCommon):
             self.Started = True
 
     # ---------- GenNotify::MainPollingThread-----------------------------------
+    # genmon pushes changes to the subscription, if genmon does not support
+    # subscriptions (or the connection fails) the state is polled
     def MainPollingThread(self):
 
+        State = {}
         while True:
             try:
-
-                OutageState = self.GetOutageState()
-                self.GetMonitorState()
-                self.GetMaintState()
-                data = self.SendCommand("generator: getbase")
-
-                if self.LastEvent == data:
+                Messages = self.Subscription.Receive(3)
+                if Messages == None:
+                    self.ProcessState(self.PollState())
                     time.sleep(3)
                     continue
-                if self.LastEvent != None:
-                    self.console.info(
-                        "Last : <" + self.LastEvent + ">, New : <" + data + ">"
-                    )
-                self.CallEventHandler(False)  # end last event
-
-                self.LastEvent = data
-
-                self.CallEventHandler(True)  # begin new event
-
-                time.sleep(3)
+                for Topic, Data in Messages:
+                    State[Topic] = Data
+                if len(Messages) and all(Topic in State for Topic in NOTIFY_TOPICS):
+                    self.ProcessState(State)
             except Exception as e1:
                 self.LogErrorLine("Error in mynotify:MainPollingThread: " + str(e1))
                 time.sleep(3)
 
+    # ---------- GenNotify::PollState-------------------------------------------
+    # returns the values for NOTIFY_TOPICS read with one batch command
+    def PollState(self):
+
+        Commands = []
+        for Topic in NOTIFY_TOPICS:
+            Command = Topic.split("/")[0]
+            if Command not in Commands:
+                Commands.append(Command)
+        Responses = self.SendBatchCommand(Commands)
+        State = {}
+        for Topic in NOTIFY_TOPICS:
+            Items = Topic.split("/")
+            State[Topic] = GetJSONPath(Responses.get(Items[0], None), Items[1:])
+        return State
+
+    # ---------- GenNotify::ProcessState----------------------------------------
+    # State is a dict of topic : value for NOTIFY_TOPICS
+    def ProcessState(self, State):
+
+        OutageState = self.GetOutageState(State)
+        self.GetMonitorState(State)
+        self.GetMaintState(State)
+        data = State.get(BASE_TOPIC, None)
+        if data == None:
+            data = ""
+
+        if self.LastEvent == data:
+            return
+        if self.LastEvent != None:
+            self.console.info("Last : <" + self.LastEvent + ">, New : <" + data + ">")
+        self.CallEventHandler(False)  # end last event
+
+        self.LastEvent = data
+
+        self.CallEventHandler(True)  # begin new event
+
     # ----------  GenNotify::GetOutageState -------------------------------------
-    def GetOutageState(self):
+    def GetOutageState(self, State):
         OutageState = None
-        outagedata = self.SendCommand("generator: outage_json")
         try:
-            OutageDict = collections.OrderedDict()
-            OutageDict = json.loads(outagedata)
-            OutageList = OutageDict["Outage"]
-            for Items in OutageList:
-                for key, value in Items.items():
-                    if key == "Status" and value == "Not Supported":
-                        return None
-                    if key == "System In Outage":
-                        if value.lower() == "yes":
-                            OutageState = True
-                        else:
-                            OutageState = False
+            if State.get(OUTAGE_STATUS_TOPIC, None) == "Not Supported":
+                # The system does no support outage tracking (i.e. H-100)
+                return None
+            Value = State.get(OUTAGE_TOPIC, None)
+            if Value != None:
+                OutageState = Value.lower() == "yes"
         except Exception as e1:
-            # The system does no support outage tracking (i.e. H-100)
             self.LogErrorLine("Unable to get outage state: " + str(e1))
             OutageState = None
 
@@ -201,89 +248,58 @@ class GenNotify(MyCommon):
         return OutageState
 
     # ----------  GenNotify::GetMonitorState ------------------------------------
-    def GetMonitorState(self):
+    def GetMonitorState(self, State):
         UpdateAvailable = None
 
         try:
-            monitordata = self.SendCommand("generator: monitor_json")
-            GenDict = collections.OrderedDict()
-            GenDict = json.loads(monitordata)
-            GenList = GenDict["Monitor"][0]["Generator Monitor Stats"]
-            for Items in GenList:
-                for key, value in Items.items():
-                    if key == "Update Available":
-                        if value.lower() == "yes":
-                            UpdateAvailable = True
-                        else:
-                            UpdateAvailable = False
-                        if self.notify_sw_update:
-                            self.ProcessEventData(
-                                "SOFTWAREUPDATE",
-                                UpdateAvailable,
-                                self.LastSoftwareUpdateStatus,
-                            )
-                            self.LastSoftwareUpdateStatus = UpdateAvailable
-                    if key == "Monitor Health":
-                        if self.notify_info:
-                            self.ProcessEventData(
-                                "SYSTEMHEALTH", value, self.LastSystemHealth
-                            )
-                            self.LastSystemHealth = value
-            if self.notify_pi_state:
-                GenList = GenDict["Monitor"][2]["Platform Stats"]
-                PiStats = ""
-                PiPresent = False
-                for Items in GenList:
-                    for key, value in Items.items():
-                        if key == "Pi CPU Frequency Throttling":
-                            PiPresent = True
-                            if value.lower() != "ok":
-                                if len(PiStats):
-                                    PiStats += ", "
-                                PiStats += "Pi CPU Frequency Throttling: " + value
-                        if key == "Pi ARM Frequency Cap" and value.lower() != "ok":
-                            if len(PiStats):
-                                PiStats += ", "
-                            PiStats += " Pi ARM Frequency Cap: " + value
-                        if key == "Pi Undervoltage" and value.lower() != "ok":
-                            if len(PiStats):
-                                PiStats += ", "
-                            PiStats += " Pi Undervoltage:" + value
-                if PiStats == "":
-                    PiStats = "OK"
-                if PiPresent:
-                    self.ProcessEventData("PISTATE", PiStats, self.LastPiState)
-                    self.LastPiState = PiStats
+            Value = State.get(UPDATE_TOPIC, None)
+            if Value != None:
+                UpdateAvailable = Value.lower() == "yes"
+                if self.notify_sw_update:
+                    self.ProcessEventData(
+                        "SOFTWAREUPDATE",
+                        UpdateAvailable,
+                        self.LastSoftwareUpdateStatus,
+                    )
+                    self.LastSoftwareUpdateStatus = UpdateAvailable
+            Value = State.get(HEALTH_TOPIC, None)
+            if Value != None and self.notify_info:
+                self.ProcessEventData("SYSTEMHEALTH", Value, self.LastSystemHealth)
+                self.LastSystemHealth = Value
+            # the Pi stats are only present on a Raspberry Pi
+            if self.notify_pi_state and State.get(THROTTLING_TOPIC, None) != None:
+                PiStats = []
+                for Topic, Format in [
+                    (THROTTLING_TOPIC, "Pi CPU Frequency Throttling: "),
+                    (FREQUENCY_CAP_TOPIC, " Pi ARM Frequency Cap: "),
+                    (UNDERVOLTAGE_TOPIC, " Pi Undervoltage:"),
+                ]:
+                    Value = State.get(Topic, None)
+                    if Value != None and Value.lower() != "ok":
+                        PiStats.append(Format + Value)
+                PiStats = ", ".join(PiStats) if len(PiStats) else "OK"
+                self.ProcessEventData("PISTATE", PiStats, self.LastPiState)
+                self.LastPiState = PiStats
         except Exception as e1:
-            # The system does no support outage tracking (i.e. H-100)
             self.LogErrorLine("Unable to get moniotr state: " + str(e1))
             UpdateAvailable = None
         return UpdateAvailable
 
     # ----------  GenNotify::GetMaintState --------------------------------------
-    def GetMaintState(self):
+    def GetMaintState(self, State):
         FuelOK = None
 
         try:
-            maintdata = self.SendCommand("generator: maint_json")
-            GenDict = collections.OrderedDict()
-            GenDict = json.loads(maintdata)
-            GenList = GenDict["Maintenance"]
-            for Items in GenList:
-                for key, value in Items.items():
-                    if key == "Fuel Level State":
-                        if value.lower() == "ok":
-                            FuelOK = True
-                        else:
-                            FuelOK = False
-                        if self.notify_warning:
-                            self.ProcessEventData(
-                                "FUELWARNING", FuelOK, self.LastFuelWarningStatus
-                            )
-                            self.LastFuelWarningStatus = FuelOK
+            Value = State.get(FUEL_STATE_TOPIC, None)
+            if Value != None:
+                FuelOK = Value.lower() == "ok"
+                if self.notify_warning:
+                    self.ProcessEventData(
+                        "FUELWARNING", FuelOK, self.LastFuelWarningStatus
+                    )
+                    self.LastFuelWarningStatus = FuelOK
 
         except Exception as e1:
-            # The system does no support outage tracking (i.e. H-100)
             self.LogErrorLine("Unable to get maint state: " + str(e1))
             FuelOK = None
         return FuelOK
@@ -352,10 +368,28 @@ class GenNotify(MyCommon):
 
         return data
 
+    # ----------  GenNotify::SendBatchCommand -----------------------------------
+    # returns a dict of command name : response, see
+    # ClientInterface::ProcessBatchCommand
+    def SendBatchCommand(self, CommandList):
+
+        try:
+            with self.AccessLock:
+                return self.Generator.ProcessBatchCommand(CommandList)
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error calling ProcessBatchCommand: "
+                + str(CommandList)
+                + ": "
+                + str(e1)
+            )
+            return {}
+
     # ----------  GenNotify::Close ----------------------------------------------
     def Close(self):
         try:
             self.KillThread("PollingThread")
+            self.Subscription.Close()
             self.Generator.Close()
         except Exception as e1:
             pass
@@ -0,0 +1,549 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mypowerlog.py
+# PURPOSE: binary time indexed power (kW) log
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import array
+import bisect
+import datetime
+import os
+import struct
+import sys
+import threading
+import time
+
+from genmonlib.mysupport import MySupport
+
+# power log file layout (all values little endian)
+#   header:  magic (4 bytes) "GMPL", version (uint8), reserved (3 bytes)
+#   records: time (uint32, seconds since epoch), power (float32, kW)
+# records are in time order, this is enforced when records are appended
+POWERLOG_MAGIC = b"GMPL"
+POWERLOG_VERSION = 1
+POWERLOG_HEADER = struct.Struct("<4sB3x")
+POWERLOG_RECORD = struct.Struct("<If")
+
+# the in memory index holds the time of every POWERLOG_INDEX_INTERVAL record
+POWERLOG_INDEX_INTERVAL = 256
+# records read at a time when the whole log is scanned, a multiple of
+# POWERLOG_INDEX_INTERVAL
+POWERLOG_READ_RECORDS = POWERLOG_INDEX_INTERVAL * 256
+
+POWERLOG_BUCKET_SECONDS = 24 * 60 * 60  # aggregate bucket size, one (UTC) day
+
+# bucket sizes of the reduced resolution levels, 15 minutes to 10.7 days. Each
+# size is a multiple of the one before it so a level can be built from the
+# level below.
+POWERLOG_LEVEL_SECONDS = [15 * 60 * (4**Level) for Level in range(6)]
+
+
+# ------------ ReducePowerSamples -----------------------------------------------
+# returns (times, values) lists, oldest first, of at most MaxSize samples.
+# The time range is divided into equal buckets and the minimum and maximum
+# samples of each bucket are kept (in time order), along with the first and
+# last samples, so peaks and drops to zero are not lost. The result only
+# depends on the input.
+def ReducePowerSamples(Times, Values, MaxSize):
+
+    if len(Times) <= MaxSize:
+        return list(Times), list(Values)
+
+    Buckets = max((MaxSize - 2) // 2, 1)
+    First = Times[0]
+    Span = Times[-1] - First + 1
+    ReturnTimes = [Times[0]]
+    ReturnValues = [Values[0]]
+    Bucket = None
+    MinIndex = MaxIndex = 0
+
+    for Index in range(1, len(Times) - 1):
+        NewBucket = ((Times[Index] - First) * Buckets) // Span
+        if NewBucket != Bucket:
+            if Bucket != None:
+                for Keep in sorted(set([MinIndex, MaxIndex])):
+                    ReturnTimes.append(Times[Keep])
+                    ReturnValues.append(Values[Keep])
+            Bucket = NewBucket
+            MinIndex = MaxIndex = Index
+        elif Values[Index] < Values[MinIndex]:
+            MinIndex = Index
+        elif Values[Index] > Values[MaxIndex]:
+            MaxIndex = Index
+    if Bucket != None:
+        for Keep in sorted(set([MinIndex, MaxIndex])):
+            ReturnTimes.append(Times[Keep])
+            ReturnValues.append(Values[Keep])
+
+    ReturnTimes.append(Times[-1])
+    ReturnValues.append(Values[-1])
+    return ReturnTimes, ReturnValues
+
+
+# ------------ MyPowerLogLevel class --------------------------------------------
+class MyPowerLogLevel(object):
+    # One reduced resolution copy of the power log, the minimum and maximum
+    # samples of each bucket of Width seconds, oldest first.
+
+    # ---------- MyPowerLogLevel::__init__--------------------------------------
+    def __init__(self, width):
+        self.Width = width
+        self.Times = array.array("I")
+        self.Values = array.array("f")
+        self.Bucket = None  # current (last) bucket
+        self.Start = 0  # position of the first sample of the current bucket
+        self.Min = None  # (time, value) minimum of the current bucket
+        self.Max = None  # (time, value) maximum of the current bucket
+
+    # ---------- MyPowerLogLevel::Add-------------------------------------------
+    # samples must be added in time order
+    def Add(self, TimeStamp, Value):
+
+        Bucket = TimeStamp // self.Width
+        if Bucket != self.Bucket:
+            self.Bucket = Bucket
+            self.Start = len(self.Times)
+            self.Min = self.Max = (TimeStamp, Value)
+        elif Value < self.Min[1]:
+            self.Min = (TimeStamp, Value)
+        elif Value > self.Max[1]:
+            self.Max = (TimeStamp, Value)
+        else:
+            return
+
+        # replace the samples of the current bucket
+        del self.Times[self.Start :]
+        del self.Values[self.Start :]
+        if self.Min is self.Max:
+            Samples = [self.Min]
+        elif self.Min[0] <= self.Max[0]:
+            Samples = [self.Min, self.Max]
+        else:
+            Samples = [self.Max, self.Min]
+        for Sample in Samples:
+            self.Times.append(Sample[0])
+            self.Values.append(Sample[1])
+
+    # ---------- MyPowerLogLevel::AddLevel--------------------------------------
+    # builds this level from a finer level
+    def AddLevel(self, Level):
+        for TimeStamp, Value in zip(Level.Times, Level.Values):
+            self.Add(TimeStamp, Value)
+
+    # ---------- MyPowerLogLevel::GetFirst--------------------------------------
+    # returns the position of the first sample with a time >= StartTime
+    def GetFirst(self, StartTime):
+        if StartTime == None:
+            return 0
+        return bisect.bisect_left(self.Times, StartTime)
+
+
+# ------------ MyPowerLog class -------------------------------------------------
+class MyPowerLog(MySupport):
+    # Append only power log. Queries find the first record of a time range with
+    # a binary search of the sparse index and then of one index block, and read
+    # the range from the file in one contiguous read. Times are returned as
+    # seconds since the epoch and power as float kW, both oldest first.
+    #
+    # Run time and power totals are kept per day as records are appended, so
+    # GetAveragePower for a trailing window sums the buckets of whole days and
+    # only reads the records of the first (partial) day.
+    #
+    # Reduced resolution levels (see MyPowerLogLevel) are also kept as records
+    # are appended, GetReducedEntries returns a chart of a time range from the
+    # finest level that is close to the requested size.
+    #
+    # filename is the configured power log name. The binary log is stored next
+    # to it with a .bin extension. If the binary log does not exist and a text
+    # log (the format used by earlier versions) does, the text log is imported
+    # once and renamed with a .migrated extension.
+    #
+    # If writer (a MyLogWriter object) is given records are appended through
+    # it and reads include records it has not written yet.
+
+    LogName = "power log"  # used in log messages
+
+    # ---------- MyPowerLog::__init__-------------------------------------------
+    def __init__(self, filename, log=None, writer=None):
+        super(MyPowerLog, self).__init__()
+        self.log = log
+        self.Writer = writer
+        self.Lock = threading.RLock()
+        self.TextFileName = filename
+        self.FileName = os.path.splitext(filename)[0] + ".bin"
+        self.Count = 0  # number of records in the file
+        self.LastTime = 0  # time of the last record
+        self.LastValue = 0.0  # power of the last record
+        self.Index = []  # time of every POWERLOG_INDEX_INTERVAL record
+        # day number : [run time (seconds), sum of interval power, intervals]
+        self.Buckets = {}
+        self.Levels = []  # MyPowerLogLevel objects, finest first
+
+        with self.Lock:
+            if not os.path.isfile(self.FileName) and self.FileName != self.TextFileName:
+                if os.path.isfile(self.TextFileName):
+                    self.MigrateTextLog()
+            self.OpenLog()
+
+    # ---------- MyPowerLog::OpenLog--------------------------------------------
+    def OpenLog(self):
+
+        self.ResetState()
+        try:
+            if self.Writer != None:
+                self.Writer.Flush(self.FileName)
+            if not os.path.isfile(self.FileName):
+                self.WriteLogFile(self.FileName)
+                return
+            with open(self.FileName, "r+b") as LogFile:
+                Header = LogFile.read(POWERLOG_HEADER.size)
+                if len(Header) != POWERLOG_HEADER.size:
+                    raise ValueError("truncated header")
+                Magic, Version = POWERLOG_HEADER.unpack(Header)
+                if Magic != POWERLOG_MAGIC or Version != POWERLOG_VERSION:
+                    raise ValueError("invalid header")
+                LogFile.seek(0, os.SEEK_END)
+                DataSize = LogFile.tell() - POWERLOG_HEADER.size
+                if DataSize % POWERLOG_RECORD.size:
+                    # partial record from an interrupted write
+                    DataSize -= DataSize % POWERLOG_RECORD.size
+                    LogFile.truncate(POWERLOG_HEADER.size + DataSize)
+                Records = DataSize // POWERLOG_RECORD.size
+
+            # build the index and the aggregates in one pass over the file
+            for Data in self.ReadChunks(0, Records):
+                self.LoadRecords(Data)
+            self.BuildLevels()
+        except Exception as e1:
+            self.LogErrorLine(
+                "Error in OpenLog, resetting "
+                + self.LogName
+                + ": "
+                + self.FileName
+                + ": "
+                + str(e1)
+            )
+            self.WriteLogFile(self.FileName)
+            self.ResetState()
+
+    # ---------- MyPowerLog::LoadRecords----------------------------------------
+    # adds raw record data read from the file (records following the ones
+    # already loaded) to the index, the aggregates and the first level
+    def LoadRecords(self, Data):
+
+        Times, Values = self.Unpack(Data)
+        self.Index.extend(
+            Times[(-self.Count) % POWERLOG_INDEX_INTERVAL :: POWERLOG_INDEX_INTERVAL]
+        )
+        for TimeStamp, Value in zip(Times, Values):
+            if self.Count:
+                self.AddInterval(self.LastTime, self.LastValue, TimeStamp, Value)
+            self.Levels[0].Add(TimeStamp, Value)
+            self.LastTime = TimeStamp
+            self.LastValue = Value
+            self.Count += 1
+
+    # ---------- MyPowerLog::BuildLevels----------------------------------------
+    # builds the levels after the first one once all records are loaded
+    def BuildLevels(self):
+        for Index in range(1, len(self.Levels)):
+            self.Levels[Index].AddLevel(self.Levels[Index - 1])
+
+    # ---------- MyPowerLog::ResetState-----------------------------------------
+    def ResetState(self):
+        self.Count = 0
+        self.LastTime = 0
+        self.LastValue = 0.0
+        self.Index = []
+        self.Buckets = {}
+        self.Levels = [MyPowerLogLevel(Width) for Width in POWERLOG_LEVEL_SECONDS]
+
+    # ---------- MyPowerLog::GetOffset------------------------------------------
+    def GetOffset(self, Record):
+        return POWERLOG_HEADER.size + Record * POWERLOG_RECORD.size
+
+    # ---------- MyPowerLog::WriteLogFile---------------------------------------
+    # writes a complete log file, the header and the raw record data in
+    # Chunks, to a temp file and renames it over FileName. FileName is not
+    # changed if the write fails.
+    def WriteLogFile(self, FileName, Chunks=()):
+
+        TempName = FileName + ".tmp"
+        try:
+            with open(TempName, "wb") as LogFile:
+                LogFile.write(POWERLOG_HEADER.pack(POWERLOG_MAGIC, POWERLOG_VERSION))
+                for Data in Chunks:
+                    LogFile.write(Data)
+                LogFile.flush()
+                os.fsync(LogFile.fileno())
+            if self.Writer == None:
+                os.rename(TempName, FileName)
+            else:
+                # records waiting in the writer were read into the new file
+                # or are being cleared
+                with self.Writer.Lock:
+                    os.rename(TempName, FileName)
+                    self.Writer.Discard(FileName)
+        except Exception:
+            if os.path.isfile(TempName):
+                os.remove(TempName)
+            raise
+
+    # ---------- MyPowerLog::MigrateTextLog-------------------------------------
+    def MigrateTextLog(self):
+
+        try:
+            self.LogError(
+                "Converting " + self.LogName + " to binary format: " + self.TextFileName
+            )
+            Records = []
+            with open(self.TextFileName, "r") as LogFile:
+                for line in LogFile:
+                    line = self.removeNonPrintable(line.strip())
+                    if not len(line) or line[0] == "#":
+                        continue
+                    Items = line.split(",")
+                    if len(Items) != 2:
+                        continue
+                    try:
+                        # remove any kW labels that may be there
+                        Value = float(self.removeAlpha(Items[1]))
+                        TimeStamp = int(time.mktime(time.strptime(Items[0], "%x %X")))
+                    except Exception:
+                        continue
+                    Records.append((TimeStamp, Value))
+
+            # the text log was not required to be in time order
+            Records.sort(key=lambda Record: Record[0])
+            Data = b"".join(
+                POWERLOG_RECORD.pack(TimeStamp, Value) for TimeStamp, Value in Records
+            )
+            self.WriteLogFile(self.FileName, [Data])
+            os.rename(self.TextFileName, self.TextFileName + ".migrated")
+            self.LogError("Converted %d %s entries" % (len(Records), self.LogName))
+        except Exception as e1:
+            self.LogErrorLine("Error in MigrateTextLog: " + str(e1))
+
+    # ---------- MyPowerLog::Append---------------------------------------------
+    # TimeStamp is seconds since the epoch, Value is kW
+    def Append(self, TimeStamp, Value):
+
+        with self.Lock:
+            TimeStamp = int(TimeStamp)
+            if TimeStamp < self.LastTime:
+                # the clock moved backwards, keep the log in time order
+                TimeStamp = self.LastTime
+            Record = POWERLOG_RECORD.pack(TimeStamp, float(Value))
+            if self.Writer != None:
+                self.Writer.Write(self.FileName, Record)
+            else:
+                with open(self.FileName, "ab") as LogFile:
+                    LogFile.write(Record)
+            # use the value as stored so the totals match a reload of the file
+            Value = POWERLOG_RECORD.unpack(Record)[1]
+            if self.Count % POWERLOG_INDEX_INTERVAL == 0:
+                self.Index.append(TimeStamp)
+            if self.Count:
+                self.AddInterval(self.LastTime, self.LastValue, TimeStamp, Value)
+            for Level in self.Levels:
+                Level.Add(TimeStamp, Value)
+            self.Count += 1
+            self.LastTime = TimeStamp
+            self.LastValue = Value
+
+    # ---------- MyPowerLog::AddInterval----------------------------------------
+    # adds the interval between two consecutive records to the bucket of the
+    # first one. Each record is the power until the next record, intervals
+    # that start with zero power are not run time.
+    def AddInterval(self, Time, Value, NextTime, NextValue):
+
+        if Value == 0:
+            return
+        Bucket = self.Buckets.get(Time // POWERLOG_BUCKET_SECONDS, None)
+        if Bucket == None:
+            Bucket = self.Buckets[Time // POWERLOG_BUCKET_SECONDS] = [0, 0.0, 0]
+        Bucket[0] += NextTime - Time
+        Bucket[1] += (Value + NextValue) / 2
+        Bucket[2] += 1
+
+    # ---------- MyPowerLog::GetAveragePower------------------------------------
+    # returns (average power (kW), run time (seconds)) for the intervals that
+    # start at or after StartTime (None is the whole log). The average is the
+    # mean of the interval averages.
+    def GetAveragePower(self, StartTime=None):
+
+        with self.Lock:
+            Seconds = 0
+            PowerSum = 0.0
+            Intervals = 0
+            if StartTime == None:
+                FirstDay = None
+            else:
+                StartTime = int(StartTime)
+                FirstDay = StartTime // POWERLOG_BUCKET_SECONDS
+                # the first day is partly in the window, add its intervals
+                # from the records
+                DayEnd = (FirstDay + 1) * POWERLOG_BUCKET_SECONDS
+                Start = self.FindRecord(StartTime)
+                End = min(self.FindRecord(DayEnd) + 1, self.Count)
+                Times, Values = self.Unpack(self.ReadData(Start, End))
+                for Time, Value, NextTime, NextValue in zip(
+                    Times, Values, Times[1:], Values[1:]
+                ):
+                    if Time >= DayEnd:
+                        break
+                    if Value == 0:
+                        continue
+                    Seconds += NextTime - Time
+                    PowerSum += (Value + NextValue) / 2
+                    Intervals += 1
+
+            for Day, Bucket in self.Buckets.items():
+                if FirstDay == None or Day > FirstDay:
+                    Seconds += Bucket[0]
+                    PowerSum += Bucket[1]
+                    Intervals += Bucket[2]
+
+            if Intervals == 0:
+                return 0, 0
+            return PowerSum / Intervals, float(Seconds)
+
+    # ---------- MyPowerLog::ReadData-------------------------------------------
+    # returns the raw record data for records Start up to (not including) End
+    def ReadData(self, Start, End):
+
+        if End <= Start:
+            return b""
+        if self.Writer != None:
+            return self.Writer.Read(
+                self.FileName,
+                self.GetOffset(Start),
+                (End - Start) * POWERLOG_RECORD.size,
+            )
+        with open(self.FileName, "rb") as LogFile:
+            LogFile.seek(self.GetOffset(Start))
+            return LogFile.read((End - Start) * POWERLOG_RECORD.size)
+
+    # ---------- MyPowerLog::ReadChunks-----------------------------------------
+    # returns raw record data for records Start up to (not including) End, in
+    # chunks of at most POWERLOG_READ_RECORDS records
+    def ReadChunks(self, Start, End):
+        for Chunk in range(Start, End, POWERLOG_READ_RECORDS):
+            yield self.ReadData(Chunk, min(Chunk + POWERLOG_READ_RECORDS, End))
+
+    # ---------- MyPowerLog::Unpack---------------------------------------------
+    # returns (times, values) arrays from raw record data
+    def Unpack(self, Data):
+
+        Times = array.array("I", Data)
+        Values = array.array("f", Data)
+        if sys.byteorder == "big":
+            Times.byteswap()
+            Values.byteswap()
+        return Times[0::2], Values[1::2]
+
+    # ---------- MyPowerLog::FindRecord-----------------------------------------
+    # returns the number of the first record with a time >= TimeStamp, Count
+    # if there is none
+    def FindRecord(self, TimeStamp):
+
+        with self.Lock:
+            Block = bisect.bisect_left(self.Index, TimeStamp)
+            if Block == 0:
+                return 0
+            # the record is in the block before the index entry found
+            Start = (Block - 1) * POWERLOG_INDEX_INTERVAL
+            End = min(Start + POWERLOG_INDEX_INTERVAL + 1, self.Count)
+            Times, Values = self.Unpack(self.ReadData(Start, End))
+            return Start + bisect.bisect_left(Times, TimeStamp)
+
+    # ---------- MyPowerLog::GetEntries-----------------------------------------
+    # returns (times, values) arrays, oldest first, for records with
+    # StartTime <= time < EndTime. None is an open range.
+    def GetEntries(self, StartTime=None, EndTime=None):
+
+        with self.Lock:
+            Start = 0 if StartTime == None else self.FindRecord(StartTime)
+            End = self.Count if EndTime == None else self.FindRecord(EndTime)
+            return self.Unpack(self.ReadData(Start, End))
+
+    # ---------- MyPowerLog::GetReducedEntries----------------------------------
+    # returns (times, values) lists, oldest first, of at most MaxSize samples
+    # for records with time >= StartTime (None is the whole log). The samples
+    # are reduced (see ReducePowerSamples) from the records, if there are no
+    # more than 4 * MaxSize of them, or from the finest level that has no
+    # more than 4 * MaxSize samples in the range.
+    def GetReducedEntries(self, StartTime=None, MaxSize=500):
+
+        with self.Lock:
+            Start = 0 if StartTime == None else self.FindRecord(StartTime)
+            if self.Count - Start <= MaxSize * 4:
+                Times, Values = self.Unpack(self.ReadData(Start, self.Count))
+            else:
+                for Level in self.Levels:
+                    First = Level.GetFirst(StartTime)
+                    if len(Level.Times) - First <= MaxSize * 4:
+                        break
+                # the coarsest level is used if none are small enough
+                Times, Values = Level.Times[First:], Level.Values[First:]
+            return ReducePowerSamples(Times, Values, MaxSize)
+
+    # ---------- MyPowerLog::Prune----------------------------------------------
+    # removes records older than StartTime, returns the number removed. The
+    # kept records are copied to a new file a chunk at a time and the index,
+    # aggregates and levels are rebuilt from the chunks as they are copied.
+    def Prune(self, StartTime):
+
+        with self.Lock:
+            Start = self.FindRecord(StartTime)
+            if Start == 0:
+                return 0
+            End = self.Count
+
+            def CopyRecords():
+                for Data in self.ReadChunks(Start, End):
+                    self.LoadRecords(Data)
+                    yield Data
+
+            try:
+                self.ResetState()
+                self.WriteLogFile(self.FileName, CopyRecords())
+                self.BuildLevels()
+            except Exception:
+                # reload whichever file is in place
+                self.OpenLog()
+                raise
+            return Start
+
+    # ---------- MyPowerLog::Clear----------------------------------------------
+    def Clear(self):
+
+        with self.Lock:
+            self.WriteLogFile(self.FileName)
+            self.ResetState()
+
+    # ---------- MyPowerLog::GetSize--------------------------------------------
+    # returns the file size in bytes
+    def GetSize(self):
+        return self.GetOffset(self.Count)
+
+    # ---------- MyPowerLog::ExportText-----------------------------------------
+    # writes the log as text, oldest first, in the format of the text power
+    # log ("time,kW" with the time in the locale format "%x %X")
+    def ExportText(self, FileName, StartTime=None, EndTime=None):
+
+        Times, Values = self.GetEntries(StartTime, EndTime)
+        with open(FileName, "w") as LogFile:
+            for TimeStamp, Value in zip(Times, Values):
+                LogFile.write(
+                    datetime.datetime.fromtimestamp(TimeStamp).strftime("%x %X")
+                    + ","
+                    + str(round(Value, 3))
+                    + "\n"
+                )
+        return len(Times)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myprioritylock.py
+# PURPOSE: reentrant lock that is granted to waiting threads in priority order
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import threading
+import time
+
+
+# ------------ MyPriorityLock class ---------------------------------------------
+class MyPriorityLock(object):
+    # Drop in replacement for threading.RLock. When the lock is released it is
+    # given to the waiting thread with the lowest priority value, threads with
+    # the same priority are served in the order they started waiting. A thread
+    # that releases the lock and immediately acquires it again goes to the back
+    # of the line if anyone is waiting, so a thread doing many short
+    # transactions is preempted between transactions by more important work.
+    # So lower priority work is not starved, a waiter that has been passed over
+    # max_bypass times is treated as priority aging_floor.
+    #
+    # The priority used by acquire is the value passed in, else the value set
+    # for the calling thread with Scope, else the default priority.
+
+    # ---------- MyPriorityLock::__init__---------------------------------------
+    def __init__(
+        self, default_priority=0, num_priorities=1, max_bypass=8, aging_floor=0
+    ):
+        self.DefaultPriority = default_priority
+        self.MaxBypass = max_bypass
+        self.AgingFloor = aging_floor
+        self.Condition = threading.Condition(threading.Lock())
+        self.Owner = None
+        self.Count = 0
+        self.Waiters = []  # list of [priority, sequence, times passed over]
+        self.Next = None  # waiter selected to get the lock next
+        self.Sequence = 0
+        self.ThreadData = threading.local()
+        # per priority: [number of acquires, total wait (sec), max wait (sec)]
+        self.WaitStats = [[0, 0.0, 0.0] for i in range(num_priorities)]
+
+    # ---------- MyPriorityLock::acquire----------------------------------------
+    def acquire(self, blocking=True, priority=None):
+
+        Me = threading.current_thread()
+        with self.Condition:
+            if self.Owner == Me:
+                self.Count += 1
+                return True
+            if priority == None:
+                priority = self.GetThreadPriority()
+            StartTime = time.time()
+            if self.Owner != None or len(self.Waiters):
+                if not blocking:
+                    return False
+                Entry = [priority, self.Sequence, 0]
+                self.Sequence += 1
+                self.Waiters.append(Entry)
+                while self.Owner != None or not self.Next is Entry:
+                    self.Condition.wait()
+                self.Waiters.remove(Entry)
+                self.Next = None
+            self.Owner = Me
+            self.Count = 1
+            self.UpdateStats(priority, time.time() - StartTime)
+            return True
+
+    # ---------- MyPriorityLock::release----------------------------------------
+    def release(self):
+
+        with self.Condition:
+            if self.Owner != threading.current_thread():
+                raise RuntimeError("cannot release un-acquired lock")
+            self.Count -= 1
+            if self.Count == 0:
+                self.Owner = None
+                if len(self.Waiters):
+                    self.SelectNext()
+                    self.Condition.notify_all()
+
+    # ---------- MyPriorityLock::SelectNext-------------------------------------
+    # called with the condition lock held
+    def SelectNext(self):
+
+        self.Next = min(self.Waiters, key=self.GetWaiterOrder)
+        for Entry in self.Waiters:
+            if not Entry is self.Next:
+                Entry[2] += 1
+
+    # ---------- MyPriorityLock::GetWaiterOrder---------------------------------
+    def GetWaiterOrder(self, Entry):
+
+        Priority, Sequence, Bypassed = Entry
+        if Bypassed >= self.MaxBypass:
+            Priority = min(Priority, self.AgingFloor)
+        return (Priority, Sequence)
+
+    # ---------- MyPriorityLock::__enter__--------------------------------------
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    # ---------- MyPriorityLock::__exit__---------------------------------------
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    # ---------- MyPriorityLock::GetThreadPriority------------------------------
+    def GetThreadPriority(self):
+        return getattr(self.ThreadData, "Priority", self.DefaultPriority)
+
+    # ---------- MyPriorityLock::Priority---------------------------------------
+    # acquire the lock with the given priority, also used as the priority of
+    # any nested acquires by this thread. Use in a with statement.
+    def Priority(self, priority):
+        return _PriorityContext(self, priority, True)
+
+    # ---------- MyPriorityLock::Scope------------------------------------------
+    # set the priority of this thread while in a with statement, does not
+    # acquire the lock
+    def Scope(self, priority):
+        return _PriorityContext(self, priority, False)
+
+    # ---------- MyPriorityLock::UpdateStats------------------------------------
+    # called with the condition lock held
+    def UpdateStats(self, priority, WaitTime):
+        if priority < 0 or priority >= len(self.WaitStats):
+            return
+        Stats = self.WaitStats[priority]
+        Stats[0] += 1
+        Stats[1] += WaitTime
+        Stats[2] = max(Stats[2], WaitTime)
+
+    # ---------- MyPriorityLock::GetWaitStats-----------------------------------
+    # returns a list of (acquire count, average wait, max wait) for each
+    # priority, wait times in milliseconds
+    def GetWaitStats(self):
+        with self.Condition:
+            return [
+                (
+                    Count,
+                    (Total / Count) * 1000.0 if Count else 0.0,
+                    Max * 1000.0,
+                )
+                for Count, Total, Max in self.WaitStats
+            ]
+
+    # ---------- MyPriorityLock::ResetWaitStats---------------------------------
+    def ResetWaitStats(self):
+        with self.Condition:
+            self.WaitStats = [[0, 0.0, 0.0] for Stats in self.WaitStats]
+
+
+# ------------ _PriorityContext class -------------------------------------------
+class _PriorityContext(object):
+    def __init__(self, lock, priority, acquire):
+        self.Lock = lock
+        self.Priority = priority
+        self.Acquire = acquire
+        self.Previous = None
+
+    def __enter__(self):
+        self.Previous = getattr(self.Lock.ThreadData, "Priority", None)
+        self.Lock.ThreadData.Priority = self.Priority
+        if self.Acquire:
+            self.Lock.acquire(priority=self.Priority)
+        return self.Lock
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.Acquire:
+            self.Lock.release()
+        if self.Previous == None:
+            del self.Lock.ThreadData.Priority
+        else:
+            self.Lock.ThreadData.Priority = self.Previous
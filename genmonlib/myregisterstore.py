@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myregisterstore.py
+# PURPOSE: thread safe store for modbus register values
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import collections
+import threading
+
+
+# ------------ MyRegisterStore class --------------------------------------------
+class MyRegisterStore(object):
+    # Register values keyed by integer address. Each value is kept as the hex
+    # string received from the controller and as an int, parsed once when the
+    # value is written, along with the store sequence number of the last
+    # change. Registers may be passed as ints or hex strings.
+    #
+    # The store can be used like the dict of hex strings it replaces
+    # (get, [], in, len, items, keys, values). items, keys and values return
+    # copies, so iterating is safe while the modbus thread is writing. Writes
+    # are made under Lock, use GetInts or Snapshot (or hold Lock) when several
+    # registers must be read together.
+
+    # ---------- MyRegisterStore::__init__--------------------------------------
+    def __init__(self):
+        self.Lock = threading.RLock()
+        # register (int) : (register (hex string), value (hex string), value (int), sequence)
+        self.Entries = collections.OrderedDict()
+        self.Sequence = 0  # incremented each time a value changes
+        self.KeyCache = {}  # register (hex string) : register (int)
+
+    # ---------- MyRegisterStore::GetKey----------------------------------------
+    def GetKey(self, Register):
+
+        if isinstance(Register, int):
+            return Register
+        Key = self.KeyCache.get(Register, None)
+        if Key == None:
+            Key = int(Register, 16)
+            self.KeyCache[Register] = Key
+        return Key
+
+    # ---------- MyRegisterStore::Set-------------------------------------------
+    # returns the previous value (hex string), "" if the register is new
+    def Set(self, Register, Value):
+
+        Key = self.GetKey(Register)
+        with self.Lock:
+            Entry = self.Entries.get(Key, None)
+            if Entry != None and Entry[1] == Value:
+                return Value
+            try:
+                IntValue = int(Value, 16)
+            except ValueError:
+                IntValue = None
+            self.Sequence += 1
+            if Entry == None:
+                if not isinstance(Register, str):
+                    Register = "%04x" % Key
+                self.Entries[Key] = (Register, Value, IntValue, self.Sequence)
+                return ""
+            # entries are replaced, not modified, so a reader always sees a
+            # complete value without taking the lock
+            self.Entries[Key] = (Entry[0], Value, IntValue, self.Sequence)
+            return Entry[1]
+
+    # ---------- MyRegisterStore::Get-------------------------------------------
+    # returns the value as a hex string
+    def Get(self, Register, default=""):
+
+        Entry = self.Entries.get(self.GetKey(Register), None)
+        if Entry == None:
+            return default
+        return Entry[1]
+
+    # ---------- MyRegisterStore::GetInt----------------------------------------
+    # returns the value as an int, default if not present or not valid hex
+    def GetInt(self, Register, default=None):
+
+        Entry = self.Entries.get(self.GetKey(Register), None)
+        if Entry == None or Entry[2] == None:
+            return default
+        return Entry[2]
+
+    # ---------- MyRegisterStore::GetEntry--------------------------------------
+    # returns (hex string, int, sequence) or None if not present
+    def GetEntry(self, Register):
+
+        Entry = self.Entries.get(self.GetKey(Register), None)
+        if Entry == None:
+            return None
+        return Entry[1:]
+
+    # ---------- MyRegisterStore::GetInts---------------------------------------
+    # returns a list of int values (default if missing) read as one update
+    def GetInts(self, RegisterList, default=None):
+
+        Keys = [self.GetKey(Register) for Register in RegisterList]
+        with self.Lock:
+            ReturnList = []
+            for Key in Keys:
+                Entry = self.Entries.get(Key, None)
+                if Entry == None or Entry[2] == None:
+                    ReturnList.append(default)
+                else:
+                    ReturnList.append(Entry[2])
+            return ReturnList
+
+    # ---------- MyRegisterStore::GetSequence-----------------------------------
+    # returns the sequence number of the last change to a register, 0 if the
+    # register is not present
+    def GetSequence(self, Register):
+
+        Entry = self.Entries.get(self.GetKey(Register), None)
+        if Entry == None:
+            return 0
+        return Entry[3]
+
+    # ---------- MyRegisterStore::Snapshot--------------------------------------
+    # returns (sequence, OrderedDict of register (hex string) : value (hex
+    # string)), a consistent copy of the requested registers or all registers
+    def Snapshot(self, RegisterList=None):
+
+        with self.Lock:
+            Values = collections.OrderedDict()
+            if RegisterList == None:
+                for Entry in self.Entries.values():
+                    Values[Entry[0]] = Entry[1]
+            else:
+                for Register in RegisterList:
+                    Entry = self.Entries.get(self.GetKey(Register), None)
+                    if Entry != None:
+                        Values[Entry[0]] = Entry[1]
+            return self.Sequence, Values
+
+    # ---------- MyRegisterStore::dict methods----------------------------------
+    def get(self, Register, default=None):
+        return self.Get(Register, default)
+
+    def __getitem__(self, Register):
+        Entry = self.Entries.get(self.GetKey(Register), None)
+        if Entry == None:
+            raise KeyError(Register)
+        return Entry[1]
+
+    def __setitem__(self, Register, Value):
+        self.Set(Register, Value)
+
+    def __contains__(self, Register):
+        try:
+            return self.GetKey(Register) in self.Entries
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self.Entries)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        with self.Lock:
+            return [(Entry[0], Entry[1]) for Entry in self.Entries.values()]
+
+    def keys(self):
+        with self.Lock:
+            return [Entry[0] for Entry in self.Entries.values()]
+
+    def values(self):
+        with self.Lock:
+            return [Entry[1] for Entry in self.Entries.values()]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: myrxbuffer.py
+# PURPOSE: receive buffer shared by the serial and serial over TCP devices
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import threading
+
+
+# ------------ MyRxBuffer class -------------------------------------------------
+class MyRxBuffer(object):
+    # Preallocated byte buffer. Data is appended in whole chunks as it is
+    # read from the device and consumed from the front by the packet framer.
+    # Unread data is kept contiguous so Peek can return a view without copying,
+    # the storage is reused (unread bytes are moved to the front) when the end
+    # of the buffer is reached and only grows if more data is pending than
+    # will fit.
+
+    # ---------- MyRxBuffer::__init__-------------------------------------------
+    def __init__(self, size=0x1000):
+        self.Data = bytearray(size)
+        self.Head = 0  # offset of first unread byte
+        self.Tail = 0  # offset one past the last unread byte
+        self.Lock = threading.RLock()
+        # signaled by Append when new data arrives
+        self.DataReady = threading.Condition(self.Lock)
+
+    # ---------- MyRxBuffer::__len__--------------------------------------------
+    def __len__(self):
+        return self.Tail - self.Head
+
+    # ---------- MyRxBuffer::__getitem__----------------------------------------
+    # returns the unread byte at index as an int, does not consume it
+    def __getitem__(self, index):
+        with self.Lock:
+            Length = self.Tail - self.Head
+            if index < 0:
+                index += Length
+            if index < 0 or index >= Length:
+                raise IndexError("MyRxBuffer index out of range")
+            return self.Data[self.Head + index]
+
+    # ---------- MyRxBuffer::Append---------------------------------------------
+    # data is any bytes like object (str in python 2, bytes in python 3)
+    def Append(self, data):
+        if not data:
+            return 0
+        Length = len(data)
+        with self.Lock:
+            if self.Tail + Length > len(self.Data):
+                self._MakeRoom(Length)
+            self.Data[self.Tail : self.Tail + Length] = data
+            self.Tail += Length
+            self.DataReady.notify_all()
+        return Length
+
+    # ---------- MyRxBuffer::WaitForData----------------------------------------
+    # wait until more than length bytes are pending or timeout (seconds)
+    # expires. Returns True if more than length bytes are pending.
+    def WaitForData(self, length, timeout):
+        with self.DataReady:
+            if self.Tail - self.Head > length:
+                return True
+            if timeout > 0:
+                self.DataReady.wait(timeout)
+            return self.Tail - self.Head > length
+
+    # ---------- MyRxBuffer::_MakeRoom------------------------------------------
+    # called with the lock held
+    def _MakeRoom(self, Length):
+        Pending = self.Tail - self.Head
+        if self.Head:
+            # move unread data to the front of the storage
+            self.Data[0:Pending] = self.Data[self.Head : self.Tail]
+            self.Head = 0
+            self.Tail = Pending
+        if Pending + Length > len(self.Data):
+            Size = len(self.Data)
+            while Pending + Length > Size:
+                Size *= 2
+            # allocate new storage rather than resize, views returned by Peek
+            # may still reference the old storage
+            NewData = bytearray(Size)
+            NewData[0:Pending] = self.Data[0:Pending]
+            self.Data = NewData
+
+    # ---------- MyRxBuffer::Peek-----------------------------------------------
+    # returns a read only view of unread data, the view is only valid until
+    # the next call that modifies the buffer
+    def Peek(self, offset=0, length=None):
+        with self.Lock:
+            Start = self.Head + offset
+            if length == None:
+                End = self.Tail
+            else:
+                End = min(Start + length, self.Tail)
+            if Start > End:
+                Start = End
+            return memoryview(self.Data)[Start:End]
+
+    # ---------- MyRxBuffer::Consume--------------------------------------------
+    # discard length bytes from the front of the buffer
+    def Consume(self, length):
+        with self.Lock:
+            self.Head = min(self.Head + length, self.Tail)
+            if self.Head == self.Tail:
+                self.Head = self.Tail = 0
+
+    # ---------- MyRxBuffer::PopPacket------------------------------------------
+    # remove length bytes from the front of the buffer and return them as a
+    # list of ints
+    def PopPacket(self, length):
+        with self.Lock:
+            End = min(self.Head + length, self.Tail)
+            Packet = list(self.Data[self.Head : End])
+            self.Consume(length)
+            return Packet
+
+    # ---------- MyRxBuffer::PopByte--------------------------------------------
+    def PopByte(self):
+        with self.Lock:
+            if self.Head == self.Tail:
+                return None
+            Value = self.Data[self.Head]
+            self.Consume(1)
+            return Value
+
+    # ---------- MyRxBuffer::Clear----------------------------------------------
+    def Clear(self):
+        with self.Lock:
+            self.Head = self.Tail = 0
+
+    # ---------- MyRxBuffer::ToList---------------------------------------------
+    def ToList(self):
+        with self.Lock:
+            return list(self.Data[self.Head : self.Tail])
+
+    # ---------- MyRxBuffer::GetString------------------------------------------
+    def GetString(self):
+        with self.Lock:
+            return "".join(chr(e) for e in self.Data[self.Head : self.Tail])
@@ -13,12 +13,12 @@ from __future__ import print_function
 
 import datetime
 import os
-import sys
-import threading
 
 import serial
 
+from genmonlib.mybuscapture import CAPTURE_RX, CAPTURE_TX
 from genmonlib.mylog import SetupLogger
+from genmonlib.myrxbuffer import MyRxBuffer
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
 from genmonlib.program_defaults import ProgramDefaults
@@ -37,6 +37,7 @@ class SerialDevice(MySupport):
         RtsCts=False,
         config=None,
         loglocation=ProgramDefaults.LogPath,
+        capture=None,
     ):
 
         super(SerialDevice, self).__init__()
@@ -44,10 +45,10 @@ class SerialDevice(MySupport):
         self.config = config
         self.DeviceName = name
         self.BaudRate = rate
-        self.Buffer = []
-        self.BufferLock = threading.Lock()
+        self.Buffer = MyRxBuffer()
         self.DiscardedBytes = 0
         self.Restarts = 0
+        self.Capture = capture  # MyBusCapture object used to record bus traffic
         self.SerialStartTime = datetime.datetime.now()  # used for com metrics
         self.loglocation = loglocation
 
@@ -150,16 +151,11 @@ class SerialDevice(MySupport):
             try:
                 self.Flush()
                 while True:
-                    for c in self.Read():
-                        with self.BufferLock:
-                            if sys.version_info[0] < 3:
-                                self.Buffer.append(ord(c))  # PYTHON2
-                            else:
-                                self.Buffer.append(c)  # PYTHON3
-                        # first check for SignalStopped is when we are receiving
-                        if self.IsStopSignaled("SerialReadThread"):
-                            return
-                    # second check for SignalStopped is when we are not receiving
+                    # add the whole chunk read from the device in one locked append
+                    Data = self.Read()
+                    if self.Capture != None:
+                        self.Capture.Record(CAPTURE_RX, Data)
+                    self.Buffer.Append(Data)
                     if self.IsStopSignaled("SerialReadThread"):
                         return
 
@@ -189,10 +185,10 @@ class SerialDevice(MySupport):
     # ------------SerialDevice::DiscardByte--------------------------------------
     def DiscardByte(self):
 
-        if len(self.Buffer):
-            discard = self.Buffer.pop(0)
+        discard = self.Buffer.PopByte()
+        if discard != None:
             self.DiscardedBytes += 1
-            return discard
+        return discard
 
     # ---------- SerialDevice::Close--------------------------------------------
     def Close(self):
@@ -210,8 +206,7 @@ class SerialDevice(MySupport):
         try:
             self.SerialDevice.flushInput()  # flush input buffer, discarding all its contents
             self.SerialDevice.flushOutput()  # flush output buffer, aborting current output
-            with self.BufferLock:  # will block if lock is already held
-                del self.Buffer[:]
+            self.Buffer.Clear()
 
         except Exception as e1:
             self.LogErrorLine("Error in SerialDevice:Flush : " + self.DeviceName + ":" + str(e1))
@@ -219,13 +214,21 @@ class SerialDevice(MySupport):
 
     # ---------- SerialDevice::Read---------------------------------------------
     def Read(self):
-        # self.SerialDevice.inWaiting returns number of bytes ready
-        return (self.SerialDevice.read())  
+        # read everything that is waiting, or block (up to the port timeout)
+        # for at least one byte
+        try:
+            Waiting = self.SerialDevice.inWaiting()
+        except Exception:
+            # the read below raises if the port has failed
+            Waiting = 0
+        return self.SerialDevice.read(max(Waiting, 1))
 
     # ---------- SerialDevice::Write--------------------------------------------
     def Write(self, data):
 
         try:
+            if self.Capture != None:
+                self.Capture.Record(CAPTURE_TX, data)
             return self.SerialDevice.write(data)
         except Exception as e1:
             self.LogErrorLine("Error in SerialDevice:Write : " + self.DeviceName + ":" + str(e1))
@@ -236,11 +239,7 @@ class SerialDevice(MySupport):
     def GetRxBufferAsString(self):
 
         try:
-            if not len(self.Buffer):
-                return ""
-            with self.BufferLock:
-                str1 = "".join(chr(e) for e in self.Buffer)
-            return str1
+            return self.Buffer.GetString()
         except Exception as e1:
             self.LogErrorLine("Error in GetRxBufferAsString: " + str(e1))
             return ""
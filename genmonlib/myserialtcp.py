@@ -16,10 +16,10 @@ from __future__ import (  # For python 3.x compatibility with print function
 import datetime
 import os
 import socket
-import sys
-import threading
 
+from genmonlib.mybuscapture import CAPTURE_RX, CAPTURE_TX
 from genmonlib.mylog import SetupLogger
+from genmonlib.myrxbuffer import MyRxBuffer
 from genmonlib.mysupport import MySupport
 from genmonlib.mythread import MyThread
 from genmonlib.program_defaults import ProgramDefaults
@@ -28,16 +28,21 @@ from genmonlib.program_defaults import ProgramDefaults
 # ------------ SerialTCPDevice class --------------------------------------------
 class SerialTCPDevice(MySupport):
     def __init__(
-        self, log=None, host=ProgramDefaults.LocalHost, port=8899, config=None
+        self,
+        log=None,
+        host=ProgramDefaults.LocalHost,
+        port=8899,
+        config=None,
+        capture=None,
     ):
 
         super(SerialTCPDevice, self).__init__()
         self.DeviceName = "serialTCP"
         self.config = config
-        self.Buffer = []
-        self.BufferLock = threading.Lock()
+        self.Buffer = MyRxBuffer()
         self.DiscardedBytes = 0
         self.Restarts = 0
+        self.Capture = capture  # MyBusCapture object used to record bus traffic
         self.SerialStartTime = datetime.datetime.now()  # used for com metrics
         self.rxdatasize = 2000
         self.SocketTimeout = 1
@@ -120,16 +125,11 @@ class SerialTCPDevice(MySupport):
                             ):  # 10 seconds
                                 return
                             continue
-                    for c in self.Read():
-                        with self.BufferLock:
-                            if sys.version_info[0] < 3:
-                                self.Buffer.append(ord(c))  # PYTHON2
-                            else:
-                                self.Buffer.append(c)  # PYTHON3
-                        # first check for SignalStopped is when we are receiving
-                        if self.IsStopSignaled("SerialTCPReadThread"):
-                            return
-                    # second check for SignalStopped is when we are not receiving
+                    # add the whole chunk read from the device in one locked append
+                    Data = self.Read()
+                    if self.Capture != None:
+                        self.Capture.Record(CAPTURE_RX, Data)
+                    self.Buffer.Append(Data)
                     if self.IsStopSignaled("SerialTCPReadThread"):
                         return
 
@@ -152,10 +152,10 @@ class SerialTCPDevice(MySupport):
     # ------------SerialTCPDevice::DiscardByte-----------------------------------
     def DiscardByte(self):
 
-        if len(self.Buffer):
-            discard = self.Buffer.pop(0)
+        discard = self.Buffer.PopByte()
+        if discard != None:
             self.DiscardedBytes += 1
-            return discard
+        return discard
 
     # ---------- SerialTCPDevice::Close-----------------------------------------
     def Close(self):
@@ -174,8 +174,7 @@ class SerialTCPDevice(MySupport):
     def Flush(self):
         try:
             # Flush socket
-            with self.BufferLock:  # will block if lock is already held
-                del self.Buffer[:]
+            self.Buffer.Clear()
 
         except Exception as e1:
             self.LogErrorLine("Error in SerialTCPDevice:Flush : " + str(e1))
@@ -209,6 +208,8 @@ class SerialTCPDevice(MySupport):
         try:
             if self.Socket == None:
                 return None
+            if self.Capture != None:
+                self.Capture.Record(CAPTURE_TX, data)
             return self.Socket.sendall(data)
         except Exception as e1:
             if self.Socket != None:
@@ -221,11 +222,7 @@ class SerialTCPDevice(MySupport):
     def GetRxBufferAsString(self):
 
         try:
-            if not len(self.Buffer):
-                return ""
-            with self.BufferLock:
-                str1 = "".join(chr(e) for e in self.Buffer)
-            return str1
+            return self.Buffer.GetString()
         except Exception as e1:
             self.LogErrorLine(
                 "Error in SerialTCPDevice:GetRxBufferAsString: " + str(e1)
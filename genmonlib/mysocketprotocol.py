@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------
+#    FILE: mysocketprotocol.py
+# PURPOSE: framing for the genmon command socket
+#
+#  AUTHOR: Jason G Yates
+#    DATE: 17-Oct-2026
+#
+# MODIFICATIONS:
+# -------------------------------------------------------------------------------
+
+import struct
+import zlib
+
+# Protocol 1 (text): the server sends a one line status when a client
+# connects, the client sends a command string and the server sends the
+# response followed by "EndOfMessage".
+#
+# Protocol 2 (framed): after the status line a client sends the text command
+# "generator: set_protocol=2" (or "generator: set_protocol=2,compress") and
+# reads the text response. If the server supports protocol 2 the response is
+# "protocol=2" ("protocol=2,compress" if compression was accepted) and all
+# later commands and responses on the connection are frames. A server that
+# does not support it returns an error and the client keeps using protocol 1.
+#
+# frame layout (network byte order)
+#   header:  magic (2 bytes) "GM", version (uint8), flags (uint8),
+#            request ID (uint32), payload length (uint32)
+#   payload: utf-8 command or response, zlib compressed if the flag is set
+# a response has the request ID of the command it answers
+#
+# Subscriptions: "generator: subscribe=topic1,topic2,..." replaces the topics
+# the connection is subscribed to ("generator: subscribe=" unsubscribes) and
+# returns "OK" or an error. A JSON message {"topic": topic, "data": data} is
+# then pushed for each topic when it changes, the first message for a topic
+# has its current value. Pushed messages are frames with request ID 0 in
+# protocol 2 and end with "EndOfMessage" in protocol 1. The server defines
+# the topics.
+PROTOCOL_TEXT = 1
+PROTOCOL_FRAMED = 2
+END_OF_MESSAGE = "EndOfMessage"
+PROTOCOL_COMMAND = "generator: set_protocol="
+SUBSCRIBE_COMMAND = "generator: subscribe="
+PUSH_REQUEST_ID = 0  # request ID of pushed messages, not used for commands
+
+FRAME_MAGIC = b"GM"
+FRAME_HEADER = struct.Struct("!2sBBII")
+FRAME_FLAG_COMPRESSED = 0x01
+FRAME_MAX_PAYLOAD = 64 * 1024 * 1024
+FRAME_COMPRESS_MIN_SIZE = 4096  # smaller payloads are not compressed
+
+
+# ------------ PackFrame --------------------------------------------------------
+# returns the frame (bytes) for Payload (bytes)
+def PackFrame(Payload, RequestID, Compress=False):
+
+    Flags = 0
+    if Compress and len(Payload) >= FRAME_COMPRESS_MIN_SIZE:
+        Compressed = zlib.compress(Payload, 6)
+        if len(Compressed) < len(Payload):
+            Payload = Compressed
+            Flags |= FRAME_FLAG_COMPRESSED
+    return (
+        FRAME_HEADER.pack(
+            FRAME_MAGIC, PROTOCOL_FRAMED, Flags, RequestID & 0xFFFFFFFF, len(Payload)
+        )
+        + Payload
+    )
+
+
+# ------------ UnpackHeader -----------------------------------------------------
+# returns (flags, request ID, payload length), raises ValueError for an
+# invalid header
+def UnpackHeader(Header):
+
+    Magic, Version, Flags, RequestID, Length = FRAME_HEADER.unpack(bytes(Header))
+    if Magic != FRAME_MAGIC or Version != PROTOCOL_FRAMED:
+        raise ValueError("invalid frame header")
+    if Length > FRAME_MAX_PAYLOAD:
+        raise ValueError("frame too large: %d" % Length)
+    return Flags, RequestID, Length
+
+
+# ------------ DecodePayload ----------------------------------------------------
+# returns the payload of a frame as a string
+def DecodePayload(Flags, Payload):
+
+    if Flags & FRAME_FLAG_COMPRESSED:
+        Payload = zlib.decompress(bytes(Payload))
+    return bytes(Payload).decode("utf-8")
+
+
+# ------------ ParseProtocolCommand ---------------------------------------------
+# returns (version, compress) if Command is a set_protocol command, else None
+def ParseProtocolCommand(Command):
+
+    if not Command.lower().startswith(PROTOCOL_COMMAND):
+        return None
+    Items = Command[len(PROTOCOL_COMMAND) :].strip().lower().split(",")
+    try:
+        Version = int(Items[0].strip())
+    except ValueError:
+        return None
+    Compress = "compress" in [Item.strip() for Item in Items[1:]]
+    return Version, Compress
+
+
+# ------------ ParseSubscribeCommand --------------------------------------------
+# returns the list of topics if Command is a subscribe command, else None
+def ParseSubscribeCommand(Command):
+
+    if isinstance(Command, bytes):
+        Command = Command.decode("utf-8", "ignore")
+    if not Command.lower().startswith(SUBSCRIBE_COMMAND):
+        return None
+    Topics = []
+    for Topic in Command[len(SUBSCRIBE_COMMAND) :].split(","):
+        Topic = Topic.strip()
+        if len(Topic) and Topic not in Topics:
+            Topics.append(Topic)
+    return Topics
+
+
+# ------------ GetJSONPath ------------------------------------------------------
+# returns the value at Path (list of keys) in decoded JSON output, None if
+# not found. Lists of single entry dicts (as used in genmon JSON output) are
+# searched for the key.
+def GetJSONPath(Node, Path):
+
+    for Key in Path:
+        if isinstance(Node, dict):
+            Node = Node.get(Key, None)
+        elif isinstance(Node, list):
+            for Item in Node:
+                if isinstance(Item, dict) and Key in Item:
+                    Node = Item[Key]
+                    break
+            else:
+                return None
+        else:
+            return None
+    return Node
+
+
+# ------------ ReceiveFrame -----------------------------------------------------
+# reads one frame from a blocking socket, the payload is read into a buffer
+# allocated once for the frame length. Returns (request ID, payload string),
+# raises EOFError if the connection is closed.
+def ReceiveFrame(Socket):
+
+    Flags, RequestID, Length = UnpackHeader(ReceiveExactly(Socket, FRAME_HEADER.size))
+    return RequestID, DecodePayload(Flags, ReceiveExactly(Socket, Length))
+
+
+# ------------ ReceiveExactly ---------------------------------------------------
+def ReceiveExactly(Socket, Length):
+
+    Buffer = bytearray(Length)
+    View = memoryview(Buffer)
+    Received = 0
+    while Received < Length:
+        Count = Socket.recv_into(View[Received:], Length - Received)
+        if Count == 0:
+            raise EOFError("connection closed")
+        Received += Count
+    return Buffer
+
+
+# ------------ FrameReader class ------------------------------------------------
+class FrameReader(object):
+    # Collects data received from a non blocking or timed out socket and
+    # returns complete frames. The payload of a frame is copied into a buffer
+    # allocated once for the frame length.
+
+    # ---------- FrameReader::__init__------------------------------------------
+    def __init__(self):
+        self.Header = bytearray()
+        self.Flags = 0
+        self.RequestID = 0
+        self.Payload = None  # payload buffer of the current frame
+        self.Received = 0  # payload bytes received for the current frame
+
+    # ---------- FrameReader::Add-----------------------------------------------
+    # adds received data, returns a list of (request ID, payload string) for
+    # the frames completed. Raises ValueError for an invalid frame.
+    def Add(self, Data):
+
+        Frames = []
+        View = memoryview(Data)
+        while len(View):
+            if self.Payload == None:
+                Needed = FRAME_HEADER.size - len(self.Header)
+                self.Header.extend(View[:Needed])
+                View = View[Needed:]
+                if len(self.Header) < FRAME_HEADER.size:
+                    break
+                self.Flags, self.RequestID, Length = UnpackHeader(self.Header)
+                self.Header = bytearray()
+                self.Payload = bytearray(Length)
+                self.Received = 0
+            Count = min(len(self.Payload) - self.Received, len(View))
+            self.Payload[self.Received : self.Received + Count] = View[:Count]
+            self.Received += Count
+            View = View[Count:]
+            if self.Received == len(self.Payload):
+                Frames.append((self.RequestID, DecodePayload(self.Flags, self.Payload)))
+                self.Payload = None
+        return Frames
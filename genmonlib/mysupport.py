@@ -32,6 +32,7 @@ class MySupport(MyCommon):
         super(MySupport, self).__init__()
         self.Simulation = simulation
         self.CriticalLock = threading.Lock()  # Critical Lock (writing conf file)
+        self.LogWriter = None  # MyLogWriter object used by LogToFile, if set
 
     # ------------ MySupport::LogToFile------------------------------------------
     def LogToFile(self, File, *argv):
@@ -51,6 +52,9 @@ class MySupport(MyCommon):
                     modarg.append(arg)
             outdata = ","
             outdata = outdata.join(modarg) + "\n"
+            if self.LogWriter != None:
+                self.LogWriter.Write(File, outdata)
+                return
             with open(File, "a") as LogFile:  # opens file
                 LogFile.write(outdata)
                 LogFile.flush()
@@ -313,8 +313,8 @@ function backupgenmon() {
     sudo cp "$config_path"gencustomgpio.conf ./genmon_backup
     sudo cp "$config_path"gensms_voip.conf ./genmon_backup
     sudo cp "$config_path"outage.txt ./genmon_backup
-    sudo cp "$config_path"kwlog.txt ./genmon_backup
-    sudo cp "$config_path"fuellog.txt ./genmon_backup
+    sudo cp "$config_path"kwlog.bin ./genmon_backup
+    sudo cp "$config_path"fuellog.bin ./genmon_backup
     sudo cp "$config_path"maintlog.json ./genmon_backup
     sudo cp "$config_path"update.txt ./genmon_backup
     tar -zcvf genmon_backup.tar.gz genmon_backup/
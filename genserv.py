@@ -50,7 +50,7 @@ except Exception as e1:
     sys.exit(2)
 
 try:
-    from genmonlib.myclient import ClientInterface
+    from genmonlib.myclient import ClientInterfacePool
     from genmonlib.myconfig import MyConfig
     from genmonlib.mylog import SetupLogger
     from genmonlib.mymail import MyMail
@@ -109,6 +109,8 @@ SSLContext = None
 HTTPPort = 8000
 loglocation = ProgramDefaults.LogPath
 clientport = ProgramDefaults.ServerPort
+ClientConnections = 4  # connections to genmon for concurrent web requests
+ClientTimeout = 30.0  # seconds to wait for a genmon response
 log = None
 console = None
 AppPath = ""
@@ -468,6 +470,7 @@ def ProcessCommand(command):
             "delete_row_maint_log",
             "edit_row_maint_log",
             "support_data_json",
+            "fuel_log_json",
             "fuel_log_clear",
             "notify_message",
             "set_button_command",
@@ -504,6 +507,11 @@ def ProcessCommand(command):
                     setlogstr = request.args.get("power_log_json", 0, type=str)
                     if setlogstr:
                         finalcommand += "=" + setlogstr
+                if command == "fuel_log_json":
+                    # example: /cmd/fuel_log_json?fuel_log_json=1440,rate
+                    setlogstr = request.args.get("fuel_log_json", 0, type=str)
+                    if setlogstr:
+                        finalcommand += "=" + setlogstr
                 if command == "add_maint_log":
                     # use direct method instead of request.args.get due to unicoode
                     # input for add_maint_log for international users
@@ -539,6 +547,7 @@ def ProcessCommand(command):
                 "start_info_json",
                 "gui_status_json",
                 "power_log_json",
+                "fuel_log_json",
                 "status_num_json",
                 "maint_num_json",
                 "monitor_num_json",
@@ -2395,6 +2404,72 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "use_modbus_fc4",
         ]
+        ConfigSettings["modbus_block_read"] = [
+            "boolean",
+            "Combine Adjacent Modbus Register Reads",
+            15,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_read",
+        ]
+        ConfigSettings["modbus_block_max_span"] = [
+            "int",
+            "Maximum Combined Read Length (registers)",
+            16,
+            16,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_max_span",
+        ]
+        ConfigSettings["modbus_block_max_gap"] = [
+            "int",
+            "Maximum Gap in Combined Read (registers)",
+            17,
+            0,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_block_max_gap",
+        ]
+        ConfigSettings["modbus_adaptive_poll"] = [
+            "boolean",
+            "Adaptive Modbus Register Polling",
+            18,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_adaptive_poll",
+        ]
+        ConfigSettings["modbus_tcp_pipeline_depth"] = [
+            "int",
+            "Modbus TCP Outstanding Requests",
+            19,
+            1,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "modbus_tcp_pipeline_depth",
+        ]
+        ConfigSettings["incremental_log_read"] = [
+            "boolean",
+            "Incremental Log Refresh",
+            20,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "incremental_log_read",
+        ]
         ConfigSettings["serial_rate"] = [
             "int",
             "Serial Data Rate",
@@ -2701,6 +2776,28 @@ def ReadAdvancedSettingsFromFile():
             GENMON_SECTION,
             "kwlogmax",
         ]
+        ConfigSettings["log_flush_interval"] = [
+            "int",
+            "Log Write Interval (seconds)",
+            74,
+            30,
+            "",
+            "digits",
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "log_flush_interval",
+        ]
+        ConfigSettings["log_fsync"] = [
+            "boolean",
+            "Sync Log Writes to Disk",
+            75,
+            False,
+            "",
+            0,
+            GENMON_CONFIG,
+            GENMON_SECTION,
+            "log_fsync",
+        ]
         ConfigSettings["currentdivider"] = [
             "float",
             "Current Divider",
@@ -3989,6 +4086,8 @@ def LoadConfig():
 
     global log
     global clientport
+    global ClientConnections
+    global ClientTimeout
     global loglocation
     global bUseMFA
     global SecretMFAKey
@@ -4027,6 +4126,13 @@ def LoadConfig():
                 "server_port", return_type=int, default=ProgramDefaults.ServerPort
             )
 
+        ClientConnections = ConfigFiles[GENMON_CONFIG].ReadValue(
+            "http_client_connections", return_type=int, default=4
+        )
+        ClientTimeout = ConfigFiles[GENMON_CONFIG].ReadValue(
+            "http_client_timeout", return_type=float, default=30.0
+        )
+
         bUseMFA = ConfigFiles[GENMON_CONFIG].ReadValue(
             "usemfa", return_type=bool, default=False
         )
@@ -4376,7 +4482,13 @@ if __name__ == "__main__":
         LogError("Required file missing : genmonmaint.sh")
         sys.exit(1)
 
-    MyClientInterface = ClientInterface(host=address, port=clientport, log=log)
+    MyClientInterface = ClientInterfacePool(
+        host=address,
+        port=clientport,
+        log=log,
+        size=ClientConnections,
+        timeout=ClientTimeout,
+    )
 
     Start = datetime.datetime.now()
 
@@ -4385,6 +4497,7 @@ if __name__ == "__main__":
         if "OK" in data:
             LogConsole(" OK - Init complete.")
             break
+        time.sleep(0.5)
 
     try:
         data = MyClientInterface.ProcessMonitorCommand("generator: start_info_json")